@@ -4,7 +4,7 @@ Configuration file for the discovery module.
 """
 
 from dataclasses import dataclass, field
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from enum import Enum
 
 
@@ -78,8 +78,14 @@ class FilterConfig:
     exclude_verified: bool = False  # Optionally exclude verified accounts
     max_inactivity_days: int = 14  # Max days since last trade (default: 14)
     
-    # Known market maker addresses (to be filtered out)
-    market_maker_addresses: List[str] = field(default_factory=list)
+    # Known market maker addresses (to be filtered out); stored as a tuple so the
+    # analyzer's precomputed lookup cannot drift from an in-place edit
+    market_maker_addresses: Tuple[str, ...] = ()
+    
+    def __setattr__(self, name, value):
+        if name == "market_maker_addresses":
+            value = tuple(value)  # Lists are still accepted
+        super().__setattr__(name, value)
 
 
 @dataclass
@@ -96,7 +102,13 @@ class AnalysisConfig:
     max_concentration: float = 0.5  # Max position concentration (single market exposure)
     
     # Parallel processing
-    max_workers: int = 10  # Number of concurrent threads
+    max_workers: int = 10  # Worker threads when aiohttp is not installed
+    io_depth: int = 128  # Wallets in flight on the aiohttp event loop
+    requests_per_second: float = 25.0  # Request rate cap of the aiohttp fetcher (0 = unlimited)
+    
+    # Position cache (SQLite file inside output_dir)
+    position_cache_ttl_seconds: float = 3600.0  # Reuse fetched positions this long (0 = disabled)
+    position_cache_file: str = "position_cache.sqlite"
 
 
 @dataclass
@@ -108,6 +120,9 @@ class OutputConfig:
     # File formats
     save_csv: bool = True
     save_json: bool = True
+    save_parquet: bool = False  # Single partitioned Parquet dataset instead of per-kind CSV/JSON (needs pyarrow)
+    parquet_dataset_dir: str = "analysis_dataset"  # Dataset root inside output_dir
+    stream_all_metrics: bool = False  # Stream every analyzed trader to Parquet, keep only smart traders in memory (needs pyarrow)
     
     # File naming
     timestamp_format: str = "%Y%m%d_%H%M%S"
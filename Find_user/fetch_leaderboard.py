@@ -14,16 +14,16 @@ import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 import pandas as pd
-import json
 import time
 import os
 import logging
 from datetime import datetime
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Iterator
 from dataclasses import asdict
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
 
+import json_utils
 from discovery_config import (
     DiscoveryConfig,
     LeaderboardConfig,
@@ -42,6 +42,62 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+class LeaderboardResultsWriter:
+    """
+    Append-only CSV/JSON output of leaderboard rows, written batch by batch
+    so a streaming run never holds the whole leaderboard in memory.
+    
+    The CSV columns are fixed by the first non-empty batch; later batches
+    are aligned to them.
+    """
+    
+    def __init__(self, csv_path: Optional[str] = None, json_path: Optional[str] = None):
+        self.rows = 0
+        self.saved_files: Dict[str, str] = {}
+        self._columns: Optional[pd.Index] = None
+        self._csv = self._json = None
+        self._json_empty = True
+        if csv_path:
+            # utf-8-sig writes the BOM (for Excel) once, at the start of the stream
+            self._csv = open(csv_path, "w", newline="", encoding="utf-8-sig")
+            self.saved_files["csv"] = csv_path
+        if json_path:
+            self._json = open(json_path, "w", encoding="utf-8")
+            self._json.write("[")
+            self.saved_files["json"] = json_path
+    
+    def write(self, df: pd.DataFrame):
+        if df.empty:
+            return
+        if self._csv is not None:
+            header = self._columns is None
+            if header:
+                self._columns = df.columns
+            df.reindex(columns=self._columns).to_csv(self._csv, index=False, header=header)
+        if self._json is not None:
+            # Same layout as a single to_json(orient="records", indent=2) call: strip the
+            # brackets of each batch and join the records with commas
+            records = df.to_json(orient="records", indent=2, force_ascii=False)[1:-1].rstrip("\n")
+            if not self._json_empty:
+                self._json.write(",")
+            self._json.write(records)
+            self._json_empty = False
+        self.rows += len(df)
+    
+    def close(self):
+        if self._csv is not None:
+            self._csv.close()
+        if self._json is not None:
+            self._json.write("]" if self._json_empty else "\n]")
+            self._json.close()
+    
+    def __enter__(self) -> "LeaderboardResultsWriter":
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+
 class LeaderboardFetcher:
     """
     Fetcher for Polymarket Leaderboard API
@@ -121,7 +177,7 @@ class LeaderboardFetcher:
             )
             response.raise_for_status()
             
-            data = response.json()
+            data = json_utils.loads(response.content)
             
             # Add metadata to each record
             for record in data:
@@ -131,7 +187,7 @@ class LeaderboardFetcher:
             
             return data
             
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, json_utils.JSONDecodeError) as e:
             logger.error(f"Error fetching page (offset={offset}): {e}")
             return []
     
@@ -182,28 +238,26 @@ class LeaderboardFetcher:
         logger.info(f"Fetched {len(all_traders)} traders for {category.value}/{time_period.value}")
         return all_traders
     
-    def fetch_all_categories(
+    def iter_categories(
         self,
         categories: Optional[List[LeaderboardCategory]] = None,
         time_periods: Optional[List[LeaderboardTimePeriod]] = None,
         max_traders_per_combo: int = 1000
-    ) -> pd.DataFrame:
+    ) -> Iterator[pd.DataFrame]:
         """
-        Fetch leaderboard data for multiple categories and time periods
+        Lazily fetch leaderboard data one category/time period combination at a time
         
         Args:
             categories: List of categories (default from config)
             time_periods: List of time periods (default from config)
             max_traders_per_combo: Max traders per category/time period
             
-        Returns:
-            DataFrame with all trader data
+        Yields:
+            One DataFrame per non-empty combination (not deduplicated across combos)
         """
         categories = categories or self.lb_config.categories
         time_periods = time_periods or self.lb_config.time_periods
         
-        all_data = []
-        
         for category in categories:
             for time_period in time_periods:
                 traders = self.fetch_all_pages(
@@ -211,13 +265,33 @@ class LeaderboardFetcher:
                     time_period,
                     max_traders_per_combo
                 )
-                all_data.extend(traders)
+                if traders:
+                    yield pd.DataFrame(traders)
+    
+    def fetch_all_categories(
+        self,
+        categories: Optional[List[LeaderboardCategory]] = None,
+        time_periods: Optional[List[LeaderboardTimePeriod]] = None,
+        max_traders_per_combo: int = 1000
+    ) -> pd.DataFrame:
+        """
+        Fetch leaderboard data for multiple categories and time periods
+        
+        Args:
+            categories: List of categories (default from config)
+            time_periods: List of time periods (default from config)
+            max_traders_per_combo: Max traders per category/time period
+            
+        Returns:
+            DataFrame with all trader data
+        """
+        frames = list(self.iter_categories(categories, time_periods, max_traders_per_combo))
         
-        if not all_data:
+        if not frames:
             logger.warning("No data fetched from leaderboard")
             return pd.DataFrame()
         
-        df = pd.DataFrame(all_data)
+        df = pd.concat(frames, ignore_index=True)
         
         # Deduplicate by proxyWallet, keeping the first occurrence
         if "proxyWallet" in df.columns:
@@ -250,9 +324,9 @@ class LeaderboardFetcher:
                 return None
             
             response.raise_for_status()
-            return response.json()
+            return json_utils.loads(response.content)
             
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, json_utils.JSONDecodeError) as e:
             logger.error(f"Error fetching profile for {wallet_address}: {e}")
             return None
     
@@ -334,6 +408,15 @@ class LeaderboardFetcher:
         Returns:
             Dictionary of saved file paths
         """
+        with self.open_results_stream(prefix) as writer:
+            writer.write(df)
+        return writer.saved_files
+    
+    def open_results_stream(self, prefix: str = "leaderboard") -> LeaderboardResultsWriter:
+        """
+        Open the output files of save_results for incremental writes
+        (one write() per batch; close() finishes the files)
+        """
         output_config = self.config.output
         
         # Create output directory
@@ -344,21 +427,12 @@ class LeaderboardFetcher:
         # Generate timestamp
         timestamp = datetime.now().strftime(output_config.timestamp_format)
         
-        saved_files = {}
-        
-        if output_config.save_csv:
-            csv_path = os.path.join(output_dir, f"{prefix}_{timestamp}.csv")
-            df.to_csv(csv_path, index=False, encoding="utf-8-sig")
-            saved_files["csv"] = csv_path
-            logger.info(f"Saved CSV: {csv_path}")
-        
-        if output_config.save_json:
-            json_path = os.path.join(output_dir, f"{prefix}_{timestamp}.json")
-            df.to_json(json_path, orient="records", indent=2, force_ascii=False)
-            saved_files["json"] = json_path
-            logger.info(f"Saved JSON: {json_path}")
-        
-        return saved_files
+        csv_path = os.path.join(output_dir, f"{prefix}_{timestamp}.csv") if output_config.save_csv else None
+        json_path = os.path.join(output_dir, f"{prefix}_{timestamp}.json") if output_config.save_json else None
+        writer = LeaderboardResultsWriter(csv_path, json_path)
+        for kind, path in writer.saved_files.items():
+            logger.info(f"Writing {kind.upper()}: {path}")
+        return writer
 
 
 def main():
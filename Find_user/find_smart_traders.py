@@ -9,26 +9,79 @@ Polymarket 聪明钱猎手 (Smart Trader Finder) - 高速版 🚀
 """
 
 from polymarket_data_fetcher import PolymarketDataFetcher
+from position_cache import PositionCache
+import stats_kernels
+from numeric_utils import to_float64
+import os
 import pandas as pd
 import numpy as np
+import asyncio
 import time
 from collections import defaultdict
 import sys
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from tqdm import tqdm  # 进度条支持
 import json
+import csv
+from dataclasses import dataclass, asdict, fields, replace
+
+try:
+    import aiohttp
+except ImportError:  # aiohttp 为可选依赖，未安装时退回线程池
+    aiohttp = None
+
+# 交易者分析结果的磁盘缓存 (重复扫描时重叠的候选人无需再次拉取交易记录)
+TRADER_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "output", "trader_cache.sqlite")
+TRADER_CACHE_TTL = 6 * 3600  # 秒
+# 候选人扫描结果的缓存 (Holders 变化较慢，短时间内重复运行无需重新扫描)
+CANDIDATE_CACHE_TTL = 1800  # 秒
+# 结算检查时每次批量查询的 Market 数量
+MARKET_BATCH_SIZE = 50
+
+# slots=True 需要 Python 3.10；3.9 上退化为普通 dataclass
+DATACLASS_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(frozen=True, **DATACLASS_SLOTS)
+class TraderStats:
+    """单个交易者的统计结果 (字段顺序即导出 CSV 的列顺序)"""
+    win_rate: float = 0.0
+    total_pnl: float = 0.0
+    total_profit: float = 0.0
+    total_loss: float = 0.0
+    profit_factor: float = 0.0
+    trade_count: int = 0 # 这里仅作参考
+    market_count: int = 0
+    closed_count: int = 0
+    address: str = ''
+    early_rejected: bool = False # 场次上限不足，跳过了结算查询 (结果不完整)
+
+
+# 导出 CSV 的列 (不含内部标记)
+CSV_FIELDS = [f.name for f in fields(TraderStats) if f.name != 'early_rejected']
+
 
 class SmartTraderFinder:
-    def __init__(self, max_workers=10):
+    def __init__(self, max_workers=10, cache_ttl=TRADER_CACHE_TTL):
         self.fetcher = PolymarketDataFetcher()
         self.analyzed_traders = {} 
-        self.max_workers = max_workers # 并行线程数
+        self.max_workers = max_workers # 并行线程数 (aiohttp 模式下的并发请求数为其 5 倍)
+        self.cache_ttl = cache_ttl
+        self.cache = PositionCache(TRADER_CACHE_FILE) if cache_ttl > 0 else None # cache_ttl <= 0 时不使用缓存
+        self.min_closed = 0 # 场次上限低于此值的交易者跳过结算查询 (run 在非测试模式下设为 min_trades)
         
-    def scan_markets_for_candidates(self, active_limit=10, closed_limit=5, holders_per_market=10):
+    def scan_markets_for_candidates(self, active_limit=10, closed_limit=5, holders_per_market=10,
+                                    cache_ttl=CANDIDATE_CACHE_TTL, refresh=False):
         """
         [并行] 扫描市场获取候选人地址列表
+        cache_ttl 秒内相同扫描参数的结果直接复用 (cache_ttl <= 0 时不使用缓存)，refresh=True 时强制重新扫描
         """
-        candidates = set()
+        cache_file = self._candidate_cache_file(active_limit, closed_limit, holders_per_market)
+        if cache_ttl > 0 and not refresh:
+            cached = self._load_candidates(cache_file, cache_ttl)
+            if cached is not None:
+                print(f"♻️  复用缓存的候选人列表: {len(cached)} 个 (--refresh-candidates 强制重新扫描)")
+                return cached
         
         print(f"🔍 正在扫描市场挖掘候选人 (并行线程: {self.max_workers})...")
         
@@ -44,138 +97,309 @@ class SmartTraderFinder:
             
         print(f"   - 共发现 {len(all_events)} 个事件，开始提取 Markets...")
 
-        # 2. 提取所有 conditionIds
+        # 2./3. [并行] 提取所有 conditionIds 并获取各 Market 的 Holders
+        if aiohttp is not None:
+            candidates = asyncio.run(self._scan_events_async(all_events, holders_per_market))
+        else:
+            candidates = self._scan_events_threaded(all_events, holders_per_market)
+                    
+        print(f"✅ 挖掘完成! 共找到 {len(candidates)} 个唯一候选交易者")
+        if cache_ttl > 0:
+            self._save_candidates(cache_file, candidates)
+        return candidates
+
+    @staticmethod
+    def _candidate_cache_file(active_limit, closed_limit, holders_per_market):
+        return os.path.join(os.path.dirname(TRADER_CACHE_FILE),
+                            f"candidates_{active_limit}_{closed_limit}_{holders_per_market}.json")
+
+    @staticmethod
+    def _load_candidates(cache_file, cache_ttl):
+        """读取未过期的候选人缓存，缺失/过期/损坏时返回 None"""
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() - cached.get('ts', 0) > cache_ttl:
+            return None
+        return cached.get('candidates')
+
+    @staticmethod
+    def _save_candidates(cache_file, candidates):
+        """先写临时文件再替换，避免中断时留下半个文件"""
+        try:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            tmp_file = cache_file + '.tmp'
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump({'ts': time.time(), 'candidates': candidates}, f)
+            os.replace(tmp_file, cache_file)
+        except OSError as e:
+            print(f"⚠️ 候选人缓存写入失败: {e}")
+
+    @staticmethod
+    def _condition_ids_from_markets(markets_df):
+        """限制每个 Event 只取前 5 个 Market，避免过多冷门"""
+        if markets_df.empty or 'conditionId' not in markets_df.columns:
+            return []
+        # 按顺序取前 5 个不重复的 ID，取够即停，不对整列做 unique
+        condition_ids = []
+        for cid in markets_df['conditionId']:
+            if pd.notna(cid) and cid not in condition_ids:
+                condition_ids.append(cid)
+                if len(condition_ids) == 5:
+                    break
+        return condition_ids
+
+    @staticmethod
+    def _unique_addresses(address_chunks):
+        """合并各 Market 的 Holder 地址数组并一次性去重 (排序后的列表，结果顺序可复现)"""
+        if not address_chunks:
+            return []
+        addresses = pd.Series(np.concatenate(address_chunks)).dropna()
+        return np.unique(addresses.to_numpy(dtype=str)).tolist()
+
+    @staticmethod
+    def _addresses_from_holders(holders_df):
+        if holders_df.empty or 'address' not in holders_df.columns:
+            return np.empty(0, dtype=object)
+        return holders_df['address'].to_numpy()
+
+    async def _scan_events_async(self, event_ids, holders_per_market):
+        """
+        单线程事件循环并发抓取 Markets 和 Holders，两个阶段共用一个 aiohttp 会话
+        """
+        address_chunks = []
+        all_condition_ids = []
+        sem = asyncio.Semaphore(self.max_workers * 5)
+        
+        async with self.fetcher.create_async_session() as session:
+            async def fetch_markets(eid):
+                async with sem:
+                    return await self.fetcher.aget_markets_from_event(session, str(eid))
+            
+            async def fetch_holders(cid):
+                async with sem:
+                    return await self.fetcher.aget_market_holders(session, cid, limit=holders_per_market)
+            
+            tasks = [fetch_markets(eid) for eid in event_ids]
+            for next_done in tqdm(asyncio.as_completed(tasks), total=len(tasks), desc="抓取 Events"):
+                try:
+                    all_condition_ids.extend(self._condition_ids_from_markets(await next_done))
+                except Exception:
+                    pass
+            
+            print(f"   - 提取到 {len(all_condition_ids)} 个活跃 Markets，正在挖掘 Top Holders...")
+            
+            tasks = [fetch_holders(cid) for cid in all_condition_ids]
+            for next_done in tqdm(asyncio.as_completed(tasks), total=len(tasks), desc="挖掘 Holders"):
+                try:
+                    address_chunks.append(self._addresses_from_holders(await next_done))
+                except Exception:
+                    pass
+        
+        return self._unique_addresses(address_chunks)
+
+    def _scan_events_threaded(self, event_ids, holders_per_market):
+        """未安装 aiohttp 时的线程池实现"""
+        address_chunks = []
         all_condition_ids = []
         
-        # 这里为了简单，Event 信息的获取还是串行比较稳妥，或者也可以并行
-        # 我们先并行获取 Markets
         with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            future_to_event = {executor.submit(self.fetcher.get_markets_from_event, str(eid)): eid for eid in all_events}
+            future_to_event = {executor.submit(self.fetcher.get_markets_from_event, str(eid)): eid for eid in event_ids}
             
-            for future in tqdm(as_completed(future_to_event), total=len(all_events), desc="抓取 Events"):
+            for future in tqdm(as_completed(future_to_event), total=len(event_ids), desc="抓取 Events"):
                 try:
-                    markets_df = future.result()
-                    if not markets_df.empty and 'conditionId' in markets_df.columns:
-                        # 限制每个 Event 只取前 5 个 Market，避免过多冷门
-                        cond_ids = markets_df['conditionId'].dropna().unique()[:5]
-                        all_condition_ids.extend(cond_ids)
+                    all_condition_ids.extend(self._condition_ids_from_markets(future.result()))
                 except Exception:
                     pass
         
         print(f"   - 提取到 {len(all_condition_ids)} 个活跃 Markets，正在挖掘 Top Holders...")
         
-        # 3. [并行] 获取所有 Markets 的 Holders
         with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            # 提交任务
             future_to_cid = {
                 executor.submit(self.fetcher.get_market_holders, cid, limit=holders_per_market): cid 
                 for cid in all_condition_ids
             }
             
-            # 处理结果
             for future in tqdm(as_completed(future_to_cid), total=len(all_condition_ids), desc="挖掘 Holders"):
                 try:
-                    holders_df = future.result()
-                    if not holders_df.empty and 'address' in holders_df.columns:
-                        new_candidates = holders_df['address'].tolist()
-                        candidates.update(new_candidates)
+                    address_chunks.append(self._addresses_from_holders(future.result()))
                 except Exception:
                     pass
-                    
-        print(f"✅ 挖掘完成! 共找到 {len(candidates)} 个唯一候选交易者")
-        return list(candidates)
+        
+        return self._unique_addresses(address_chunks)
 
     def analyze_trader_performance(self, address, trade_limit=200):
         """
         深度分析单个交易者的表现
         """
-        if address in self.analyzed_traders:
-            return self.analyzed_traders[address]
+        stats = self._get_cached_stats(address, trade_limit)
+        if stats is not None:
+            return stats
             
         try:
             # 获取交易记录
             trades = self.fetcher.get_trades(wallet_address=address, limit=trade_limit)
-            
+        except Exception:
+            return None
+        return self._stats_from_trades(address, trades, trade_limit)
+
+    def _get_cached_stats(self, address, trade_limit):
+        """先查本次运行的结果，再查磁盘缓存"""
+        if address in self.analyzed_traders:
+            return self.analyzed_traders[address]
+        if self.cache is None:
+            return None
+        cached = self.cache.get(address, "trader_stats", trade_limit, self.cache_ttl)
+        if cached is None:
+            return None
+        try:
+            stats = TraderStats(**cached)
+        except TypeError: # 字段不匹配的旧缓存，视为未命中
+            return None
+        self.analyzed_traders[address] = stats
+        return stats
+
+    def _stats_from_trades(self, address, trades, trade_limit):
+        """根据已获取的交易记录计算并缓存统计指标"""
+        try:
             if trades.empty:
                 return None
                 
-            stats = self._calculate_stats(trades)
-            stats['address'] = address
-            
-            self.analyzed_traders[address] = stats
-            return stats
+            stats = replace(self._calculate_stats(trades, min_closed=self.min_closed), address=address)
             
         except Exception as e:
             return None
 
-    def _calculate_stats(self, trades_df):
+        self.analyzed_traders[address] = stats
+        # 提前淘汰的结果不完整，不写入磁盘缓存
+        if self.cache is not None and not stats.early_rejected:
+            try:
+                self.cache.set(address, "trader_stats", trade_limit, asdict(stats))
+            except Exception as e: # 例如多进程同时写入时 "database is locked"：只影响缓存，结果照常返回
+                print(f"⚠️ 写入缓存失败 {address}: {e}")
+        return stats
+
+    async def _analyze_candidates_async(self, candidates, trade_limit=200):
+        """
+        事件循环并发拉取所有候选人的交易记录；统计计算 (含同步的结算市场查询) 交给线程池
+        逐个产出 stats (可能为 None)
+        """
+        loop = asyncio.get_running_loop()
+        sem = asyncio.Semaphore(self.max_workers * 5)
+        results = []
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            async with self.fetcher.create_async_session() as session:
+                async def analyze(addr):
+                    stats = self._get_cached_stats(addr, trade_limit)
+                    if stats is not None:
+                        return stats
+                    async with sem:
+                        trades = await self.fetcher.aget_trades(session, wallet_address=addr, limit=trade_limit)
+                    return await loop.run_in_executor(executor, self._stats_from_trades, addr, trades, trade_limit)
+                
+                tasks = [analyze(addr) for addr in candidates]
+                for next_done in tqdm(asyncio.as_completed(tasks), total=len(tasks), desc="分析 Traders"):
+                    try:
+                        results.append(await next_done)
+                    except Exception:
+                        pass
+        
+        return results
+
+    def _analyze_candidates_threaded(self, candidates):
+        """未安装 aiohttp 时的线程池实现"""
+        results = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            future_to_addr = {executor.submit(self.analyze_trader_performance, addr): addr for addr in candidates}
+            
+            for future in tqdm(as_completed(future_to_addr), total=len(candidates), desc="分析 Traders"):
+                try:
+                    results.append(future.result())
+                except Exception:
+                    pass
+        return results
+
+    def _analyze_candidates_processes(self, candidates, processes):
+        """
+        进程池实现：每个子进程持有自己的 SmartTraderFinder (会话、市场缓存)，统计计算不受 GIL 限制
+        磁盘缓存通过同一个 SQLite 文件在进程间共享
+        """
+        results = []
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_process_worker, initargs=(self.cache_ttl, self.min_closed)) as executor:
+            future_to_addr = {executor.submit(_analyze_in_process, addr): addr for addr in candidates}
+            
+            for future in tqdm(as_completed(future_to_addr), total=len(candidates), desc="分析 Traders"):
+                try:
+                    stats = future.result()
+                except Exception:
+                    continue
+                if stats:
+                    self.analyzed_traders[stats.address] = stats
+                results.append(stats)
+        return results
+
+    def _calculate_stats(self, trades_df, min_closed=0):
         """
         计算交易统计指标 (核心算法)
         改进版：包含持有到期 (Held to Maturity) 的盈亏计算
+        min_closed: 已平仓场次加上剩余持仓数 (场次上限) 仍达不到该值时，跳过结算查询并标记 early_rejected
         """
         if trades_df.empty:
-            return {'win_rate': 0, 'total_pnl': 0, 'trade_count': 0, 'profit_factor': 0}
+            return TraderStats()
             
         trades_df = trades_df.copy()
         # 优化：一次性转换
-        trades_df[['size', 'price']] = trades_df[['size', 'price']].apply(pd.to_numeric, errors='coerce').fillna(0)
+        trades_df['size'] = to_float64(trades_df['size'])
+        trades_df['price'] = to_float64(trades_df['price'])
         trades_df['amount'] = trades_df['size'] * trades_df['price']
         
         # 按 (Market, Outcome) 分组，因为不同 Outcome 是不同资产
-        groups = trades_df.groupby(['conditionId', 'outcome'])
+        # 向量化: 每行映射到分组编号 (与 groupby 的排序一致)
+        # (与 groupby 一样忽略 conditionId/outcome 缺失的行)
+        keyed = trades_df[trades_df['conditionId'].notna() & trades_df['outcome'].notna()]
+        codes = keyed.groupby(['conditionId', 'outcome'], sort=True).ngroup().to_numpy()
+        n_groups = int(codes.max()) + 1 if len(codes) else 0
         
-        total_pnl = 0
-        wins = 0
-        losses = 0
-        total_profit = 0
-        total_loss = 0
-        participated_markets = set()
+        side = keyed['side'].to_numpy()
+        is_buy = side == 'BUY'
+        is_sell = side == 'SELL'
+        size = keyed['size'].to_numpy(dtype=np.float64)
+        amount = keyed['amount'].to_numpy(dtype=np.float64)
         
-        # 记录剩余持仓以便后续检查结算状态
-        # key: (conditionId, outcome), value: {'vol': float, 'cost': float}
-        remaining_positions = {}
+        participated_markets = set(keyed['conditionId'])
         
-        for (cid, outcome), group in groups:
-            participated_markets.add(cid)
-            
-            buys = group[group['side'] == 'BUY']
-            sells = group[group['side'] == 'SELL']
-            
-            buy_vol = buys['size'].sum()
-            sell_vol = sells['size'].sum()
-            
-            if buy_vol == 0: continue
-            
-            buy_amt = buys['amount'].sum()
-            sell_amt = sells['amount'].sum()
-            
-            # 1. 计算已平仓部分的盈亏 (Realized PnL from Sells)
-            realized_pnl = 0
-            avg_buy_price = buy_amt / buy_vol
-            
-            if sell_vol > 0:
-                cost_of_sold = sell_vol * avg_buy_price
-                realized_pnl = sell_amt - cost_of_sold
-                
-                total_pnl += realized_pnl
-                
-                if realized_pnl > 0.01:
-                    wins += 1
-                    total_profit += realized_pnl
-                elif realized_pnl < -0.01:
-                    losses += 1
-                    total_loss += abs(realized_pnl)
-            
-            # 2. 记录剩余持仓 (Remaining Position)
-            rem_vol = buy_vol - sell_vol
-            if rem_vol > 0.001: # 忽略微小尘埃
-                rem_cost = rem_vol * avg_buy_price
-                remaining_positions[(cid, outcome)] = {'vol': rem_vol, 'cost': rem_cost}
+        # 1. 计算已平仓部分的盈亏 (Realized PnL from Sells)
+        # 各组买卖量汇总与已实现盈亏在一个编译内核中一次完成 (没有买入的分组不参与统计)
+        (buy_vol, sell_vol, avg_buy_price, total_pnl, wins, losses,
+         total_profit, total_loss) = stats_kernels.group_realized_pnl(
+            codes, is_buy, is_sell, size, amount, n_groups)
+        has_buy = buy_vol != 0
+        
+        # 2. 记录剩余持仓 (Remaining Position)，以便后续检查结算状态
+        # key: (conditionId, outcome), value: {'vol': float, 'cost': float}
+        rem_vol = buy_vol - sell_vol
+        held = np.flatnonzero(has_buy & (rem_vol > 0.001)) # 忽略微小尘埃
+        first_row = np.unique(codes, return_index=True)[1]
+        group_cids = keyed['conditionId'].to_numpy()[first_row]
+        group_outcomes = keyed['outcome'].to_numpy()[first_row]
+        remaining_positions = {
+            (group_cids[g], group_outcomes[g]): {'vol': rem_vol[g], 'cost': rem_vol[g] * avg_buy_price[g]}
+            for g in held.tolist()
+        }
+
+        # 提前淘汰：每个剩余持仓最多再贡献一个结算场次，上限不够时无需查询结算市场
+        early_rejected = wins + losses + len(remaining_positions) < min_closed
+        if early_rejected:
+            remaining_positions = {}
 
         # 3. 处理持有到期 (Settlement PnL)
         # 检查所有剩余持仓的市场是否已关闭并结算
         if remaining_positions:
             unique_cids = set(k[0] for k in remaining_positions.keys())
+            self._prefetch_market_info(unique_cids)
             
             for cid in unique_cids:
                 # 获取 Market Info (优先查缓存)
@@ -238,16 +462,35 @@ class SmartTraderFinder:
         win_rate = wins / total_closed_trades if total_closed_trades > 0 else 0
         profit_factor = total_profit / total_loss if total_loss > 0 else (999 if total_profit > 0 else 0)
         
-        return {
-            'win_rate': win_rate,
-            'total_pnl': total_pnl,
-            'total_profit': total_profit,
-            'total_loss': total_loss,
-            'profit_factor': profit_factor,
-            'trade_count': len(trades_df), # 这里仅作参考
-            'market_count': len(participated_markets),
-            'closed_count': total_closed_trades
-        }
+        return TraderStats(
+            win_rate=win_rate,
+            total_pnl=total_pnl,
+            total_profit=total_profit,
+            total_loss=total_loss,
+            profit_factor=profit_factor,
+            trade_count=len(trades_df),
+            market_count=len(participated_markets),
+            closed_count=total_closed_trades,
+            early_rejected=early_rejected
+        )
+
+    def _prefetch_market_info(self, condition_ids):
+        """批量查询尚未缓存的 Market (每批一次请求)，批量结果中缺失的由 _get_market_info_cached 逐个补查"""
+        if not hasattr(self, 'market_cache'):
+            self.market_cache = {}
+        
+        missing = [cid for cid in condition_ids if cid not in self.market_cache]
+        for start in range(0, len(missing), MARKET_BATCH_SIZE):
+            chunk = missing[start:start + MARKET_BATCH_SIZE]
+            try:
+                df = self.fetcher.get_markets(condition_ids=chunk, limit=len(chunk))
+            except Exception:
+                continue
+            if df.empty or 'conditionId' not in df.columns:
+                continue
+            for info in df.to_dict('records'):
+                if info.get('conditionId') in chunk:
+                    self.market_cache[info['conditionId']] = info
 
     def _get_market_info_cached(self, condition_id):
         """Helper to fetch market info with caching"""
@@ -271,15 +514,20 @@ class SmartTraderFinder:
         self.market_cache[condition_id] = None
         return None
 
-    def run(self, min_win_rate=0.5, min_trades=3, min_profit=0, active_scan=10, closed_scan=5, testing=True):
+    def run(self, min_win_rate=0.5, min_trades=3, min_profit=0, active_scan=10, closed_scan=5, testing=True, processes=0,
+            candidate_cache_ttl=CANDIDATE_CACHE_TTL, refresh_candidates=False):
         print("🚀 启动 Smart Trader 猎手 (高速多线程版)...")
         print(f"🎯 筛选目标: 胜率>{min_win_rate:.0%} | 场次>={min_trades} | 盈利>${min_profit}")
         if testing:
             print("🧪 测试模式: 开启 (将保存所有分析过的交易者数据)")
         print("==================================================")
         
+        # 测试模式导出所有人的完整数据，不做提前淘汰
+        self.min_closed = 0 if testing else min_trades
+        
         # 1.获取候选人
-        candidates = self.scan_markets_for_candidates(active_limit=active_scan, closed_limit=closed_scan)
+        candidates = self.scan_markets_for_candidates(active_limit=active_scan, closed_limit=closed_scan,
+                                                      cache_ttl=candidate_cache_ttl, refresh=refresh_candidates)
         
         # 2. [并行] 深度分析
         print(f"\n🔬 开始深度分析 {len(candidates)} 位候选人...")
@@ -287,23 +535,23 @@ class SmartTraderFinder:
         smart_traders = []
         all_traders_stats = [] # 用于测试模式，存储所有人
         
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            future_to_addr = {executor.submit(self.analyze_trader_performance, addr): addr for addr in candidates}
-            
-            for future in tqdm(as_completed(future_to_addr), total=len(candidates), desc="分析 Traders"):
-                try:
-                    stats = future.result()
-                    if stats:
-                        # 收集基础数据
-                        all_traders_stats.append(stats)
-                        
-                        # 动态筛选 smart traders
-                        if (stats['closed_count'] >= min_trades 
-                            and stats['win_rate'] >= min_win_rate
-                            and stats['total_pnl'] >= min_profit):
-                            smart_traders.append(stats)
-                except Exception:
-                    pass
+        if processes > 0:
+            results = self._analyze_candidates_processes(candidates, processes)
+        elif aiohttp is not None:
+            results = asyncio.run(self._analyze_candidates_async(candidates))
+        else:
+            results = self._analyze_candidates_threaded(candidates)
+        
+        for stats in results:
+            if stats:
+                # 收集基础数据
+                all_traders_stats.append(stats)
+                
+                # 动态筛选 smart traders
+                if (stats.closed_count >= min_trades 
+                    and stats.win_rate >= min_win_rate
+                    and stats.total_pnl >= min_profit):
+                    smart_traders.append(stats)
             
         print("\n✅ 分析完成!")
         
@@ -319,12 +567,12 @@ class SmartTraderFinder:
             target_list = smart_traders
             csv_filename = "traders_pool.csv"
 
-        # 评分算法优先按胜率排序
-        ranked_traders = sorted(
-            target_list,
-            key=lambda x: (x['win_rate'], x['total_pnl']),
-            reverse=True
-        )
+        # 评分算法优先按胜率排序 (其次总盈亏)
+        # 向量化: lexsort 稳定排序，取负值实现降序且同分者保持原顺序 (与 sorted(reverse=True) 一致)
+        win_rates = np.fromiter((t.win_rate for t in target_list), dtype=np.float64, count=len(target_list))
+        pnls = np.fromiter((t.total_pnl for t in target_list), dtype=np.float64, count=len(target_list))
+        order = np.lexsort((-pnls, -win_rates))
+        ranked_traders = [target_list[i] for i in order.tolist()]
         
         print(f"\n🏆 SMART TRADERS 排行榜 (Top 15) [共筛选出 {len(ranked_traders)} 人]")
         print("="*90)
@@ -335,22 +583,36 @@ class SmartTraderFinder:
         top_n_traders = ranked_traders[:15]
         
         for rank, t in enumerate(top_n_traders, 1):
-            addr_display = t['address']
-            print(f"{rank:<5} {addr_display:<44} {t['win_rate']:.1%}    {t['total_pnl']:<12.2f} {t['profit_factor']:<8.2f} {t['closed_count']:<8}")
+            addr_display = t.address
+            print(f"{rank:<5} {addr_display:<44} {t.win_rate:.1%}    {t.total_pnl:<12.2f} {t.profit_factor:<8.2f} {t.closed_count:<8}")
             
         # 导出结果
         if ranked_traders:
-            df = pd.DataFrame(ranked_traders)
-            df.to_csv(csv_filename, index=False)
+            # 直接按行写出，无需为导出构造 DataFrame (格式同 DataFrame.to_csv)
+            with open(csv_filename, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f, lineterminator=os.linesep)
+                writer.writerow(CSV_FIELDS)
+                writer.writerows([getattr(t, name) for name in CSV_FIELDS] for t in ranked_traders)
             print(f"\n💾 榜单已保存至: {csv_filename}")
         
         # 推荐最佳人选 (如果有的话)
         if ranked_traders:
             best = ranked_traders[0]
             print("\n🌟 最佳跟单推荐:")
-            print(f"地址: {best['address']}")
-            print(f"核心数据: 胜率 {best['win_rate']:.1%} | 盈亏 ${best['total_pnl']:.2f} | 盈亏比 {best['profit_factor']:.2f}")
-            print(f"Polymarket Profile: https://polymarket.com/profile/{best['address']}")
+            print(f"地址: {best.address}")
+            print(f"核心数据: 胜率 {best.win_rate:.1%} | 盈亏 ${best.total_pnl:.2f} | 盈亏比 {best.profit_factor:.2f}")
+            print(f"Polymarket Profile: https://polymarket.com/profile/{best.address}")
+
+# 进程池子进程内的 SmartTraderFinder (每个进程初始化一次)
+_process_finder = None
+
+def _init_process_worker(cache_ttl, min_closed=0):
+    global _process_finder
+    _process_finder = SmartTraderFinder(max_workers=1, cache_ttl=cache_ttl)
+    _process_finder.min_closed = min_closed
+
+def _analyze_in_process(address, trade_limit=200):
+    return _process_finder.analyze_trader_performance(address, trade_limit)
 
 if __name__ == "__main__":
     import argparse
@@ -374,6 +636,11 @@ if __name__ == "__main__":
     parser.add_argument('--scan-active', type=int, default=10, help='扫描活跃事件数量, 默认 10')
     parser.add_argument('--scan-closed', type=int, default=5, help='扫描已结束事件数量, 默认 5')
     parser.add_argument('--workers', type=int, default=10, help='并发线程数, 默认 10')
+    parser.add_argument('--cache-ttl', type=float, default=TRADER_CACHE_TTL, help=f'复用多少秒内的交易者分析缓存, 默认 {TRADER_CACHE_TTL}')
+    parser.add_argument('--no-cache', action='store_true', help='不使用交易者分析缓存')
+    parser.add_argument('--candidate-cache-ttl', type=float, default=CANDIDATE_CACHE_TTL, help=f'复用多少秒内的候选人扫描结果, 默认 {CANDIDATE_CACHE_TTL}')
+    parser.add_argument('--refresh-candidates', action='store_true', help='忽略候选人缓存，重新扫描市场')
+    parser.add_argument('--processes', type=int, default=0, help='用多进程分析候选人 (进程数), 默认 0 不启用')
     
     # 新增 testing 参数 (默认开启，使用 --no-testing 关闭)
     parser.add_argument('--no-testing', action='store_false', dest='testing', help='关闭测试模式')
@@ -381,12 +648,15 @@ if __name__ == "__main__":
     
     args = parser.parse_args()
 
-    finder = SmartTraderFinder(max_workers=args.workers)
+    finder = SmartTraderFinder(max_workers=args.workers, cache_ttl=0 if args.no_cache else args.cache_ttl)
     finder.run(
         min_win_rate=args.min_win,
         min_trades=args.min_trades,
         min_profit=args.min_profit,
         active_scan=args.scan_active,
         closed_scan=args.scan_closed,
-        testing=args.testing
+        testing=args.testing,
+        processes=args.processes,
+        candidate_cache_ttl=args.candidate_cache_ttl,
+        refresh_candidates=args.refresh_candidates
     )
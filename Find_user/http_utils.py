@@ -0,0 +1,82 @@
+"""
+Polymarket HTTP 工具
+请求重试策略，以及 aiohttp 异步请求 / 交易分页的唯一实现
+(Find_user 与 user_listener 的 PolymarketDataFetcher 共用，避免两份拷贝各自演变)
+"""
+
+import asyncio
+from typing import Any, Dict, List
+
+try:
+    import aiohttp
+except ImportError:  # aiohttp 为可选依赖，未安装时只能使用同步接口
+    aiohttp = None
+
+# 同步 Session 与异步接口共用的重试策略
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+MAX_RETRIES = 3
+RETRY_BACKOFF_SECONDS = 1.0
+# /trades 每页条数 (API 通常上限是 500-1000)
+TRADES_PAGE_SIZE = 1000
+
+
+def create_async_session(limit: int = 100, limit_per_host: int = 50) -> "aiohttp.ClientSession":
+    """创建 aiohttp 会话 (需在事件循环内调用，多个请求共用以复用连接)"""
+    connector = aiohttp.TCPConnector(limit=limit, limit_per_host=limit_per_host, ttl_dns_cache=300)
+    return aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=30))
+
+
+async def aget_json(session: "aiohttp.ClientSession", url: str, params: Dict) -> Any:
+    """
+    异步 GET 并解析 JSON，按指数退避重试 (与同步 Session 一致)
+    限流/服务端错误状态码、超时和连接错误都会重试，其余 HTTP 错误直接抛出
+    """
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            async with session.get(url, params=params) as response:
+                if response.status not in RETRY_STATUSES or attempt == MAX_RETRIES:
+                    response.raise_for_status()
+                    return await response.json(content_type=None)
+        except aiohttp.ClientResponseError:
+            raise
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            # 单个慢请求/断开的连接不应让整个 gather 失败
+            if attempt == MAX_RETRIES:
+                raise
+        await asyncio.sleep(RETRY_BACKOFF_SECONDS * 2 ** attempt)
+
+
+def trades_batch(data: Any) -> List[Dict]:
+    """处理 /trades 返回的不同格式，得到本页交易列表"""
+    if isinstance(data, list):
+        return data
+    if isinstance(data, dict):
+        return data.get('data', [data] if data else [])
+    return []
+
+
+async def aget_wallet_trades(session: "aiohttp.ClientSession", url: str, wallet_address: str,
+                             limit: int = 100, offset: int = 0) -> List[Dict]:
+    """按钱包异步抓取 /trades 并自动分页，某一页失败时返回已取到的部分"""
+    all_trades = []
+    remaining = limit
+    current_offset = offset
+    
+    while remaining > 0:
+        fetch_limit = min(TRADES_PAGE_SIZE, remaining)
+        params = {"limit": fetch_limit, "offset": current_offset, "user": wallet_address}
+        try:
+            batch = trades_batch(await aget_json(session, url, params))
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            print(f"❌ 分页抓取交易失败 at offset {current_offset}: {e}")
+            break
+        
+        if not batch:
+            break
+        all_trades.extend(batch)
+        if len(batch) < fetch_limit: # 到底了
+            break
+        remaining -= len(batch)
+        current_offset += len(batch)
+    
+    return all_trades
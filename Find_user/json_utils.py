@@ -0,0 +1,68 @@
+"""
+Smart Trader Discovery - JSON helpers
+Fast JSON encode/decode backed by orjson, falling back to the stdlib json module.
+"""
+
+import json
+import math
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # orjson is optional
+    orjson = None
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so one type covers both backends
+JSONDecodeError = json.JSONDecodeError
+
+
+def _default(obj):
+    """Serialize numpy scalars/arrays for the stdlib fallback."""
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f"Type {type(obj).__name__} is not JSON serializable")
+
+
+def _finite_or_none(obj):
+    """Replace NaN/inf with None, as orjson does, so the stdlib output is valid JSON."""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {key: _finite_or_none(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_finite_or_none(value) for value in obj]
+    if isinstance(obj, (np.generic, np.ndarray)):
+        return _finite_or_none(_default(obj))
+    return obj
+
+
+def loads(data):
+    """Parse JSON from bytes or str (e.g. ``response.content``)."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj, indent: bool = False) -> bytes:
+    """Serialize to UTF-8 encoded JSON bytes; numpy values are supported, NaN/inf become null."""
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option, default=_default)
+    return json.dumps(
+        _finite_or_none(obj),
+        indent=2 if indent else None,
+        ensure_ascii=False,
+        default=_default,
+        allow_nan=False,
+    ).encode("utf-8")
+
+
+def dump(obj, path: str, indent: bool = False) -> None:
+    """Serialize ``obj`` and write it to ``path``."""
+    with open(path, "wb") as f:
+        f.write(dumps(obj, indent=indent))
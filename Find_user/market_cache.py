@@ -0,0 +1,118 @@
+"""
+Smart Follower Simulation - Market Cache
+Process-wide TTL + LRU cache of CLOB market responses, optionally persisted to disk.
+
+Open markets expire quickly because their prices move; closed markets are
+final, so they are kept for a day and survive between runs via save()/load().
+Each market's tokens are also indexed by token_id, in memory only.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import json_utils
+
+logger = logging.getLogger(__name__)
+
+
+class MarketCache:
+    """Thread-safe TTL/LRU mapping of condition_id -> market JSON."""
+
+    def __init__(self, maxsize: int = 4096, open_ttl: float = 60.0, closed_ttl: float = 86400.0):
+        self.maxsize = maxsize
+        self.open_ttl = open_ttl
+        self.closed_ttl = closed_ttl
+        self._data = OrderedDict()  # condition_id -> (expires_at, market, tokens_by_id)
+        self._lock = threading.Lock()
+
+    def __contains__(self, condition_id: str) -> bool:
+        return self.get(condition_id) is not None
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, condition_id: str) -> Optional[Dict]:
+        """Return the cached market, or None if missing or expired."""
+        with self._lock:
+            entry = self._live_entry(condition_id)
+            return entry[1] if entry is not None else None
+
+    def get_tokens(self, condition_id: str, market: Dict) -> Optional[Dict[str, Dict]]:
+        """
+        token_id -> token of ``market`` if it is the market cached under
+        condition_id, or None (missing, expired or since replaced).
+        """
+        with self._lock:
+            entry = self._live_entry(condition_id)
+            return entry[2] if entry is not None and entry[1] is market else None
+
+    def _live_entry(self, condition_id: str):
+        """Unexpired entry, marked as recently used (caller holds the lock)."""
+        entry = self._data.get(condition_id)
+        if entry is None:
+            return None
+        if entry[0] < time.time():
+            del self._data[condition_id]
+            return None
+        self._data.move_to_end(condition_id)
+        return entry
+
+    def set(self, condition_id: str, market: Dict):
+        """Cache a market; the TTL depends on whether it is already closed."""
+        ttl = self.closed_ttl if market.get("closed") else self.open_ttl
+        self._put(condition_id, time.time() + ttl, market)
+
+    def _put(self, condition_id: str, expires_at: float, market: Dict):
+        # Kept beside the market rather than on it, so save() never writes it
+        tokens_by_id = {t.get("token_id"): t for t in market.get("tokens", [])}
+        with self._lock:
+            self._data[condition_id] = (expires_at, market, tokens_by_id)
+            self._data.move_to_end(condition_id)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def load(self, path: str) -> int:
+        """Load unexpired entries saved by save(). Returns the number loaded."""
+        if not os.path.exists(path):
+            return 0
+
+        try:
+            with open(path, "rb") as f:
+                entries = json_utils.loads(f.read())
+        except (OSError, json_utils.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable market cache {path}: {e}")
+            return 0
+
+        now = time.time()
+        loaded = 0
+        for condition_id, (expires_at, market) in entries.items():
+            if expires_at > now:
+                market.pop("_tokens_by_id", None)  # Written into the file by older versions
+                self._put(condition_id, expires_at, market)
+                loaded += 1
+        return loaded
+
+    def save(self, path: str):
+        """Persist closed markets (open ones would expire before the next run anyway)."""
+        now = time.time()
+        with self._lock:
+            entries = {
+                cid: [expires_at, market]
+                for cid, (expires_at, market, _) in self._data.items()
+                if expires_at > now and market.get("closed")
+            }
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        json_utils.dump(entries, path)
+
+
+# Shared by every ClobPriceClient in the process
+MARKET_CACHE = MarketCache()
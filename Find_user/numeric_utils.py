@@ -0,0 +1,30 @@
+"""
+Smart Trader Discovery - Numeric helpers
+Optional Numba JIT decorator and fast numeric column conversion shared by the analysis modules.
+"""
+
+import numpy as np
+import pandas as pd
+
+try:
+    from numba import njit
+except ImportError:  # Numba is optional
+    def njit(*args, **kwargs):
+        """No-op replacement for ``numba.njit`` when Numba is missing."""
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+
+def to_float64(series: pd.Series) -> np.ndarray:
+    """
+    Numeric API column as a float64 array, with missing/invalid values as 0.
+    
+    Clean numbers and numeric strings are converted with one astype; only a
+    column containing invalid values falls back to element-wise to_numeric.
+    """
+    try:
+        values = series.to_numpy(dtype=np.float64)
+    except (TypeError, ValueError):
+        return pd.to_numeric(series, errors='coerce').fillna(0).to_numpy(dtype=np.float64)
+    return np.nan_to_num(values, nan=0.0, posinf=np.inf, neginf=-np.inf)
@@ -3,6 +3,7 @@ Polymarket 数据获取工具
 支持 Gamma API 和 Data API
 """
 
+import asyncio
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
@@ -11,6 +12,12 @@ import json
 from typing import Optional, Dict, List, Any
 from datetime import datetime
 
+import http_utils
+from http_utils import aiohttp, RETRY_STATUSES, MAX_RETRIES, RETRY_BACKOFF_SECONDS
+
+# 连接池大小：并发线程多于默认的 10 个连接时，多出的连接用完即丢弃，需要重新握手
+HTTP_POOL_SIZE = 64
+
 
 class PolymarketDataFetcher:
     """Polymarket API 数据获取工具类（Gamma API + Data API）"""
@@ -22,12 +29,12 @@ class PolymarketDataFetcher:
         # 初始化带重试的 Session
         self.session = requests.Session()
         retries = Retry(
-            total=3,
-            backoff_factor=1,
-            status_forcelist=[429, 500, 502, 503, 504],
+            total=MAX_RETRIES,
+            backoff_factor=RETRY_BACKOFF_SECONDS,
+            status_forcelist=list(RETRY_STATUSES),
             allowed_methods=["GET"]
         )
-        adapter = HTTPAdapter(max_retries=retries)
+        adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE, max_retries=retries)
         self.session.mount("https://", adapter)
         self.session.mount("http://", adapter)
     
@@ -78,7 +85,8 @@ class PolymarketDataFetcher:
     
     def get_markets(self, active: Optional[bool] = None, closed: Optional[bool] = None,
                     event_id: Optional[str] = None, slug: Optional[str] = None,
-                    condition_id: Optional[str] = None, limit: int = 10, offset: int = 0) -> pd.DataFrame:
+                    condition_id: Optional[str] = None, condition_ids: Optional[List[str]] = None,
+                    limit: int = 10, offset: int = 0) -> pd.DataFrame:
         """
         获取市场列表
         
@@ -88,6 +96,7 @@ class PolymarketDataFetcher:
             event_id: 按事件ID筛选
             slug: 按slug筛选
             condition_id: 按条件ID筛选
+            condition_ids: 按多个条件ID批量筛选 (一次请求)
             limit: 返回结果数量限制
             offset: 分页偏移量
         
@@ -107,6 +116,8 @@ class PolymarketDataFetcher:
             params["slug"] = slug
         if condition_id:
             params["condition_id"] = condition_id
+        if condition_ids:
+            params["condition_ids"] = list(condition_ids)
         
         return self._make_request(url, params, "市场")
     
@@ -130,7 +141,10 @@ class PolymarketDataFetcher:
         """
         # 先获取 event 详情
         event = self.get_event_by_id(event_id)
-        
+        return self._markets_from_event(event, event_id)
+
+    def _markets_from_event(self, event: Dict, event_id: str) -> pd.DataFrame:
+        """从 event 详情中提取 markets"""
         if not event:
             print(f"❌ 未找到 Event {event_id}")
             return pd.DataFrame()
@@ -236,14 +250,7 @@ class PolymarketDataFetcher:
                 # 不直接用 _make_request 里面的打印，为了静默分页
                 response = self.session.get(url, params=params)
                 response.raise_for_status()
-                data = response.json()
-                
-                # 处理不同格式
-                batch = []
-                if isinstance(data, list):
-                    batch = data
-                elif isinstance(data, dict):
-                    batch = data.get('data', [data] if data else [])
+                batch = self._trades_batch(response.json())
                 
                 if not batch:
                     break
@@ -264,6 +271,8 @@ class PolymarketDataFetcher:
         if not df.empty and not silent:
             print(f"✅ 成功获取 {len(df)} 条交易数据 (Limit: {limit})")
         return df
+
+    _trades_batch = staticmethod(http_utils.trades_batch)
     
     def get_market_holders(self, market_id: str, limit: int = 100) -> pd.DataFrame:
         """
@@ -282,34 +291,76 @@ class PolymarketDataFetcher:
         try:
             response = self.session.get(url, params=params)
             response.raise_for_status()
-            data = response.json()
-            
-            # API 返回的是一个列表，每个元素包含 'token' 和 'holders'
-            # 我们需要收集所有 token 的 holders
-            all_holders = []
-            
-            if isinstance(data, list):
-                for item in data:
-                    if 'holders' in item:
-                        holders_list = item['holders']
-                        token_id = item.get('token', '')
-                        
-                        for holder in holders_list:
-                            # 添加 token_id 到每个 holder 记录中
-                            holder['token_id'] = token_id
-                            # 统一 address 字段 (API 返回的是 proxyWallet)
-                            if 'proxyWallet' in holder:
-                                holder['address'] = holder['proxyWallet']
-                            all_holders.append(holder)
-            
-            if not all_holders:
-                return pd.DataFrame()
-                
-            return pd.DataFrame(all_holders)
+            return self._holders_to_df(response.json())
             
         except Exception as e:
             print(f"❌ 获取市场持有者失败: {e}")
             return pd.DataFrame()
+
+    @staticmethod
+    def _holders_to_df(data: Any) -> pd.DataFrame:
+        """
+        API 返回的是一个列表，每个元素包含 'token' 和 'holders'
+        我们需要收集所有 token 的 holders
+        """
+        all_holders = []
+        
+        if isinstance(data, list):
+            for item in data:
+                if 'holders' in item:
+                    holders_list = item['holders']
+                    token_id = item.get('token', '')
+                    
+                    for holder in holders_list:
+                        # 添加 token_id 到每个 holder 记录中
+                        holder['token_id'] = token_id
+                        # 统一 address 字段 (API 返回的是 proxyWallet)
+                        if 'proxyWallet' in holder:
+                            holder['address'] = holder['proxyWallet']
+                        all_holders.append(holder)
+        
+        if not all_holders:
+            return pd.DataFrame()
+            
+        return pd.DataFrame(all_holders)
+    
+    # ==================== Async API (aiohttp) ====================
+    # 与同步接口返回相同的 DataFrame，供单线程事件循环并发发起大量请求
+    
+    # 会话创建与重试逻辑见 http_utils (多个请求阶段共用一个会话以复用连接)
+    create_async_session = staticmethod(http_utils.create_async_session)
+    
+    async def _aget_json(self, session: "aiohttp.ClientSession", url: str, params: Dict) -> Any:
+        return await http_utils.aget_json(session, url, params)
+    
+    async def aget_markets_from_event(self, session: "aiohttp.ClientSession", event_id: str) -> pd.DataFrame:
+        """get_markets_from_event 的异步版本"""
+        try:
+            event = await self._aget_json(session, f"{self.gamma_api_base}/events/{event_id}", {})
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            print(f"❌ 获取事件 {event_id} 数据失败: {e}")
+            return pd.DataFrame()
+        return self._markets_from_event(event, event_id)
+    
+    async def aget_market_holders(self, session: "aiohttp.ClientSession", market_id: str, limit: int = 100) -> pd.DataFrame:
+        """get_market_holders 的异步版本"""
+        params = {"market": market_id, "limit": limit}
+        try:
+            data = await self._aget_json(session, f"{self.data_api_base}/holders", params)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            print(f"❌ 获取市场持有者失败: {e}")
+            return pd.DataFrame()
+        return self._holders_to_df(data)
+    
+    async def aget_trades(self, session: "aiohttp.ClientSession", wallet_address: str,
+                          limit: int = 100, offset: int = 0, silent: bool = False) -> pd.DataFrame:
+        """get_trades (按钱包) 的异步版本，同样自动分页"""
+        all_trades = await http_utils.aget_wallet_trades(
+            session, f"{self.data_api_base}/trades", wallet_address, limit=limit, offset=offset)
+        df = pd.DataFrame(all_trades)
+        if not df.empty and not silent:
+            print(f"✅ 成功获取 {len(df)} 条交易数据 (Limit: {limit})")
+        return df
     
 
     
@@ -0,0 +1,100 @@
+"""
+Smart Trader Discovery - Position Cache
+Two-level cache of per-wallet position fetches: a small in-process LRU in
+front of a SQLite file, so re-running the analysis (e.g. after tuning filters)
+does not hit the Data API again for wallets fetched recently.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+import json_utils
+
+logger = logging.getLogger(__name__)
+
+# L1 entries kept in memory; a run fetches each wallet once, so L1 only needs
+# to cover recent repeats and must not grow with the number of wallets
+MEMORY_CACHE_SIZE = 256
+
+
+def position_cache_key(wallet: str, endpoint: str, limit: int) -> str:
+    """Stable key for one (wallet, endpoint, limit) fetch."""
+    payload = json.dumps({"wallet": wallet.lower(), "endpoint": endpoint, "limit": limit}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class PositionCache:
+    """Thread-safe L1 LRU + L2 SQLite store of JSON position lists with a fetched_at timestamp."""
+
+    def __init__(self, path: str, memory_size: int = MEMORY_CACHE_SIZE):
+        self.path = path
+        self.memory_size = memory_size
+        self._memory: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()  # key -> (fetched_at, data)
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        # One small write per fetch: WAL avoids a full fsync on every commit
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS positions ("
+            "key TEXT PRIMARY KEY, wallet TEXT, endpoint TEXT, fetched_at REAL, data BLOB)"
+        )
+        self._conn.commit()
+
+    def get(self, wallet: str, endpoint: str, limit: int, ttl_seconds: float) -> Optional[Any]:
+        """Return the cached response, or None if missing or older than ttl_seconds."""
+        key = position_cache_key(wallet, endpoint, limit)
+        min_fetched_at = time.time() - ttl_seconds
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                row = self._conn.execute(
+                    "SELECT fetched_at, data FROM positions WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                try:
+                    entry = (row[0], json_utils.loads(row[1]))
+                except json_utils.JSONDecodeError:
+                    logger.warning(f"Ignoring corrupt cached {endpoint} positions for {wallet}")
+                    return None
+                self._remember(key, entry)
+            else:
+                self._memory.move_to_end(key)
+
+        fetched_at, data = entry
+        return data if fetched_at >= min_fetched_at else None
+
+    def set(self, wallet: str, endpoint: str, limit: int, data: Any):
+        """Store a fresh response in both levels."""
+        key = position_cache_key(wallet, endpoint, limit)
+        fetched_at = time.time()
+
+        with self._lock:
+            self._remember(key, (fetched_at, data))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO positions (key, wallet, endpoint, fetched_at, data) VALUES (?, ?, ?, ?, ?)",
+                (key, wallet, endpoint, fetched_at, json_utils.dumps(data)),
+            )
+            self._conn.commit()
+
+    def _remember(self, key: str, entry: Tuple[float, Any]):
+        """Insert into L1 (caller holds the lock), evicting the least recently used entries."""
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -4,13 +4,15 @@ Orchestrates the entire discovery process: Fetch -> Analyze -> Report
 """
 
 import logging
+import queue
 import sys
 import argparse
+import threading
 from datetime import datetime
 
+# Only lightweight imports at module level so `--help` stays fast; the
+# fetcher/analyzer (pandas, numpy, requests, ...) are imported in run_pipeline()
 from discovery_config import DiscoveryConfig, LeaderboardCategory, LeaderboardTimePeriod
-from fetch_leaderboard import LeaderboardFetcher
-from smart_trader_analyzer import SmartTraderAnalyzer
 
 # Configure logging
 logging.basicConfig(
@@ -20,6 +22,16 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Max leaderboard batches buffered between the fetch thread and the analyzer
+BATCH_QUEUE_SIZE = 4
+
+# CLI choices, computed once at import
+_CATEGORY_CHOICES = tuple(c.value for c in LeaderboardCategory)
+_PERIOD_CHOICES = tuple(t.value for t in LeaderboardTimePeriod)
+
+# Lower bound on candidates deep-analyzed per batch when --top-k is set
+MIN_PREFILTER_CANDIDATES = 200
+
 def run_pipeline(args):
     """Run the full discovery pipeline"""
     start_time = datetime.now()
@@ -27,6 +39,9 @@ def run_pipeline(args):
     logger.info("STARTING DISCOVERY PIPELINE")
     logger.info("=" * 60)
 
+    from fetch_leaderboard import LeaderboardFetcher
+    from smart_trader_analyzer import SmartTraderAnalyzer
+
     # --- Step 1: Configuration ---
     logger.info("Step 1: Configuring...")
     
@@ -38,64 +53,127 @@ def run_pipeline(args):
     else:
         config = DiscoveryConfig.default()
 
+    if args.parquet:
+        config.output.save_parquet = True
+    if args.stream_all:
+        config.output.stream_all_metrics = True
+
     # Override with specific arguments if provided
     if args.max_traders:
         # Note: In a real scenario, we might want to update the fetch limit logic
         # but for now we pass it to the fetch method
         pass 
         
-    # --- Step 2: Fetch Leaderboard ---
+    # --- Step 2 + 3: Fetch Leaderboard & Analyze (pipelined) ---
+    # Each category/time period batch is analyzed while the next one is fetched.
     logger.info("Step 2: Fetching Leaderboard Data...")
+    logger.info("Step 3: Analyzing Candidates (streaming per leaderboard batch)...")
     fetcher = LeaderboardFetcher(config)
+    analyzer = SmartTraderAnalyzer(config)
     
     # Setup categories/periods
     categories = [LeaderboardCategory(args.category)] if args.category else None
     time_periods = [LeaderboardTimePeriod(args.time_period)]
     
-    df_leaderboard = fetcher.fetch_all_categories(
-        categories=categories,
-        time_periods=time_periods,
-        max_traders_per_combo=args.max_traders
-    )
+    prefilter_limit = max(MIN_PREFILTER_CANDIDATES, (args.top_k or 0) * args.oversample)
+    
+    batches = queue.Queue(maxsize=BATCH_QUEUE_SIZE)
+    producer_errors = []
+    # Set when the consumer stops early, so the producer never blocks on a full queue
+    stop = threading.Event()
+    
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                batches.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def produce():
+        try:
+            for df_batch in fetcher.iter_categories(
+                categories=categories,
+                time_periods=time_periods,
+                max_traders_per_combo=args.max_traders
+            ):
+                if not put(df_batch):
+                    return
+        except Exception as e:
+            producer_errors.append(e)
+        finally:
+            put(None)  # Sentinel: no more batches
+    
+    producer = threading.Thread(target=produce, name="leaderboard-fetch", daemon=True)
+    producer.start()
+    
+    # Raw leaderboard rows are appended to disk per batch instead of kept in memory
+    raw_writer = fetcher.open_results_stream(prefix="pipeline_raw")
+    all_metrics = []  # Only smart traders when streaming to metrics_sink
+    metrics_sink = analyzer.open_run_stream()
+    seen_wallets = set()
+    candidate_count = 0
     
-    if df_leaderboard.empty:
+    try:
+        while (df_batch := batches.get()) is not None:
+            # Deduplicate by proxyWallet across batches, keeping the first occurrence
+            if "proxyWallet" in df_batch.columns:
+                df_batch = df_batch[~df_batch["proxyWallet"].isin(seen_wallets)]
+                df_batch = df_batch.drop_duplicates(subset=["proxyWallet"], keep="first")
+                seen_wallets.update(df_batch["proxyWallet"])
+            if df_batch.empty:
+                continue
+        
+            # Enrich profiles if requested
+            if args.enrich_profiles:
+                logger.info("Enriching with profile data...")
+                df_batch = fetcher.enrich_with_profiles(df_batch)
+            raw_writer.write(df_batch)
+        
+            df_filtered = analyzer.apply_basic_filters(df_batch)
+            if df_filtered.empty:
+                continue
+            if args.top_k:
+                # Cheap-to-expensive funnel: only deep-analyze the most promising candidates
+                df_filtered = analyzer.prefilter_candidates(df_filtered, prefilter_limit)
+            candidate_count += len(df_filtered)
+            all_metrics.extend(analyzer.analyze_candidates(df_filtered, sink=metrics_sink))
+    
+    finally:
+        stop.set()
+        raw_writer.close()
+        # Flush buffered rows and write the Parquet footer even if analysis fails
+        if metrics_sink is not None:
+            metrics_sink.close()
+    producer.join()
+    if producer_errors:
+        raise producer_errors[0]
+    
+    if raw_writer.rows == 0:
         logger.error("No leaderboard data fetched. Aborting.")
         return
-
-    # Enrich profiles if requested
-    if args.enrich_profiles:
-        logger.info("Enriching with profile data...")
-        df_leaderboard = fetcher.enrich_with_profiles(df_leaderboard)
-
-    # Save raw leaderboard data
-    fetcher.save_results(df_leaderboard, prefix="pipeline_raw")
     
-    # --- Step 3: Analyze & Filter ---
-    logger.info("Step 3: Analyzing Candidates...")
-    analyzer = SmartTraderAnalyzer(config)
-    
-    # Run analysis directly on the dataframe we just fetched
-    # We skip the load_leaderboard_data step since we already have the df
-    df_filtered = analyzer.apply_basic_filters(df_leaderboard)
-    
-    if df_filtered.empty:
+    if candidate_count == 0:
         logger.warning("No candidates passed basic filters.")
         return
 
-    all_metrics = analyzer.analyze_candidates(df_filtered)
-    smart_traders = analyzer.filter_smart_traders(all_metrics)
+    smart_traders = analyzer.filter_smart_traders(all_metrics, top_k=args.top_k)
     
     # --- Step 4: Save & Report ---
     logger.info("Step 4: Saving Results...")
-    saved_files = analyzer.save_results(smart_traders, all_metrics, prefix="pipeline_smart")
+    saved_files = analyzer.save_results(
+        smart_traders, all_metrics, prefix="pipeline_smart",
+        all_metrics_file=metrics_sink.path if metrics_sink is not None else None,
+    )
     
     duration = datetime.now() - start_time
     
     print("\n" + "=" * 60)
     print(f"PIPELINE COMPLETED in {duration}")
     print("=" * 60)
-    print(f"Total Scanned: {len(df_leaderboard)}")
-    print(f"Candidates:    {len(all_metrics)}")
+    print(f"Total Scanned: {raw_writer.rows}")
+    print(f"Candidates:    {metrics_sink.rows if metrics_sink is not None else len(all_metrics)}")
     print(f"Smart Traders: {len(smart_traders)}")
     print("-" * 60)
     
@@ -120,13 +198,21 @@ def main():
     parser.add_argument("--max-traders", type=int, default=1000,
                       help="Max traders to fetch per category")
     parser.add_argument("--category", type=str, default="OVERALL",
-                      choices=[c.value for c in LeaderboardCategory],
+                      choices=_CATEGORY_CHOICES,
                       help="Market category")
     parser.add_argument("--time-period", type=str, default="ALL",
-                      choices=[t.value for t in LeaderboardTimePeriod],
+                      choices=_PERIOD_CHOICES,
                       help="Time period")
     parser.add_argument("--enrich-profiles", action="store_true",
                       help="Fetch detailed profiles (slower)")
+    parser.add_argument("--top-k", type=int, default=None,
+                      help="Only keep the top K smart traders; deep analysis is limited to the best-scoring candidates")
+    parser.add_argument("--oversample", type=int, default=5,
+                      help="With --top-k, deep-analyze up to K * oversample candidates per batch (min 200)")
+    parser.add_argument("--parquet", action="store_true",
+                      help="Save analysis results as a partitioned Parquet dataset (requires pyarrow)")
+    parser.add_argument("--stream-all", action="store_true",
+                      help="Stream every analyzed trader to Parquet and keep only smart traders in memory (requires pyarrow)")
     
     args = parser.parse_args()
     
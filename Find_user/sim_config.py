@@ -7,9 +7,14 @@ from dataclasses import dataclass, field
 from typing import Optional
 
 
-@dataclass
+@dataclass(frozen=True)
 class SimulationConfig:
-    """Configuration for smart follower simulation"""
+    """
+    Configuration for smart follower simulation.
+    
+    Frozen (and therefore hashable) so it can be shared across workers and
+    used as a cache key; derive variants with dataclasses.replace().
+    """
     
     # Trade simulation parameters
     lookback_count: int = 10  # Number of recent trades to analyze per wallet
@@ -28,7 +33,9 @@ class SimulationConfig:
     
     # API settings
     clob_api_base: str = "https://clob.polymarket.com"
-    request_delay_seconds: float = 0.05  # Reduced for speed
+    max_concurrent_requests: int = 16  # Concurrent CLOB market lookups per wallet
+    trade_cache_ttl_seconds: float = 300.0  # Reuse fetched trade histories (output_dir/trade_cache, needs pyarrow); 0 disables
+    market_cache_file: str = "clob_market_cache.json"  # Closed markets kept between runs (in output_dir); "" disables
     max_retries: int = 3
     
     # Output settings
@@ -38,6 +45,7 @@ class SimulationConfig:
     
     # Parallel processing
     max_workers: int = 10  # Increased for speed
+    compute_processes: int = 0  # >0: run the CPU-bound simulation phase of a batch in worker processes
 
 
 @dataclass
@@ -16,12 +16,18 @@ Usage:
 """
 
 import argparse
-import json
+import asyncio
+import contextlib
+import csv
+import heapq
+import importlib.util
 import logging
+import multiprocessing
 import os
+import threading
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from dataclasses import asdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, fields, replace
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 
@@ -30,8 +36,20 @@ import pandas as pd
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
-from scipy import stats
 
+try:
+    import aiohttp
+except ImportError:  # aiohttp is optional; fall back to a thread pool
+    aiohttp = None
+
+try:
+    import uvloop
+except ImportError:  # uvloop is optional; the default asyncio loop works too
+    uvloop = None
+
+import json_utils
+import stats_kernels
+from market_cache import MARKET_CACHE
 from sim_config import SimulationConfig, SimulationResult, DEFAULT_SIM_CONFIG
 from polymarket_data_fetcher import PolymarketDataFetcher
 
@@ -43,39 +61,96 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Low-cardinality trade columns stored as pandas categoricals
+TRADE_CATEGORY_COLUMNS = ('side', 'asset', 'conditionId', 'outcome')
+
+# SimulationResult field names, resolved once instead of per-result asdict() deep copies
+RESULT_FIELDS = tuple(f.name for f in fields(SimulationResult))
+# Flat CSV columns ('pnl_list' is too large for a flat CSV)
+PROGRESS_CSV_FIELDS = tuple(name for name in RESULT_FIELDS if name != 'pnl_list')
+PROGRESS_FLUSH_EVERY = 16  # Wallets between flushes of the progress CSV
+
+# Per-result fields aggregated by print_summary
+SUMMARY_DTYPE = np.dtype([('roi', 'f8'), ('win_rate', 'f8'), ('sharpe', 'f8'), ('significant', '?')])
+
+
+def result_to_dict(result: SimulationResult, names=RESULT_FIELDS) -> Dict[str, Any]:
+    """Shallow dict of a SimulationResult (asdict() would deep-copy pnl_list)."""
+    return {name: getattr(result, name) for name in names}
 
-class NumpyEncoder(json.JSONEncoder):
-    """Custom JSON encoder for numpy types."""
+
+# Retry policy shared by the requests session and the aiohttp fetcher
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+MAX_RETRIES = 3
+RETRY_BACKOFF_SECONDS = 1.0
+
+
+def _make_session(max_workers: int) -> requests.Session:
+    """Build a keep-alive session with retries and a pool sized for the worker threads."""
+    session = requests.Session()
+    session.headers.update({
+        "Connection": "keep-alive",
+        "Accept-Encoding": "gzip",
+    })
     
-    def default(self, obj):
-        if isinstance(obj, (np.integer, np.int64, np.int32)):
-            return int(obj)
-        elif isinstance(obj, (np.floating, np.float64, np.float32)):
-            return float(obj)
-        elif isinstance(obj, (np.bool_, bool)):
-            return bool(obj)
-        elif isinstance(obj, np.ndarray):
-            return obj.tolist()
-        return super().default(obj)
+    retries = Retry(
+        total=MAX_RETRIES,
+        backoff_factor=RETRY_BACKOFF_SECONDS,
+        status_forcelist=list(RETRY_STATUSES),
+        allowed_methods=["GET"]
+    )
+    adapter = HTTPAdapter(
+        pool_connections=max_workers,
+        pool_maxsize=max(32, max_workers * 4),
+        max_retries=retries
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+# Shared by every ClobPriceClient so all threads reuse the same pooled connections.
+# Created on first use from the active config rather than at import.
+_SESSION: Optional[requests.Session] = None
+_SESSION_WORKERS = 0
+_SESSION_LOCK = threading.Lock()
+
+
+def _shared_session(max_workers: int) -> requests.Session:
+    """The process-wide session, rebuilt with a larger pool when more worker threads are configured."""
+    global _SESSION, _SESSION_WORKERS
+    with _SESSION_LOCK:
+        if _SESSION is None or max_workers > _SESSION_WORKERS:
+            _SESSION = _make_session(max_workers)
+            _SESSION_WORKERS = max_workers
+        return _SESSION
+
+
+@dataclass
+class ReplayState:
+    """Virtual portfolio after a trade replay, as parallel arrays."""
+    
+    # Per asset, in order of first appearance
+    asset_ids: np.ndarray
+    condition_ids: np.ndarray
+    size: np.ndarray
+    cost_basis: np.ndarray
+    avg_price: np.ndarray
+    
+    # Per realized sale, in trade order
+    realized_pnl_abs: np.ndarray
+    realized_pnl_pct: np.ndarray
+    realized_invested: np.ndarray  # entry price * size sold
 
 
 class ClobPriceClient:
     """Client for fetching current market prices from CLOB API"""
     
-    def __init__(self, base_url: str = "https://clob.polymarket.com"):
+    def __init__(self, base_url: str = "https://clob.polymarket.com",
+                 max_workers: int = DEFAULT_SIM_CONFIG.max_workers):
         self.base_url = base_url
-        self.session = requests.Session()
-        self._market_cache = {}  # Cache market data to reduce API calls
-        
-        retries = Retry(
-            total=3,
-            backoff_factor=1,
-            status_forcelist=[429, 500, 502, 503, 504],
-            allowed_methods=["GET"]
-        )
-        adapter = HTTPAdapter(max_retries=retries)
-        self.session.mount("https://", adapter)
-        self.session.mount("http://", adapter)
+        self.session = _shared_session(max_workers)
+        self._market_cache = MARKET_CACHE  # Process-wide, shared with other clients
     
     def get_market(self, condition_id: str) -> Optional[Dict]:
         """
@@ -83,8 +158,9 @@ class ClobPriceClient:
         Returns market data including tokens with current prices.
         """
         # Check cache first
-        if condition_id in self._market_cache:
-            return self._market_cache[condition_id]
+        market = self._market_cache.get(condition_id)
+        if market is not None:
+            return market
         
         url = f"{self.base_url}/markets/{condition_id}"
         
@@ -92,12 +168,61 @@ class ClobPriceClient:
             response = self.session.get(url, timeout=10)
             response.raise_for_status()
             market = response.json()
-            self._market_cache[condition_id] = market
+            self._market_cache.set(condition_id, market)
             return market
         except Exception as e:
             logger.debug(f"Failed to fetch market {condition_id[:16]}...: {e}")
             return None
     
+    def prefetch_markets(self, condition_ids: List[str], max_concurrency: int = 16):
+        """
+        Fetch all uncached markets concurrently and store them in the cache.
+        
+        Uses aiohttp when installed, otherwise a thread pool over get_market().
+        Markets that fail here are simply left uncached, so a later
+        get_market() call retries them through the session's retry policy.
+        """
+        missing = [cid for cid in dict.fromkeys(condition_ids)
+                   if cid and cid not in self._market_cache]
+        if not missing:
+            return
+        
+        if aiohttp is not None:
+            run = uvloop.run if uvloop is not None else asyncio.run
+            run(self._fetch_markets_async(missing, max_concurrency))
+        else:
+            with ThreadPoolExecutor(max_workers=min(max_concurrency, len(missing))) as executor:
+                list(executor.map(self.get_market, missing))
+    
+    async def _fetch_markets_async(self, condition_ids: List[str], max_concurrency: int):
+        """
+        Issue all market GETs on one event loop, bounded by a semaphore.
+        Retryable statuses back off exponentially, like the requests session.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        connector = aiohttp.TCPConnector(limit=0, limit_per_host=max_concurrency, ttl_dns_cache=300)
+        timeout = aiohttp.ClientTimeout(total=10)
+        
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            async def fetch(condition_id: str):
+                url = f"{self.base_url}/markets/{condition_id}"
+                for attempt in range(MAX_RETRIES + 1):
+                    async with semaphore:
+                        try:
+                            async with session.get(url) as response:
+                                if response.status not in RETRY_STATUSES:
+                                    response.raise_for_status()
+                                    self._market_cache.set(condition_id, await response.json(content_type=None))
+                                    return
+                        except Exception as e:
+                            logger.debug(f"Failed to fetch market {condition_id[:16]}...: {e}")
+                            return
+                    # Back off outside the semaphore so other requests keep flowing
+                    if attempt < MAX_RETRIES:
+                        await asyncio.sleep(RETRY_BACKOFF_SECONDS * 2 ** attempt)
+            
+            await asyncio.gather(*(fetch(cid) for cid in condition_ids))
+    
     def get_token_current_price(self, condition_id: str, token_id: str) -> Optional[Dict]:
         """
         Get the current price and winner status for a specific token.
@@ -114,22 +239,37 @@ class ClobPriceClient:
         if not market:
             return None
         
-        tokens = market.get("tokens", [])
+        return self.extract_token_info(market, token_id, self.get_token_index(condition_id, market))
+    
+    def get_token_index(self, condition_id: str, market: Dict) -> Optional[Dict[str, Dict]]:
+        """token_id -> token of a cached market (built once when it was cached), or None."""
+        return self._market_cache.get_tokens(condition_id, market)
+    
+    @staticmethod
+    def extract_token_info(market: Dict, token_id: str,
+                           tokens_by_id: Optional[Dict[str, Dict]] = None) -> Optional[Dict]:
+        """
+        Pick the price/winner info of one token out of a market response.
         
-        for token in tokens:
-            if token.get("token_id") == token_id:
-                return {
-                    "price": float(token.get("price", 0)),
-                    "winner": token.get("winner", False),
-                    "outcome": token.get("outcome", "Unknown"),
-                    "market_closed": market.get("closed", False),
-                }
+        tokens_by_id (see get_token_index) turns the token scan into one dict lookup.
+        """
+        if tokens_by_id is not None:
+            token = tokens_by_id.get(token_id)
+        else:
+            token = next((t for t in market.get("tokens", []) if t.get("token_id") == token_id), None)
+        if token is None:
+            return None
         
-        return None
+        return {
+            "price": float(token.get("price", 0)),
+            "winner": token.get("winner", False),
+            "outcome": token.get("outcome", "Unknown"),
+            "market_closed": market.get("closed", False),
+        }
     
     def clear_cache(self):
         """Clear the market cache."""
-        self._market_cache = {}
+        self._market_cache.clear()
 
 
 class SmartFollowerSimulator:
@@ -146,7 +286,53 @@ class SmartFollowerSimulator:
     def __init__(self, config: Optional[SimulationConfig] = None):
         self.config = config or DEFAULT_SIM_CONFIG
         self.fetcher = PolymarketDataFetcher()
-        self.clob_client = ClobPriceClient(self.config.clob_api_base)
+        self.clob_client = ClobPriceClient(self.config.clob_api_base, max_workers=self.config.max_workers)
+        
+        # pandas needs pyarrow for the Parquet trade cache
+        self._parquet_available = importlib.util.find_spec("pyarrow") is not None
+        
+        # Reuse closed markets fetched by previous runs
+        if self.config.market_cache_file:
+            loaded = MARKET_CACHE.load(self._market_cache_path())
+            if loaded:
+                logger.info(f"Loaded {loaded} cached markets")
+    
+    def _market_cache_path(self) -> str:
+        return os.path.join(self.config.output_dir, self.config.market_cache_file)
+    
+    def _cached_get_trades(self, wallet_address: str, limit: int) -> pd.DataFrame:
+        """
+        get_trades() with a short-lived Parquet cache per (wallet, limit).
+        
+        Reruns and wallets repeated across batches within trade_cache_ttl_seconds
+        skip the API. Without pyarrow (or with a TTL of 0) it always fetches.
+        """
+        ttl = self.config.trade_cache_ttl_seconds
+        cache_path = os.path.join(self.config.output_dir, "trade_cache", f"{wallet_address}_{limit}.parquet")
+        
+        if ttl > 0 and self._parquet_available:
+            try:
+                if time.time() - os.path.getmtime(cache_path) < ttl:
+                    return pd.read_parquet(cache_path)
+            except OSError:
+                pass  # Not cached yet
+            except Exception as e:
+                logger.debug(f"Ignoring unreadable trade cache {cache_path}: {e}")
+        
+        df = self.fetcher.get_trades(
+            wallet_address=wallet_address,
+            limit=limit,
+            silent=True
+        )
+        
+        if ttl > 0 and self._parquet_available and not df.empty:
+            try:
+                os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+                df.to_parquet(cache_path, compression="zstd", index=False)
+            except Exception as e:
+                logger.debug(f"Failed to cache trades for {wallet_address[:16]}...: {e}")
+        
+        return df
     
     def fetch_recent_trades(self, wallet_address: str, limit: int = None) -> List[Dict]:
         """
@@ -161,22 +347,18 @@ class SmartFollowerSimulator:
         """
         limit = limit or self.config.lookback_count
         
-        df = self.fetcher.get_trades(
-            wallet_address=wallet_address,
-            limit=limit,
-            silent=True
-        )
+        df = self._cached_get_trades(wallet_address, limit)
         
         if df.empty:
             return []
         
-        # Convert to list of dicts
-        trades = df.to_dict('records')
-        
-        # Filter to BUY trades only (we simulate following their buys)
-        buy_trades = [t for t in trades if t.get('side', '').upper() == 'BUY']
+        if 'side' not in df.columns:
+            return []
         
-        return buy_trades
+        # Filter to BUY trades only (we simulate following their buys),
+        # before building any per-row dicts
+        is_buy = df['side'].fillna('').astype(str).str.upper() == 'BUY'
+        return df[is_buy].to_dict('records')
     
     def simulate_single_trade(self, trade: Dict) -> Optional[Dict]:
         """
@@ -270,66 +452,17 @@ class SmartFollowerSimulator:
                 "kelly_fraction": 0.0,
             }
         
-        returns = np.array(pnl_list)
+        returns = np.asarray(pnl_list, dtype=np.float64)
+        rf = self.config.risk_free_rate
         
-        # Sharpe Ratio
-        # Normalized by sqrt(n) as a proxy for annualization
-        std_returns = np.std(returns)
-        if std_returns > 0:
-            sharpe = (np.mean(returns) - self.config.risk_free_rate) / std_returns * np.sqrt(len(returns))
-        else:
-            sharpe = 0.0
-        
-        # Sortino Ratio (only downside deviation)
-        downside_returns = returns[returns < 0]
-        if len(downside_returns) > 0:
-            downside_std = np.std(downside_returns)
-            if downside_std > 0:
-                sortino = (np.mean(returns) - self.config.risk_free_rate) / downside_std * np.sqrt(len(returns))
-            else:
-                sortino = float('inf') if np.mean(returns) > 0 else 0.0
-        else:
-            # No negative returns
-            sortino = float('inf') if np.mean(returns) > 0 else 0.0
+        # Sharpe, Sortino, max drawdown, t statistic and Kelly in one kernel call
+        sharpe, sortino, max_drawdown, t_stat, kelly, spread = stats_kernels.summary_statistics(returns, rf)
         
-        # Cap sortino at a reasonable value for display
+        # Sortino is capped for display
         sortino = min(sortino, 100.0)
         
-        # Max Drawdown
-        cumulative = np.cumsum(returns)
-        running_max = np.maximum.accumulate(cumulative)
-        drawdowns = running_max - cumulative
-        max_drawdown = np.max(drawdowns) if len(drawdowns) > 0 else 0.0
-        
         # P-Value (one-sample t-test, H0: mean <= 0)
-        if len(returns) >= 2 and std_returns > 0:
-            t_stat, p_two_tailed = stats.ttest_1samp(returns, 0)
-            # One-tailed: we only care if mean > 0
-            p_value = p_two_tailed / 2 if t_stat > 0 else 1 - p_two_tailed / 2
-        else:
-            p_value = 1.0
-        
-        # Kelly Criterion
-        wins = returns[returns > 0]
-        losses = returns[returns < 0]
-        
-        if len(wins) > 0 and len(losses) > 0:
-            win_rate = len(wins) / len(returns)
-            avg_win = np.mean(wins)
-            avg_loss = abs(np.mean(losses))
-            
-            if avg_loss > 0:
-                b = avg_win / avg_loss  # Win/loss ratio
-                kelly = (b * win_rate - (1 - win_rate)) / b
-            else:
-                kelly = win_rate  # All wins, no losses
-        elif len(wins) > 0:
-            kelly = 1.0  # All wins
-        else:
-            kelly = 0.0  # No wins
-        
-        # Clamp kelly to reasonable range
-        kelly = max(0.0, min(kelly, 1.0))
+        p_value = stats_kernels.pvalue_from_t(t_stat, len(returns), spread)
         
         return {
             "sharpe_ratio": round(sharpe, 4),
@@ -339,7 +472,113 @@ class SmartFollowerSimulator:
             "kelly_fraction": round(kelly, 4),
         }
     
-    def run_simulation(self, wallet_address: str) -> SimulationResult:
+    def fetch_trade_history(self, wallet_address: str) -> pd.DataFrame:
+        """
+        Fetch a wallet's recent trades (BUY and SELL), oldest first.
+        
+        Fetches lookback_count * 2 trades to increase the chance of finding
+        the entry for a sale.
+        """
+        fetch_limit = self.config.lookback_count * 2
+        df = self._cached_get_trades(wallet_address, fetch_limit)
+        
+        if df.empty:
+            return df
+        
+        # Order by timestamp ascending (oldest first) to replay history
+        if 'timestamp' in df.columns:
+            df['timestamp'] = pd.to_numeric(df['timestamp'])
+            timestamps = df['timestamp']
+            # The API returns newest first, so usually an O(N) reversal is enough
+            if timestamps.is_monotonic_increasing:
+                pass
+            elif timestamps.is_monotonic_decreasing:
+                df = df.iloc[::-1]
+            else:
+                df = df.sort_values('timestamp', kind='stable')
+        else:
+            # Fallback: assume API returns newest first, so reverse it
+            df = df.iloc[::-1]
+        
+        # Repeated strings as categoricals: histories are held for the whole batch
+        return df.astype({col: 'category' for col in TRADE_CATEGORY_COLUMNS if col in df.columns})
+    
+    def replay_trades(self, df: pd.DataFrame) -> ReplayState:
+        """
+        Replay trades in order on a virtual portfolio.
+        
+        Args:
+            df: Trades sorted oldest first (as returned by fetch_trade_history).
+        
+        Returns:
+            ReplayState with per-asset positions and per-sale realized PnL as arrays.
+        """
+        def column(name: str, default) -> pd.Series:
+            return df[name] if name in df.columns else pd.Series(default, index=df.index)
+        
+        def labels(name: str, upper: bool = False) -> np.ndarray:
+            """String column as an array, converting only the distinct values (categories)."""
+            values = column(name, '').astype('category')
+            categories = values.cat.categories.astype(str)
+            if upper:
+                categories = categories.str.upper()
+            # Missing values have code -1, which picks the trailing ''
+            return np.append(categories.to_numpy(dtype=object), '')[values.cat.codes.to_numpy()]
+        
+        def floats(name: str) -> np.ndarray:
+            """Numeric column as float64, parsing only when the API returned strings."""
+            values = column(name, 0.0)
+            if not pd.api.types.is_numeric_dtype(values):
+                values = pd.to_numeric(values, errors='coerce')
+            return np.nan_to_num(values.to_numpy(dtype=np.float64), nan=0.0)
+        
+        assets = labels('asset')
+        sides = labels('side', upper=True)
+        prices = floats('price')
+        sizes = floats('size')
+        conditions = labels('conditionId')
+        
+        valid = (assets != '') & (prices > 0) & (sizes > 0)
+        assets, sides, prices, sizes, conditions = (
+            assets[valid], sides[valid], prices[valid], sizes[valid], conditions[valid]
+        )
+        
+        # Asset codes in order of first appearance
+        codes, unique_assets = pd.factorize(assets)
+        first_seen = np.unique(codes, return_index=True)[1]
+        
+        # Slippage as one vector multiply: we buy slightly higher and sell slightly lower
+        is_buy = sides == 'BUY'
+        slippage = self.config.slippage_bps / 10000
+        sim_prices = prices * np.where(is_buy, 1 + slippage, 1 - slippage)
+        
+        (realized, pnl_abs, pnl_pct, sell_size, entry_price,
+         pos_size, cost_basis, avg_price) = stats_kernels.replay_positions(
+            codes.astype(np.int64), is_buy, sides == 'SELL', sim_prices, sizes, len(unique_assets)
+        )
+        
+        return ReplayState(
+            asset_ids=np.asarray(unique_assets, dtype=object),
+            condition_ids=conditions[first_seen],
+            size=pos_size,
+            cost_basis=cost_basis,
+            avg_price=avg_price,
+            realized_pnl_abs=pnl_abs[realized],
+            realized_pnl_pct=pnl_pct[realized],
+            realized_invested=entry_price[realized] * sell_size[realized],
+        )
+    
+    def get_open_positions(self, state: ReplayState) -> np.ndarray:
+        """Indices of assets still held after replay, skipping dust (cost basis < min_position_value)."""
+        return np.flatnonzero(
+            (state.size > 0.0001)
+            & (state.cost_basis >= self.config.min_position_value)
+            & (state.condition_ids != '')
+        )
+    
+    def run_simulation(self, wallet_address: str, history: Optional[pd.DataFrame] = None,
+                       markets: Optional[Dict[str, Dict]] = None,
+                       state: Optional[ReplayState] = None) -> SimulationResult:
         """
         Run full mirror trading simulation for a single wallet.
         
@@ -352,6 +591,10 @@ class SmartFollowerSimulator:
         
         Args:
             wallet_address: The wallet to simulate.
+            history: Trades already returned by fetch_trade_history (skips the fetch).
+            markets: conditionId -> market JSON for the open positions (skips all
+                CLOB requests, so the simulation is pure computation).
+            state: replay_trades(history) already computed by the caller (skips the replay).
         
         Returns:
             SimulationResult with all metrics.
@@ -359,187 +602,90 @@ class SmartFollowerSimulator:
         result = SimulationResult(wallet_address=wallet_address)
         
         try:
-            # 1. Fetch recent trades (limit increased to ensure we capture open/close cycles)
-            # Fetch more trades to increase chance of finding the entry for a sale
-            fetch_limit = self.config.lookback_count * 2 
-            df = self.fetcher.get_trades(
-                wallet_address=wallet_address,
-                limit=fetch_limit,
-                silent=True
-            )
+            # 1. Fetch recent trades
+            df = history if history is not None else self.fetch_trade_history(wallet_address)
             
             if df.empty:
                 result.error_message = "No trades found"
                 return result
             
-            # Sort by timestamp ascending (oldest first) to replay history
-            if 'timestamp' in df.columns:
-                df['timestamp'] = pd.to_numeric(df['timestamp'])
-                df = df.sort_values('timestamp', ascending=True)
-            else:
-                # Fallback: assume API returns newest first, so reverse it
-                df = df.iloc[::-1]
-            
-            trades = df.to_dict('records')
-            result.trades_simulated = len(trades)
+            result.trades_simulated = len(df)
             
             # 2. Replay history
-            # Portfolio state: asset_id -> { 'size': float, 'cost_basis': float, 'avg_price': float }
-            portfolio = {} 
-            closed_pnl_records = [] # List of realized PnL info
-            
-            slippage_bps = self.config.slippage_bps / 10000
-            
-            for trade in trades:
-                asset_id = str(trade.get('asset', ''))
-                side = trade.get('side', '').upper()
-                price = float(trade.get('price', 0))
-                size = float(trade.get('size', 0))
-                condition_id = str(trade.get('conditionId', ''))
-                
-                if not asset_id or price <= 0 or size <= 0:
-                    continue
-                
-                # Initialize position if new
-                if asset_id not in portfolio:
-                    portfolio[asset_id] = {'size': 0.0, 'cost_basis': 0.0, 'avg_price': 0.0, 'condition_id': condition_id}
-                
-                position = portfolio[asset_id]
-                
-                if side == 'BUY':
-                    # Apply slippage: We buy slightly higher
-                    sim_buy_price = price * (1 + slippage_bps)
-                    cost = sim_buy_price * size
-                    
-                    # Update weighted average price
-                    new_size = position['size'] + size
-                    new_cost_basis = position['cost_basis'] + cost
-                    
-                    position['size'] = new_size
-                    position['cost_basis'] = new_cost_basis
-                    if new_size > 0:
-                        position['avg_price'] = new_cost_basis / new_size
-                        
-                elif side == 'SELL':
-                    # Check if we have inventory to sell
-                    # If we don't have inventory (e.g. bought before our lookback window), 
-                    # we ignore this sell or assume 0 cost? 
-                    # Better to ignore to avoid skewing stats with 100% profit.
-                    if position['size'] <= 0.0001:
-                        continue
-                        
-                    # Determine how much we can sell
-                    sell_size = min(size, position['size'])
-                    
-                    # Apply slippage: We sell slightly lower
-                    sim_sell_price = price * (1 - slippage_bps)
-                    
-                    # Calculate Realized PnL
-                    # Profit = (Sell Price - Avg Buy Price) * Size
-                    avg_entry_price = position['avg_price']
-                    trade_pnl_abs = (sim_sell_price - avg_entry_price) * sell_size
-                    trade_pnl_pct = (sim_sell_price - avg_entry_price) / avg_entry_price if avg_entry_price > 0 else 0
-                    
-                    closed_pnl_records.append({
-                        'type': 'REALIZED',
-                        'asset_id': asset_id,
-                        'pnl_abs': trade_pnl_abs,
-                        'pnl_pct': trade_pnl_pct,
-                        'size': sell_size,
-                        'entry_price': avg_entry_price,
-                        'exit_price': sim_sell_price
-                    })
-                    
-                    # Update position (reduce size and cost basis proportionally)
-                    pct_sold = sell_size / position['size']
-                    position['size'] -= sell_size
-                    position['cost_basis'] *= (1 - pct_sold)
-                    # avg_price remains the same
+            if state is None:
+                state = self.replay_trades(df)
             
             # 3. Calculate Unrealized PnL for remaining positions
-            trades_with_price = len(closed_pnl_records) # Start count with realized trades
+            open_idx = self.get_open_positions(state)
             
-            for asset_id, position in portfolio.items():
-                remaining_size = position['size']
-                if remaining_size <= 0.0001:
-                    continue
-                
-                # Skip dust positions (cost basis < min_position_value)
-                cost_basis = position.get('cost_basis', 0)
-                if cost_basis < self.config.min_position_value:
-                    continue
-                
-                # Fetch current market price
-                condition_id = position.get('condition_id')
-                if not condition_id:
-                    continue
-                    
-                token_info = self.clob_client.get_token_current_price(condition_id, asset_id)
+            if markets is None:
+                # Fetch all needed markets at once (a no-op when run_batch already prefetched them)
+                condition_ids = state.condition_ids[open_idx].tolist()
+                self.clob_client.prefetch_markets(
+                    condition_ids,
+                    max_concurrency=self.config.max_concurrent_requests
+                )
+                markets = {cid: self.clob_client.get_market(cid) for cid in condition_ids}
+            
+            # Current price per open position; NaN where no price is available
+            current_price = np.full(len(open_idx), np.nan)
+            for j, k in enumerate(open_idx):
+                cid = state.condition_ids[k]
+                market = markets.get(cid)
+                # The index is only available in the process that cached the market
+                token_info = ClobPriceClient.extract_token_info(
+                    market, state.asset_ids[k], self.clob_client.get_token_index(cid, market)
+                ) if market else None
                 
                 if not token_info:
                     continue
                 
-                current_price = token_info["price"]
-                market_closed = token_info["market_closed"]
-                is_winner = token_info["winner"]
+                current_price[j] = token_info["price"]
                 
                 # Handle Settlement
-                if market_closed and is_winner is not None:
-                    current_price = 1.0 if is_winner else 0.0
-                
-                # Calculate Unrealized PnL
-                avg_entry_price = position['avg_price']
-                current_val = current_price * remaining_size
-                cost_basis = position['cost_basis'] # Or avg_entry_price * remaining_size
-                
-                # Adjust cost basis for remaining size if needed (it should match)
-                cost_basis = avg_entry_price * remaining_size
-                
-                pnl_abs = current_val - cost_basis
-                pnl_pct = (current_price - avg_entry_price) / avg_entry_price if avg_entry_price > 0 else 0
-                
-                closed_pnl_records.append({
-                    'type': 'UNREALIZED',
-                    'asset_id': asset_id,
-                    'pnl_abs': pnl_abs,
-                    'pnl_pct': pnl_pct,
-                    'size': remaining_size,
-                    'entry_price': avg_entry_price,
-                    'exit_price': current_price,
-                    'market_status': 'CLOSED' if market_closed else 'OPEN'
-                })
-                trades_with_price += 1
-                
-                # Rate limit for loop
-                time.sleep(self.config.request_delay_seconds)
-
-            # 4. Compile Results
-            if not closed_pnl_records:
+                if token_info["market_closed"] and token_info["winner"] is not None:
+                    current_price[j] = 1.0 if token_info["winner"] else 0.0
+            
+            priced = ~np.isnan(current_price)
+            open_idx, current_price = open_idx[priced], current_price[priced]
+            remaining_size = state.size[open_idx]
+            avg_entry_price = state.avg_price[open_idx]
+            
+            # Unrealized PnL, with cost basis recomputed from the average entry price
+            unrealized_invested = avg_entry_price * remaining_size
+            unrealized_pnl_abs = current_price * remaining_size - unrealized_invested
+            with np.errstate(divide='ignore', invalid='ignore'):
+                unrealized_pnl_pct = np.where(
+                    avg_entry_price > 0, (current_price - avg_entry_price) / avg_entry_price, 0.0
+                )
+            
+            # 4. Compile Results (realized sales first, then open positions)
+            pnl_pct = np.concatenate([state.realized_pnl_pct, unrealized_pnl_pct])
+            pnl_abs = np.concatenate([state.realized_pnl_abs, unrealized_pnl_abs])
+            
+            if len(pnl_pct) == 0:
                 result.error_message = "No closed trades or open positions with price found"
                 return result
-                
-            pnl_pct_list = [r['pnl_pct'] for r in closed_pnl_records]
-            pnl_abs_list = [r['pnl_abs'] for r in closed_pnl_records]
             
-            result.trades_with_price = trades_with_price
-            result.pnl_list = pnl_pct_list
+            result.trades_with_price = len(pnl_pct)
+            result.pnl_list = pnl_pct.tolist()
             
             # Metrics
-            result.total_simulated_pnl = sum(pnl_abs_list)
+            result.total_simulated_pnl = float(pnl_abs.sum())
             
             # Approximate total capital deployed (sum of all entry costs)
             # This is a simplification for ROI calc
-            total_invested = sum([r['entry_price'] * r['size'] for r in closed_pnl_records])
+            total_invested = state.realized_invested.sum() + unrealized_invested.sum()
             
             if total_invested > 0:
-                result.simulated_roi_percent = (result.total_simulated_pnl / total_invested) * 100
+                result.simulated_roi_percent = float(result.total_simulated_pnl / total_invested * 100)
             else:
                 result.simulated_roi_percent = 0.0
                 
-            result.simulated_win_rate = len([p for p in pnl_pct_list if p > 0]) / len(pnl_pct_list)
+            result.simulated_win_rate = float(np.mean(pnl_pct > 0))
             
             # Advanced Stats
-            stats_result = self.calculate_statistics(pnl_pct_list)
+            stats_result = self.calculate_statistics(pnl_pct)
             result.sharpe_ratio = stats_result["sharpe_ratio"]
             result.sortino_ratio = stats_result["sortino_ratio"]
             result.max_drawdown = stats_result["max_drawdown"]
@@ -552,9 +698,8 @@ class SmartFollowerSimulator:
             
         except Exception as e:
             result.error_message = str(e)
-            logger.error(f"Simulation failed for {wallet_address[:16]}...: {e}")
-            import traceback
-            logger.error(traceback.format_exc())
+            # Traceback is attached by logging itself, only when the record is emitted
+            logger.exception(f"Simulation failed for {wallet_address[:16]}...: {e}")
         
         return result
     
@@ -570,43 +715,110 @@ class SmartFollowerSimulator:
             List of SimulationResult objects.
         """
         max_workers = max_workers or self.config.max_workers
+        # A per-call worker count above the configured one needs a larger connection pool
+        self.clob_client.session = _shared_session(max_workers)
         results = []
         
         logger.info(f"Starting batch simulation for {len(wallets)} wallets (workers={max_workers})")
         
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # Phase 1: fetch every wallet's trade history
+            histories = {}
             future_to_wallet = {
-                executor.submit(self.run_simulation, wallet): wallet 
+                executor.submit(self.fetch_trade_history, wallet): wallet
                 for wallet in wallets
             }
-            
-            for i, future in enumerate(as_completed(future_to_wallet)):
-                wallet = future_to_wallet[future]
+            for future in as_completed(future_to_wallet):
                 try:
-                    result = future.result()
-                    results.append(result)
-                    
-                    # Progress logging
-                    processed_count = i + 1
-                    logger.info(f"Progress: {processed_count}/{len(wallets)} wallets processed ({(processed_count/len(wallets)*100):.1f}%)")
-                    
-                    # Incremental save (simple append to CSV)
-                    temp_csv = os.path.join(self.config.output_dir, "simulation_temp_progress.csv")
-                    is_new_file = not os.path.exists(temp_csv)
-                    
-                    df_res = pd.DataFrame([asdict(result)])
-                    # Exclude 'pnl_list' from CSV as it's too large/complex for flat CSV
-                    if 'pnl_list' in df_res.columns:
-                        df_res = df_res.drop(columns=['pnl_list'])
-                    
-                    df_res.to_csv(temp_csv, mode='a', header=is_new_file, index=False, encoding='utf-8-sig')
-                    
+                    histories[future_to_wallet[future]] = future.result()
                 except Exception as e:
-                    logger.error(f"Failed to process {wallet[:16]}...: {e}")
-                    results.append(SimulationResult(
-                        wallet_address=wallet,
-                        error_message=str(e)
-                    ))
+                    # Leave it to run_simulation to retry and record the error
+                    logger.debug(f"History fetch failed for {future_to_wallet[future][:16]}...: {e}")
+            
+            # Phase 2: fetch each unique open-position market once for the whole batch
+            # (the replay states are kept for phase 3 instead of replaying again)
+            states = {}
+            wallet_conditions = {}
+            for wallet, df in histories.items():
+                if df.empty:
+                    continue
+                state = states[wallet] = self.replay_trades(df)
+                wallet_conditions[wallet] = state.condition_ids[self.get_open_positions(state)].tolist()
+            condition_ids = set().union(*wallet_conditions.values())
+            
+            logger.info(f"Prefetching {len(condition_ids)} unique markets")
+            self.clob_client.prefetch_markets(
+                list(condition_ids),
+                max_concurrency=max(self.config.max_concurrent_requests, max_workers)
+            )
+            
+            # Phase 3: simulate from the cached histories and markets. This is CPU-bound,
+            # so with compute_processes it runs in worker processes instead of threads.
+            # The pool is shut down even if the progress loop raises (or on Ctrl-C)
+            if self.config.compute_processes > 0:
+                compute_pool_ctx = ProcessPoolExecutor(
+                    max_workers=self.config.compute_processes,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_compute_worker,
+                    initargs=(self.config,)
+                )
+            else:
+                compute_pool_ctx = contextlib.nullcontext()
+            
+            with compute_pool_ctx as compute_pool:
+                future_to_wallet = {}
+                for wallet in wallets:
+                    history = histories.get(wallet)
+                    if history is None:
+                        # History fetch failed: run_simulation retries it and records any error
+                        future = executor.submit(self.run_simulation, wallet)
+                    else:
+                        markets = {cid: self.clob_client.get_market(cid)
+                                   for cid in wallet_conditions.get(wallet, [])}
+                        state = states.get(wallet)
+                        if compute_pool is not None:
+                            future = compute_pool.submit(_compute_in_worker, wallet, history, markets, state)
+                        else:
+                            future = executor.submit(self.run_simulation, wallet, history, markets, state)
+                    future_to_wallet[future] = wallet
+            
+                # Incremental save: one progress CSV kept open for the whole batch
+                os.makedirs(self.config.output_dir, exist_ok=True)
+                temp_csv = os.path.join(self.config.output_dir, "simulation_temp_progress.csv")
+                # Checked once per batch; an empty leftover file still needs the header
+                is_new_file = not os.path.exists(temp_csv) or os.path.getsize(temp_csv) == 0
+                # Only a new file gets the BOM; appending one would land mid-file
+                encoding = 'utf-8-sig' if is_new_file else 'utf-8'
+            
+                with open(temp_csv, 'a', newline='', encoding=encoding) as progress_file:
+                    writer = csv.DictWriter(progress_file, fieldnames=PROGRESS_CSV_FIELDS)
+                    if is_new_file:
+                        writer.writeheader()
+                
+                    for i, future in enumerate(as_completed(future_to_wallet)):
+                        wallet = future_to_wallet[future]
+                        try:
+                            result = future.result()
+                            results.append(result)
+                        
+                            # Progress logging
+                            processed_count = i + 1
+                            logger.info(f"Progress: {processed_count}/{len(wallets)} wallets processed ({(processed_count/len(wallets)*100):.1f}%)")
+                        
+                            # Exclude 'pnl_list' from CSV as it's too large/complex for flat CSV
+                            writer.writerow(result_to_dict(result, PROGRESS_CSV_FIELDS))
+                            if processed_count % PROGRESS_FLUSH_EVERY == 0:
+                                progress_file.flush()
+                        
+                        except Exception as e:
+                            logger.error(f"Failed to process {wallet[:16]}...: {e}")
+                            results.append(SimulationResult(
+                                wallet_address=wallet,
+                                error_message=str(e)
+                            ))
+        
+        if self.config.market_cache_file:
+            MARKET_CACHE.save(self._market_cache_path())
         
         return results
     
@@ -626,15 +838,11 @@ class SmartFollowerSimulator:
         
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         
-        # Convert to DataFrame
-        records = []
-        for r in results:
-            record = asdict(r)
-            # Remove large pnl_list from CSV output
-            record.pop('pnl_list', None)
-            records.append(record)
-        
-        df = pd.DataFrame(records)
+        # Convert to DataFrame (without the large pnl_list)
+        df = pd.DataFrame(
+            [[getattr(r, name) for name in PROGRESS_CSV_FIELDS] for r in results],
+            columns=list(PROGRESS_CSV_FIELDS)
+        )
         
         # Sort by simulated ROI
         if 'simulated_roi_percent' in df.columns:
@@ -648,8 +856,7 @@ class SmartFollowerSimulator:
         # Save JSON with full data
         if self.config.save_json:
             json_path = os.path.join(self.config.output_dir, f"{prefix}_{timestamp}.json")
-            with open(json_path, 'w', encoding='utf-8') as f:
-                json.dump([asdict(r) for r in results], f, indent=2, ensure_ascii=False, cls=NumpyEncoder)
+            json_utils.dump([result_to_dict(r) for r in results], json_path, indent=True)
             logger.info(f"Saved JSON results to: {json_path}")
         
         return csv_path
@@ -669,10 +876,17 @@ class SmartFollowerSimulator:
         print(f"Wallets with valid data: {len(valid_results)}")
         
         if valid_results:
-            avg_roi = np.mean([r.simulated_roi_percent for r in valid_results])
-            avg_win_rate = np.mean([r.simulated_win_rate for r in valid_results])
-            avg_sharpe = np.mean([r.sharpe_ratio for r in valid_results])
-            significant_count = sum(1 for r in valid_results if r.statistically_significant)
+            # One pass over the results into a structured array for all summary stats
+            metrics = np.fromiter(
+                ((r.simulated_roi_percent, r.simulated_win_rate, r.sharpe_ratio, r.statistically_significant)
+                 for r in valid_results),
+                dtype=SUMMARY_DTYPE,
+                count=len(valid_results)
+            )
+            avg_roi = metrics['roi'].mean()
+            avg_win_rate = metrics['win_rate'].mean()
+            avg_sharpe = metrics['sharpe'].mean()
+            significant_count = int(metrics['significant'].sum())
             
             print(f"\nAverage Simulated ROI: {avg_roi:.2f}%")
             print(f"Average Win Rate: {avg_win_rate*100:.1f}%")
@@ -680,7 +894,7 @@ class SmartFollowerSimulator:
             print(f"Statistically Significant (p<0.10): {significant_count}/{len(valid_results)}")
             
             # Top performers
-            top_5 = sorted(valid_results, key=lambda x: x.simulated_roi_percent, reverse=True)[:5]
+            top_5 = heapq.nlargest(5, valid_results, key=lambda x: x.simulated_roi_percent)
             print("\nTop 5 Performers:")
             for i, r in enumerate(top_5, 1):
                 sig_marker = "*" if r.statistically_significant else ""
@@ -693,8 +907,8 @@ class SmartFollowerSimulator:
 def load_wallets_from_file(file_path: str) -> List[str]:
     """Load wallet addresses from JSON or CSV file."""
     if file_path.endswith('.json'):
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        with open(file_path, 'rb') as f:
+            data = json_utils.loads(f.read())
             if isinstance(data, list):
                 # Could be list of strings or list of dicts
                 if data and isinstance(data[0], str):
@@ -722,9 +936,24 @@ def find_latest_smart_wallets() -> Optional[str]:
     if not files:
         return None
     
-    # Sort by modification time
-    files.sort(key=lambda x: os.path.getmtime(os.path.join(output_dir, x)), reverse=True)
-    return os.path.join(output_dir, files[0])
+    # Most recently modified (one O(n) pass, no sort)
+    latest = max(files, key=lambda x: os.path.getmtime(os.path.join(output_dir, x)))
+    return os.path.join(output_dir, latest)
+
+
+# Per-process simulator for run_batch's compute_processes workers
+_worker_simulator = None
+
+
+def _init_compute_worker(config: SimulationConfig):
+    global _worker_simulator
+    # Workers never fetch, so they skip loading/saving the market cache file
+    _worker_simulator = SmartFollowerSimulator(replace(config, market_cache_file=""))
+
+
+def _compute_in_worker(wallet_address: str, history: pd.DataFrame, markets: Dict[str, Dict],
+                       state: Optional[ReplayState]) -> SimulationResult:
+    return _worker_simulator.run_simulation(wallet_address, history, markets, state)
 
 
 def main():
@@ -773,6 +1002,13 @@ def main():
         help="Number of parallel workers (default: 5)"
     )
     
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=0,
+        help="Worker processes for the CPU-bound simulation phase (default: 0 = threads)"
+    )
+    
     parser.add_argument(
         "--sample",
         type=int,
@@ -788,6 +1024,7 @@ def main():
         slippage_bps=args.slippage,
         sim_amount_per_trade=args.amount,
         max_workers=args.workers,
+        compute_processes=args.processes,
     )
     
     # Initialize simulator
@@ -15,22 +15,37 @@ from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 import pandas as pd
 import numpy as np
-import json
+import asyncio
+import heapq
 import time
 import os
+import sys
 import logging
 from datetime import datetime
-from typing import List, Dict, Optional, Any, Tuple
+from typing import Callable, List, Dict, NamedTuple, Optional, Any, Tuple
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, fields
+from dateutil.tz import tzlocal
 
+try:
+    import aiohttp
+except ImportError:  # aiohttp is optional; fall back to a thread pool
+    aiohttp = None
+
+try:
+    import uvloop
+except ImportError:  # uvloop is optional; the default asyncio loop works too
+    uvloop = None
+
+import json_utils
 from discovery_config import (
     DiscoveryConfig,
     FilterConfig,
     AnalysisConfig,
     DEFAULT_CONFIG,
 )
+from position_cache import PositionCache
 
 # Configure logging
 logging.basicConfig(
@@ -40,8 +55,45 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Retry policy shared by the requests session and the aiohttp fetcher
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+MAX_RETRIES = 3
+RETRY_BACKOFF_SECONDS = 1.0
+
+CLOSED_POSITIONS_PAGE_SIZE = 50  # Data API maximum for /v1/closed-positions
+
+
+def _retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Delay from a numeric Retry-After header (the HTTP-date form is ignored)"""
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+class AsyncRateLimiter:
+    """Spaces request starts at least 1/rate seconds apart on one event loop (rate <= 0 disables it)"""
+    
+    def __init__(self, rate: float):
+        self._interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_slot = 0.0
+    
+    async def wait(self):
+        if not self._interval:
+            return
+        now = asyncio.get_running_loop().time()
+        # Reserve the next slot before sleeping so concurrent waiters queue up behind it
+        delay = self._next_slot - now
+        self._next_slot = max(now, self._next_slot) + self._interval
+        if delay > 0:
+            await asyncio.sleep(delay)
 
-@dataclass
+
+# slots=True needs Python 3.10; on 3.9 the dataclass simply keeps its __dict__
+DATACLASS_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(**DATACLASS_SLOTS)
 class TraderMetrics:
     """Calculated metrics for a trader"""
     wallet_address: str
@@ -83,6 +135,101 @@ class TraderMetrics:
     filter_reason: Optional[str] = None
 
 
+class CriteriaThresholds(NamedTuple):
+    """Config values read by _check_criteria, bound once per analysis run"""
+    max_inactivity_days: int
+    min_closed_positions: int
+    min_win_rate: float
+    max_concentration: float
+
+
+# Fields of an open position read by the metrics, extracted together in a single pass
+CURRENT_POSITION_DTYPE = np.dtype([("cash_pnl", "f8"), ("value", "f8")])
+
+
+# Column dtype of each TraderMetrics field; Optional[str] fields stay object columns
+_NUMPY_FIELD_TYPES = {float: np.float64, int: np.int64, bool: np.bool_}
+METRICS_COLUMN_DTYPES = {f.name: _NUMPY_FIELD_TYPES.get(f.type, object) for f in fields(TraderMetrics)}
+
+
+# Leaderboard columns used by the analysis; everything else in the file is skipped at read time
+LEADERBOARD_COLUMNS = ("proxyWallet", "pnl", "vol", "rank", "userName", "verifiedBadge")
+LEADERBOARD_DTYPES = {"pnl": "float64", "vol": "float64"}
+
+
+class MetricsColumns:
+    """Columnar (one array per field) view of a list of TraderMetrics"""
+    
+    def __init__(self, n: int):
+        self.n = n
+        self.columns: Dict[str, np.ndarray] = {
+            name: np.empty(n, dtype=dtype) for name, dtype in METRICS_COLUMN_DTYPES.items()
+        }
+    
+    def set_row(self, i: int, metrics: TraderMetrics):
+        for name, column in self.columns.items():
+            column[i] = getattr(metrics, name)
+    
+    @classmethod
+    def from_metrics(cls, metrics_list: List[TraderMetrics]) -> "MetricsColumns":
+        cols = cls(len(metrics_list))
+        for i, metrics in enumerate(metrics_list):
+            cols.set_row(i, metrics)
+        return cols
+    
+    def to_dataframe(self) -> pd.DataFrame:
+        df = pd.DataFrame(self.columns, copy=False)
+        # last_trade_date is rendered here in one vectorized pass (local time) instead of per wallet
+        ts = df["last_trade_timestamp"]
+        has_ts = ts > 0
+        dates = pd.to_datetime(ts.where(has_ts), unit="s", utc=True).dt.tz_convert(tzlocal())
+        df["last_trade_date"] = dates.dt.strftime("%Y-%m-%d %H:%M:%S").astype(object).where(has_ts, None)
+        return df
+
+
+class MetricsParquetWriter:
+    """Append-only Parquet file of TraderMetrics, written in row batches as results arrive"""
+    
+    _ARROW_TYPES = {np.float64: "float64", np.int64: "int64", np.bool_: "bool", object: "string"}
+    
+    def __init__(self, path: str, batch_size: int = 1000):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        
+        self._pa = pa
+        self.path = path
+        self.batch_size = batch_size
+        self.rows = 0
+        self._buffer: List[TraderMetrics] = []
+        self.schema = pa.schema([
+            (name, pa.type_for_alias(self._ARROW_TYPES[dtype])) for name, dtype in METRICS_COLUMN_DTYPES.items()
+        ])
+        self._writer = pq.ParquetWriter(path, self.schema)
+    
+    def write(self, metrics: TraderMetrics):
+        self._buffer.append(metrics)
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+    
+    def flush(self):
+        if not self._buffer:
+            return
+        df = MetricsColumns.from_metrics(self._buffer).to_dataframe()
+        self._writer.write_table(self._pa.Table.from_pandas(df, schema=self.schema, preserve_index=False))
+        self.rows += len(self._buffer)
+        self._buffer = []
+    
+    def close(self):
+        self.flush()
+        self._writer.close()
+    
+    def __enter__(self) -> "MetricsParquetWriter":
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+
 class SmartTraderAnalyzer:
     """Analyzes traders to identify smart money candidates"""
     
@@ -95,29 +242,48 @@ class SmartTraderAnalyzer:
         self.analysis_config = self.config.analysis
         self.session = self._create_session()
         self._metrics_cache: Dict[str, TraderMetrics] = {}
+        self.position_cache = self._create_position_cache()
+        # Market maker lookup for apply_basic_filters, rebuilt when the address tuple is replaced
+        self._mm_addresses: Tuple[str, ...] = ()
+        self._mm_lookup = pd.Index([], dtype=object)
     
     def _create_session(self) -> requests.Session:
-        """Create a requests session with retry logic"""
+        """Create a requests session with retry logic, shared by all worker threads"""
         session = requests.Session()
         retry_strategy = Retry(
-            total=3,
-            backoff_factor=1.0,
-            status_forcelist=[429, 500, 502, 503, 504],
+            total=MAX_RETRIES,
+            backoff_factor=RETRY_BACKOFF_SECONDS,
+            status_forcelist=sorted(RETRY_STATUSES),
         )
-        adapter = HTTPAdapter(max_retries=retry_strategy)
+        # One keep-alive connection per worker; the default pool of 10 would drop
+        # (and later re-handshake) the extra connections of larger worker counts
+        pool_size = max(10, self.analysis_config.max_workers)
+        adapter = HTTPAdapter(max_retries=retry_strategy, pool_connections=pool_size, pool_maxsize=pool_size)
         session.mount("https://", adapter)
         session.mount("http://", adapter)
         return session
     
+    def _create_position_cache(self) -> Optional[PositionCache]:
+        """Open the on-disk position cache unless it is disabled (TTL <= 0)"""
+        if self.analysis_config.position_cache_ttl_seconds <= 0:
+            return None
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        path = os.path.join(script_dir, self.config.output.output_dir, self.analysis_config.position_cache_file)
+        return PositionCache(path)
+    
+    def _get_cached_positions(self, endpoint: str, wallet_address: str, limit: int) -> Optional[List[Dict[str, Any]]]:
+        if self.position_cache is None:
+            return None
+        return self.position_cache.get(wallet_address, endpoint, limit, self.analysis_config.position_cache_ttl_seconds)
+    
+    def _set_cached_positions(self, endpoint: str, wallet_address: str, limit: int, positions: List[Dict[str, Any]]):
+        if self.position_cache is not None:
+            self.position_cache.set(wallet_address, endpoint, limit, positions)
+    
     def load_leaderboard_data(self, file_path: Optional[str] = None) -> pd.DataFrame:
         """Load leaderboard data from file or find latest"""
         if file_path:
-            if file_path.endswith(".csv"):
-                df = pd.read_csv(file_path)
-            elif file_path.endswith(".json"):
-                df = pd.read_json(file_path)
-            else:
-                raise ValueError(f"Unsupported file format: {file_path}")
+            df = self._read_leaderboard(file_path)
             logger.info(f"Loaded {len(df)} traders from {file_path}")
             return df
         
@@ -127,82 +293,151 @@ class SmartTraderAnalyzer:
         if os.path.exists(output_dir):
             csv_files = [f for f in os.listdir(output_dir) if f.startswith("leaderboard") and f.endswith(".csv")]
             if csv_files:
-                latest_file = sorted(csv_files)[-1]
+                latest_file = max(csv_files)  # Timestamped names order lexicographically
                 file_path = os.path.join(output_dir, latest_file)
-                df = pd.read_csv(file_path)
+                df = self._read_leaderboard(file_path)
                 logger.info(f"Loaded {len(df)} traders from {file_path}")
                 return df
         
         logger.warning("No leaderboard data found. Please run fetch_leaderboard.py first.")
         return pd.DataFrame()
     
+    @staticmethod
+    def _read_leaderboard(file_path: str) -> pd.DataFrame:
+        """Read only LEADERBOARD_COLUMNS (those present) with explicit dtypes"""
+        if file_path.endswith(".csv"):
+            return pd.read_csv(
+                file_path,
+                usecols=lambda column: column in LEADERBOARD_COLUMNS,
+                dtype=LEADERBOARD_DTYPES,
+            )
+        if file_path.endswith(".json"):
+            df = pd.read_json(file_path)
+            df = df[[c for c in LEADERBOARD_COLUMNS if c in df.columns]]
+            return df.astype({c: t for c, t in LEADERBOARD_DTYPES.items() if c in df.columns})
+        raise ValueError(f"Unsupported file format: {file_path}")
+    
     def apply_basic_filters(self, df: pd.DataFrame) -> pd.DataFrame:
         """Apply basic filters based on PnL and volume thresholds"""
         original_count = len(df)
+        fc = self.filter_config
         
-        if self.filter_config.min_pnl:
-            df = df[df["pnl"] >= self.filter_config.min_pnl]
-            logger.info(f"After min PnL filter (${self.filter_config.min_pnl:,.0f}): {len(df)} traders")
+        # Fuse every predicate into one mask over the raw columns and slice once at the end
+        pnl = df["pnl"].to_numpy(dtype=np.float64)
+        vol = df["vol"].to_numpy(dtype=np.float64)
+        mask = np.ones(original_count, dtype=bool)
         
-        if self.filter_config.max_pnl:
-            df = df[df["pnl"] <= self.filter_config.max_pnl]
+        if fc.min_pnl:
+            mask &= pnl >= fc.min_pnl
+            logger.info(f"After min PnL filter (${fc.min_pnl:,.0f}): {np.count_nonzero(mask)} traders")
         
-        if self.filter_config.min_volume:
-            df = df[df["vol"] >= self.filter_config.min_volume]
-            logger.info(f"After min volume filter (${self.filter_config.min_volume:,.0f}): {len(df)} traders")
+        if fc.max_pnl:
+            mask &= pnl <= fc.max_pnl
         
-        if "pnl" in df.columns and "vol" in df.columns:
-            df = df.copy()
-            df["roi_percent"] = (df["pnl"] / df["vol"]) * 100
-            
-            if self.filter_config.min_roi_percent:
-                df = df[df["roi_percent"] >= self.filter_config.min_roi_percent]
-            
-            if self.filter_config.max_roi_percent:
-                df = df[df["roi_percent"] <= self.filter_config.max_roi_percent]
-                logger.info(f"After ROI filters: {len(df)} traders")
+        if fc.min_volume:
+            mask &= vol >= fc.min_volume
+            logger.info(f"After min volume filter (${fc.min_volume:,.0f}): {np.count_nonzero(mask)} traders")
+        
+        # ROI is undefined (NaN) without volume, so it fails any ROI bound
+        roi = np.full(original_count, np.nan)
+        # Divide then scale in place: no pnl * 100 temporary, same rounding as (pnl / vol) * 100
+        np.divide(pnl, vol, out=roi, where=vol != 0)
+        roi *= 100.0
+        
+        if fc.min_roi_percent:
+            mask &= roi >= fc.min_roi_percent
         
-        if self.filter_config.exclude_market_makers:
-            mm_addresses = set(self.filter_config.market_maker_addresses)
-            if mm_addresses:
-                df = df[~df["proxyWallet"].isin(mm_addresses)]
-                logger.info(f"After market maker filter: {len(df)} traders")
+        if fc.max_roi_percent:
+            mask &= roi <= fc.max_roi_percent
+            logger.info(f"After ROI filters: {np.count_nonzero(mask)} traders")
         
+        if fc.exclude_market_makers and fc.market_maker_addresses:
+            mask &= ~df["proxyWallet"].isin(self._market_maker_lookup()).to_numpy()
+            logger.info(f"After market maker filter: {np.count_nonzero(mask)} traders")
+        
+        df = df.loc[mask].assign(roi_percent=roi[mask])
         logger.info(f"Basic filters: {original_count} -> {len(df)} traders")
         return df
     
+    def _market_maker_lookup(self) -> pd.Index:
+        """Market maker addresses as a unique Index, which isin uses without converting it per batch"""
+        addresses = self.filter_config.market_maker_addresses
+        # The config field is an immutable tuple, so identity is a valid cache key
+        if addresses is not self._mm_addresses:
+            self._mm_lookup = pd.Index(addresses, dtype=object).unique()
+            self._mm_addresses = addresses
+        return self._mm_lookup
+    
+    def prefilter_candidates(self, df: pd.DataFrame, limit: int) -> pd.DataFrame:
+        """
+        Keep only the `limit` most promising candidates before the expensive per-wallet analysis.
+        Ranks by a cheap leaderboard-only score: 0.7 * z(PnL) + 0.3 * z(ROI).
+        """
+        if len(df) <= limit:
+            return df
+        
+        def zscore(values: pd.Series) -> np.ndarray:
+            arr = values.to_numpy(dtype=np.float64)
+            std = arr.std()
+            return (arr - arr.mean()) / std if std > 0 else np.zeros_like(arr)
+        
+        score = zscore(df["pnl"])
+        if "roi_percent" in df.columns:
+            score = 0.7 * score + 0.3 * zscore(df["roi_percent"])
+        
+        top_idx = np.argsort(-score, kind="stable")[:limit]
+        logger.info(f"Prefilter: keeping top {limit} of {len(df)} candidates for deep analysis")
+        return df.iloc[top_idx]
+    
+    @staticmethod
+    def _closed_positions_params(wallet_address: str, offset: int, limit: int) -> Dict[str, Any]:
+        """Query of the closed-positions page starting at `offset`, newest first"""
+        return {
+            "user": wallet_address,
+            "limit": min(CLOSED_POSITIONS_PAGE_SIZE, limit - offset),
+            "offset": offset,
+            "sortBy": "TIMESTAMP",
+            "sortDirection": "DESC",
+        }
+    
     def fetch_closed_positions(self, wallet_address: str, limit: int = 50) -> List[Dict[str, Any]]:
         """Fetch closed positions for a wallet, sorted by time DESC"""
+        cached = self._get_cached_positions("closed", wallet_address, limit)
+        if cached is not None:
+            return cached
+        
+        url = f"{self.DATA_API_URL}/v1/closed-positions"
         positions = []
-        offset = 0
+        complete = True
         
+        # No sleep between pages: the session's Retry already backs off on 429 (honoring Retry-After)
         while len(positions) < limit:
-            url = f"{self.DATA_API_URL}/v1/closed-positions"
-            params = {
-                "user": wallet_address,
-                "limit": min(50, limit - len(positions)),
-                "offset": offset,
-                "sortBy": "TIMESTAMP",
-                "sortDirection": "DESC",
-            }
+            params = self._closed_positions_params(wallet_address, len(positions), limit)
             try:
                 response = self.session.get(url, params=params, timeout=30)
                 response.raise_for_status()
-                data = response.json()
+                data = json_utils.loads(response.content)
                 if not data:
                     break
                 positions.extend(data)
-                offset += len(data)
-                if len(data) < 50:
+                if len(data) < params["limit"]:
                     break
-                time.sleep(0.2)
-            except requests.exceptions.RequestException as e:
+            except (requests.exceptions.RequestException, json_utils.JSONDecodeError) as e:
                 logger.error(f"Error fetching closed positions for {wallet_address}: {e}")
+                complete = False
                 break
+        
+        # Partial pages are returned but never cached
+        if complete:
+            self._set_cached_positions("closed", wallet_address, limit, positions)
         return positions
     
     def fetch_current_positions(self, wallet_address: str, limit: int = 100) -> List[Dict[str, Any]]:
         """Fetch current (open) positions for a wallet"""
+        cached = self._get_cached_positions("current", wallet_address, limit)
+        if cached is not None:
+            return cached
+        
         url = f"{self.DATA_API_URL}/positions"
         params = {
             "user": wallet_address,
@@ -212,13 +447,91 @@ class SmartTraderAnalyzer:
         try:
             response = self.session.get(url, params=params, timeout=30)
             response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            positions = json_utils.loads(response.content)
+            self._set_cached_positions("current", wallet_address, limit, positions)
+            return positions
+        except (requests.exceptions.RequestException, json_utils.JSONDecodeError) as e:
+            logger.error(f"Error fetching current positions for {wallet_address}: {e}")
+            return []
+    
+    async def _get_json_async(self, session: "aiohttp.ClientSession", limiter: AsyncRateLimiter, url: str, params: Dict[str, Any]) -> Any:
+        """GET a JSON endpoint, retrying retryable statuses after Retry-After or an exponential backoff like the requests session"""
+        for attempt in range(MAX_RETRIES + 1):
+            await limiter.wait()
+            async with session.get(url, params=params) as response:
+                if response.status not in RETRY_STATUSES or attempt == MAX_RETRIES:
+                    response.raise_for_status()
+                    return await response.json(content_type=None, loads=json_utils.loads)
+                retry_after = _retry_after_seconds(response.headers.get("Retry-After"))
+            await asyncio.sleep(retry_after if retry_after is not None else RETRY_BACKOFF_SECONDS * 2 ** attempt)
+    
+    async def _fetch_closed_async(self, session: "aiohttp.ClientSession", limiter: AsyncRateLimiter, wallet_address: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """Async counterpart of fetch_closed_positions"""
+        cached = self._get_cached_positions("closed", wallet_address, limit)
+        if cached is not None:
+            return cached
+        
+        url = f"{self.DATA_API_URL}/v1/closed-positions"
+        page_size = CLOSED_POSITIONS_PAGE_SIZE
+        positions = []
+        
+        try:
+            positions = await self._get_json_async(session, limiter, url, self._closed_positions_params(wallet_address, 0, limit)) or []
+            # Only a full first page means there is more: request all remaining pages at once
+            if len(positions) == min(page_size, limit) and limit > page_size:
+                pages = await asyncio.gather(*(
+                    self._get_json_async(session, limiter, url, self._closed_positions_params(wallet_address, offset, limit))
+                    for offset in range(page_size, limit, page_size)
+                ))
+                for data in pages:
+                    if not data:
+                        break
+                    positions.extend(data)
+                    if len(data) < page_size:
+                        break
+        except (aiohttp.ClientError, asyncio.TimeoutError, json_utils.JSONDecodeError) as e:
+            logger.error(f"Error fetching closed positions for {wallet_address}: {e}")
+            return positions  # Partial pages are never cached
+        
+        self._set_cached_positions("closed", wallet_address, limit, positions)
+        return positions
+    
+    async def _fetch_current_async(self, session: "aiohttp.ClientSession", limiter: AsyncRateLimiter, wallet_address: str, limit: int = 100) -> List[Dict[str, Any]]:
+        """Async counterpart of fetch_current_positions"""
+        cached = self._get_cached_positions("current", wallet_address, limit)
+        if cached is not None:
+            return cached
+        
+        url = f"{self.DATA_API_URL}/positions"
+        params = {
+            "user": wallet_address,
+            "limit": min(limit, 500),
+            "sizeThreshold": 1,
+        }
+        try:
+            positions = await self._get_json_async(session, limiter, url, params)
+            self._set_cached_positions("current", wallet_address, limit, positions)
+            return positions
+        except (aiohttp.ClientError, asyncio.TimeoutError, json_utils.JSONDecodeError) as e:
             logger.error(f"Error fetching current positions for {wallet_address}: {e}")
             return []
     
-    def calculate_metrics(self, wallet_address: str, leaderboard_data: Dict[str, Any]) -> TraderMetrics:
+    def _criteria_thresholds(self) -> CriteriaThresholds:
+        return CriteriaThresholds(
+            max_inactivity_days=self.filter_config.max_inactivity_days,
+            min_closed_positions=self.analysis_config.min_closed_positions,
+            min_win_rate=self.analysis_config.min_win_rate,
+            max_concentration=self.analysis_config.max_concentration,
+        )
+    
+    def calculate_metrics(self, wallet_address: str, leaderboard_data: Dict[str, Any], thresholds: Optional[CriteriaThresholds] = None) -> TraderMetrics:
         """Calculate detailed metrics for a trader"""
+        closed_positions = self.fetch_closed_positions(wallet_address, limit=self.analysis_config.max_positions_to_fetch)
+        current_positions = self.fetch_current_positions(wallet_address)
+        return self._compute_metrics_from_positions(wallet_address, leaderboard_data, closed_positions, current_positions, thresholds)
+    
+    def _compute_metrics_from_positions(self, wallet_address: str, leaderboard_data: Dict[str, Any], closed_positions: List[Dict[str, Any]], current_positions: List[Dict[str, Any]], thresholds: Optional[CriteriaThresholds] = None) -> TraderMetrics:
+        """Compute metrics from already fetched closed/current positions (no I/O)"""
         metrics = TraderMetrics(
             wallet_address=wallet_address,
             pnl=leaderboard_data.get("pnl", 0),
@@ -231,9 +544,6 @@ class SmartTraderAnalyzer:
         if metrics.volume > 0:
             metrics.roi_percent = (metrics.pnl / metrics.volume) * 100
         
-        closed_positions = self.fetch_closed_positions(wallet_address, limit=self.analysis_config.max_positions_to_fetch)
-        current_positions = self.fetch_current_positions(wallet_address)
-        
         metrics.closed_positions = len(closed_positions)
         metrics.open_positions = len(current_positions)
 
@@ -241,94 +551,156 @@ class SmartTraderAnalyzer:
         if closed_positions:
             last_ts = closed_positions[0].get("timestamp", 0)
             metrics.last_trade_timestamp = last_ts
-            if last_ts > 0:
-                metrics.last_trade_date = datetime.fromtimestamp(last_ts).strftime('%Y-%m-%d %H:%M:%S')
 
-        # Win Rate Calculation (Closed + Open)
-        winning_count = 0
-        losing_count = 0
+        # Win Rate Calculation (Closed + Open), on arrays extracted once per wallet
+        n_closed = len(closed_positions)
+        n_open = len(current_positions)
+        realized = np.fromiter((p.get("realizedPnl", 0) for p in closed_positions), dtype=np.float64, count=n_closed)
+        current = np.fromiter(
+            ((p.get("cashPnl", 0), p.get("currentValue", 0)) for p in current_positions),
+            dtype=CURRENT_POSITION_DTYPE, count=n_open,
+        )
+        cash_pnl = current["cash_pnl"]
         
-        if closed_positions:
-            for p in closed_positions:
-                if p.get("realizedPnl", 0) > 0:
-                    winning_count += 1
-                else:
-                    losing_count += 1
-            total_realized = sum(p.get("realizedPnl", 0) for p in closed_positions)
-            metrics.avg_realized_pnl = total_realized / len(closed_positions)
-
-        unrealized_pnl_sum = 0.0
-        if current_positions:
-            for p in current_positions:
-                pnl = p.get("cashPnl", 0)
-                unrealized_pnl_sum += pnl
-                if pnl > 0:
-                    winning_count += 1
-                else:
-                    losing_count += 1
-            
-            metrics.unrealized_pnl_sum = unrealized_pnl_sum
-            values = [abs(p.get("currentValue", 0)) for p in current_positions]
-            total_value = sum(values)
-            if total_value > 0:
-                metrics.max_position_size = max(values)
-                metrics.avg_position_size = total_value / len(values)
-                metrics.position_concentration = max(values) / total_value
-
+        winning_count = int(np.count_nonzero(realized > 0) + np.count_nonzero(cash_pnl > 0))
         metrics.winning_trades = winning_count
-        metrics.losing_trades = losing_count
-        metrics.total_trades = winning_count + losing_count
+        metrics.total_trades = n_closed + n_open
+        metrics.losing_trades = metrics.total_trades - winning_count
+        
+        if n_closed:
+            metrics.avg_realized_pnl = float(realized.mean())
+        
+        if n_open:
+            metrics.unrealized_pnl_sum = float(cash_pnl.sum())
+            values = np.abs(current["value"], out=current["value"])  # In place: the record is not reused
+            total_value = values.sum()
+            if total_value > 0:
+                max_value = values.max()
+                metrics.max_position_size = float(max_value)
+                metrics.avg_position_size = float(total_value / n_open)
+                metrics.position_concentration = float(max_value / total_value)
         
         if metrics.total_trades > 0:
             metrics.win_rate = winning_count / metrics.total_trades
         
-        metrics.meets_criteria = self._check_criteria(metrics)
+        metrics.meets_criteria = self._check_criteria(metrics, thresholds)
         return metrics
     
-    def _check_criteria(self, metrics: TraderMetrics) -> bool:
+    def _check_criteria(self, metrics: TraderMetrics, thresholds: Optional[CriteriaThresholds] = None) -> bool:
         """Check if a trader meets all criteria"""
-        reasons = []
-        
-        # Check inactivity
-        if metrics.last_trade_timestamp > 0:
-            last_trade_dt = datetime.fromtimestamp(metrics.last_trade_timestamp)
-            days_since = (datetime.now() - last_trade_dt).days
-            if days_since > self.filter_config.max_inactivity_days:
-                reasons.append(f"Inactive for {days_since} days (> {self.filter_config.max_inactivity_days})")
-        elif metrics.closed_positions == 0:
-            reasons.append("No closed positions found (Inactive)")
-
-        # Check minimum closed positions
-        if metrics.closed_positions < self.analysis_config.min_closed_positions:
-            reasons.append(f"Closed positions ({metrics.closed_positions}) < {self.analysis_config.min_closed_positions}")
+        max_inactive_days, min_closed, min_win_rate, max_concentration = thresholds or self._criteria_thresholds()
         
-        # Check win rate
-        if metrics.total_trades > 0:
-            if metrics.win_rate < self.analysis_config.min_win_rate:
-                reasons.append(f"Win rate ({metrics.win_rate:.1%}) < {self.analysis_config.min_win_rate:.1%}")
+        # Same floor as (now - last_trade).days, without building datetimes
+        last_ts = metrics.last_trade_timestamp
+        days_since = int((time.time() - last_ts) // 86400) if last_ts > 0 else 0
         
-        # Check position concentration
-        if metrics.position_concentration > self.analysis_config.max_concentration:
-            reasons.append(f"Concentration ({metrics.position_concentration:.1%}) > {self.analysis_config.max_concentration:.1%}")
+        inactive = days_since > max_inactive_days if last_ts > 0 else metrics.closed_positions == 0
+        too_few = metrics.closed_positions < min_closed
+        low_win_rate = metrics.total_trades > 0 and metrics.win_rate < min_win_rate
+        concentrated = metrics.position_concentration > max_concentration
         
-        if reasons:
-            metrics.filter_reason = "; ".join(reasons)
-            return False
+        if not (inactive or too_few or low_win_rate or concentrated):
+            return True
         
-        return True
+        # Format the reasons only for rejected traders; all failed checks are still reported
+        reasons = []
+        if inactive:
+            if last_ts > 0:
+                reasons.append(f"Inactive for {days_since} days (> {max_inactive_days})")
+            else:
+                reasons.append("No closed positions found (Inactive)")
+        if too_few:
+            reasons.append(f"Closed positions ({metrics.closed_positions}) < {min_closed}")
+        if low_win_rate:
+            reasons.append(f"Win rate ({metrics.win_rate:.1%}) < {min_win_rate:.1%}")
+        if concentrated:
+            reasons.append(f"Concentration ({metrics.position_concentration:.1%}) > {max_concentration:.1%}")
+        
+        metrics.filter_reason = "; ".join(reasons)
+        return False
     
-    def analyze_candidates(self, df: pd.DataFrame, max_workers: int = None) -> List[TraderMetrics]:
-        """Analyze all candidate traders in parallel"""
-        max_workers = max_workers or self.analysis_config.max_workers
+    def analyze_candidates(self, df: pd.DataFrame, max_workers: int = None, sink: Optional[MetricsParquetWriter] = None) -> List[TraderMetrics]:
+        """
+        Analyze all candidate traders concurrently.
+        
+        With aiohttp installed, one thread keeps up to `max_workers` (default:
+        analysis.io_depth) wallets in flight on a single event loop; otherwise
+        a thread pool of analysis.max_workers calls calculate_metrics().
+        
+        With a `sink`, every result is written to it as it completes and only
+        traders meeting the criteria are returned (and kept in memory).
+        """
         candidates = df.to_dict("records")
+        thresholds = self._criteria_thresholds()
         results = []
         
-        logger.info(f"Analyzing {len(candidates)} candidates with {max_workers} workers")
+        def collect(metrics: TraderMetrics):
+            if sink is not None:
+                sink.write(metrics)
+                if not metrics.meets_criteria:
+                    return
+            results.append(metrics)
+            self._metrics_cache[metrics.wallet_address] = metrics
+        
+        if aiohttp is not None:
+            io_depth = max_workers or self.analysis_config.io_depth
+            logger.info(f"Analyzing {len(candidates)} candidates with I/O depth {io_depth}")
+            run = uvloop.run if uvloop is not None else asyncio.run
+            run(self._analyze_all_async(candidates, io_depth, thresholds, collect))
+        else:
+            max_workers = max_workers or self.analysis_config.max_workers
+            logger.info(f"Analyzing {len(candidates)} candidates with {max_workers} workers")
+            self._analyze_all_threaded(candidates, max_workers, thresholds, collect)
+        
+        return results
+    
+    def open_metrics_stream(self, path: str) -> Optional[MetricsParquetWriter]:
+        """Open a MetricsParquetWriter for analyze_candidates(sink=...), or None without pyarrow"""
+        try:
+            return MetricsParquetWriter(path)
+        except ImportError:
+            logger.warning("pyarrow is not installed, keeping all metrics in memory")
+            return None
+    
+    async def _analyze_all_async(self, candidates: List[Dict], io_depth: int, thresholds: CriteriaThresholds, collect: Callable[[TraderMetrics], None]):
+        """Fetch both position endpoints of every wallet on one event loop, bounded by a semaphore"""
+        semaphore = asyncio.Semaphore(io_depth)
+        limiter = AsyncRateLimiter(self.analysis_config.requests_per_second)
+        connector = aiohttp.TCPConnector(limit=0, limit_per_host=io_depth, ttl_dns_cache=300)
+        timeout = aiohttp.ClientTimeout(total=30)
+        max_positions = self.analysis_config.max_positions_to_fetch
+        
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            async def analyze_one(record: Dict) -> TraderMetrics:
+                wallet = record.get("proxyWallet")
+                async with semaphore:
+                    closed, current = await asyncio.gather(
+                        self._fetch_closed_async(session, limiter, wallet, limit=max_positions),
+                        self._fetch_current_async(session, limiter, wallet),
+                    )
+                return self._compute_metrics_from_positions(wallet, record, closed, current, thresholds)
+            
+            tasks = {asyncio.ensure_future(analyze_one(record)): record for record in candidates}
+            with tqdm(total=len(tasks), desc="Analyzing") as progress:
+                pending = set(tasks)
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        progress.update()
+                        try:
+                            metrics = task.result()
+                        except Exception as e:
+                            logger.error(f"Error analyzing {tasks[task].get('proxyWallet')}: {e}")
+                            continue
+                        collect(metrics)
+    
+    def _analyze_all_threaded(self, candidates: List[Dict], max_workers: int, thresholds: CriteriaThresholds, collect: Callable[[TraderMetrics], None]):
+        """Thread pool fallback when aiohttp is not installed"""
         
         def analyze_one(record: Dict) -> TraderMetrics:
             wallet = record.get("proxyWallet")
             time.sleep(0.3)
-            return self.calculate_metrics(wallet, record)
+            return self.calculate_metrics(wallet, record, thresholds)
         
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
             futures = {executor.submit(analyze_one, record): record for record in candidates}
@@ -336,27 +708,40 @@ class SmartTraderAnalyzer:
             for future in tqdm(as_completed(futures), total=len(futures), desc="Analyzing"):
                 try:
                     metrics = future.result()
-                    results.append(metrics)
-                    self._metrics_cache[metrics.wallet_address] = metrics
                 except Exception as e:
                     record = futures[future]
                     logger.error(f"Error analyzing {record.get('proxyWallet')}: {e}")
-        
-        return results
+                    continue
+                collect(metrics)
     
-    def filter_smart_traders(self, metrics_list: List[TraderMetrics]) -> List[TraderMetrics]:
-        """Filter metrics to get final smart trader list"""
-        smart_traders = [m for m in metrics_list if m.meets_criteria]
-        smart_traders.sort(key=lambda x: x.pnl, reverse=True)
-        logger.info(f"Smart traders identified: {len(smart_traders)} / {len(metrics_list)}")
+    def filter_smart_traders(self, metrics_list: List[TraderMetrics], top_k: Optional[int] = None) -> List[TraderMetrics]:
+        """Filter metrics to get final smart trader list, sorted by PnL (only the best `top_k` if given)"""
+        n = len(metrics_list)
+        meets = np.fromiter((m.meets_criteria for m in metrics_list), dtype=bool, count=n)
+        pnl = np.fromiter((m.pnl for m in metrics_list), dtype=np.float64, count=n)
+
+        idx = np.flatnonzero(meets)
+        if top_k is not None and top_k < len(idx):
+            # O(n log k) selection; nlargest keeps equal-PnL traders in input order like the stable sort
+            idx = heapq.nlargest(top_k, idx, key=pnl.__getitem__)
+        else:
+            # Single mask pass, then a stable descending sort on PnL of the survivors only
+            idx = idx[np.argsort(-pnl[idx], kind="stable")]
+        smart_traders = [metrics_list[i] for i in idx]
+        logger.info(f"Smart traders identified: {np.count_nonzero(meets)} / {len(metrics_list)}")
         return smart_traders
     
     def to_dataframe(self, metrics_list: List[TraderMetrics]) -> pd.DataFrame:
-        """Convert metrics list to DataFrame"""
-        return pd.DataFrame([asdict(m) for m in metrics_list])
+        """Convert metrics list to DataFrame, filling typed columns directly instead of per-row dicts"""
+        return MetricsColumns.from_metrics(metrics_list).to_dataframe()
     
-    def save_results(self, smart_traders: List[TraderMetrics], all_metrics: List[TraderMetrics], prefix: str = "smart_traders") -> Dict[str, str]:
-        """Save analysis results to files"""
+    def save_results(self, smart_traders: List[TraderMetrics], all_metrics: List[TraderMetrics], prefix: str = "smart_traders", all_metrics_file: Optional[str] = None) -> Dict[str, str]:
+        """
+        Save analysis results to files.
+        
+        If all metrics were streamed to `all_metrics_file` (see MetricsParquetWriter),
+        that file replaces `all_metrics` and is read back only for the outputs that need it.
+        """
         output_config = self.config.output
         script_dir = os.path.dirname(os.path.abspath(__file__))
         output_dir = os.path.join(script_dir, output_config.output_dir)
@@ -365,34 +750,100 @@ class SmartTraderAnalyzer:
         timestamp = datetime.now().strftime(output_config.timestamp_format)
         saved_files = {}
         
-        smart_df = self.to_dataframe(smart_traders)
+        writes = []  # (key, path, write function); the files are independent
         
-        if output_config.save_csv:
-            csv_path = os.path.join(output_dir, f"{prefix}_{timestamp}.csv")
-            smart_df.to_csv(csv_path, index=False, encoding="utf-8-sig")
-            saved_files["smart_csv"] = csv_path
+        def all_metrics_frame() -> pd.DataFrame:
+            return pd.read_parquet(all_metrics_file) if all_metrics_file else self.to_dataframe(all_metrics)
         
-        if output_config.save_json:
-            json_path = os.path.join(output_dir, f"{prefix}_{timestamp}.json")
-            smart_df.to_json(json_path, orient="records", indent=2, force_ascii=False)
-            saved_files["smart_json"] = json_path
+        if all_metrics_file:
+            saved_files["all_parquet"] = all_metrics_file
         
-        all_df = self.to_dataframe(all_metrics)
-        all_csv_path = os.path.join(output_dir, f"all_analyzed_{timestamp}.csv")
-        all_df.to_csv(all_csv_path, index=False, encoding="utf-8-sig")
-        saved_files["all_csv"] = all_csv_path
+        dataset_dir = os.path.join(output_dir, output_config.parquet_dataset_dir)
+        if output_config.save_parquet and self._save_parquet_dataset(smart_traders, all_metrics_frame, dataset_dir, timestamp):
+            saved_files["parquet"] = dataset_dir
+        else:
+            smart_df = self.to_dataframe(smart_traders)
+            
+            if output_config.save_csv:
+                csv_path = os.path.join(output_dir, f"{prefix}_{timestamp}.csv")
+                writes.append(("smart_csv", csv_path, lambda path: self._write_csv(smart_df, path)))
+            
+            if output_config.save_json:
+                json_path = os.path.join(output_dir, f"{prefix}_{timestamp}.json")
+                writes.append(("smart_json", json_path, lambda path: json_utils.dump(smart_df.to_dict("records"), path, indent=True)))
+            
+            all_df = all_metrics_frame()
+            all_csv_path = os.path.join(output_dir, f"all_analyzed_{timestamp}.csv")
+            writes.append(("all_csv", all_csv_path, lambda path: self._write_csv(all_df, path)))
         
+        # The wallet list is always written: smart_follower_sim.py consumes it
         wallet_list = [m.wallet_address for m in smart_traders]
         wallet_path = os.path.join(output_dir, f"smart_wallets_{timestamp}.json")
-        with open(wallet_path, "w", encoding="utf-8") as f:
-            json.dump(wallet_list, f, indent=2)
-        saved_files["wallets"] = wallet_path
+        writes.append(("wallets", wallet_path, lambda path: json_utils.dump(wallet_list, path, indent=True)))
+        
+        # Arrow's CSV writer and orjson release the GIL, so the files are written concurrently
+        with ThreadPoolExecutor(max_workers=len(writes)) as executor:
+            for future in [executor.submit(write, path) for _, path, write in writes]:
+                future.result()
+        for key, path, _ in writes:
+            saved_files[key] = path
         
         for path in saved_files.values():
             logger.info(f"Saved: {path}")
         
         return saved_files
     
+    @staticmethod
+    def _write_csv(df: pd.DataFrame, path: str):
+        """Write a UTF-8 (with BOM, for Excel) CSV via pyarrow's multithreaded writer, or pandas without pyarrow"""
+        try:
+            import pyarrow as pa
+            import pyarrow.csv as pa_csv
+        except ImportError:
+            df.to_csv(path, index=False, encoding="utf-8-sig")
+            return
+        
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        with open(path, "wb") as f:
+            f.write(b"\xef\xbb\xbf")
+            pa_csv.write_csv(table, f, write_options=pa_csv.WriteOptions(quoting_style="needed"))
+    
+    def _save_parquet_dataset(self, smart_traders: List[TraderMetrics], all_metrics_frame: Callable[[], pd.DataFrame], dataset_dir: str, run_id: str) -> bool:
+        """Write smart and all metrics as one Parquet dataset partitioned by run_id/kind"""
+        try:
+            import pyarrow as pa
+            import pyarrow.dataset as ds
+        except ImportError:
+            logger.warning("pyarrow is not installed, falling back to CSV/JSON output")
+            return False
+        
+        df = pd.concat([
+            self.to_dataframe(smart_traders).assign(kind="smart"),
+            all_metrics_frame().assign(kind="all"),
+        ], ignore_index=True)
+        df["run_id"] = run_id
+        
+        ds.write_dataset(
+            pa.Table.from_pandas(df, preserve_index=False),
+            dataset_dir,
+            format="parquet",
+            partitioning=["run_id", "kind"],
+            partitioning_flavor="hive",
+            existing_data_behavior="overwrite_or_ignore",
+        )
+        return True
+    
+    def open_run_stream(self) -> Optional[MetricsParquetWriter]:
+        """Metrics sink for one run when output.stream_all_metrics is enabled"""
+        output_config = self.config.output
+        if not output_config.stream_all_metrics:
+            return None
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        output_dir = os.path.join(script_dir, output_config.output_dir)
+        os.makedirs(output_dir, exist_ok=True)
+        timestamp = datetime.now().strftime(output_config.timestamp_format)
+        return self.open_metrics_stream(os.path.join(output_dir, f"all_analyzed_{timestamp}.parquet"))
+    
     def run(self, input_file: Optional[str] = None) -> Tuple[List[TraderMetrics], Dict[str, str]]:
         """Run the full analysis pipeline"""
         df = self.load_leaderboard_data(input_file)
@@ -404,9 +855,14 @@ class SmartTraderAnalyzer:
             logger.warning("No traders passed basic filters")
             return [], {}
         
-        all_metrics = self.analyze_candidates(df)
+        sink = self.open_run_stream()
+        if sink is not None:
+            with sink:
+                all_metrics = self.analyze_candidates(df, sink=sink)
+        else:
+            all_metrics = self.analyze_candidates(df)
         smart_traders = self.filter_smart_traders(all_metrics)
-        saved_files = self.save_results(smart_traders, all_metrics)
+        saved_files = self.save_results(smart_traders, all_metrics, all_metrics_file=sink.path if sink else None)
         
         return smart_traders, saved_files
 
@@ -421,8 +877,11 @@ def main():
     parser.add_argument("--min-volume", type=float, default=50000, help="Minimum volume threshold (default: $50,000)")
     parser.add_argument("--min-win-rate", type=float, default=0.50, help="Minimum win rate (default: 0.50)")
     parser.add_argument("--min-positions", type=int, default=5, help="Minimum closed positions (default: 5)")
-    parser.add_argument("--workers", type=int, default=10, help="Number of parallel workers (default: 10)")
+    parser.add_argument("--io-depth", type=int, default=128, help="Wallets fetched concurrently on the aiohttp event loop (default: 128)")
+    parser.add_argument("--workers", type=int, default=10, help="Worker threads when aiohttp is not installed (default: 10)")
     parser.add_argument("--preset", choices=["default", "aggressive", "relaxed"], default="default", help="Use preset configuration")
+    parser.add_argument("--cache-ttl", type=float, default=3600, help="Reuse cached positions younger than this many seconds (default: 3600)")
+    parser.add_argument("--no-cache", action="store_true", help="Always fetch positions from the API")
     
     args = parser.parse_args()
     
@@ -438,6 +897,8 @@ def main():
     config.analysis.min_win_rate = args.min_win_rate
     config.analysis.min_closed_positions = args.min_positions
     config.analysis.max_workers = args.workers
+    config.analysis.io_depth = args.io_depth
+    config.analysis.position_cache_ttl_seconds = 0 if args.no_cache else args.cache_ttl
     
     analyzer = SmartTraderAnalyzer(config)
     smart_traders, saved_files = analyzer.run(args.input)
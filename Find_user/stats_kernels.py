@@ -0,0 +1,241 @@
+"""
+Smart Follower Simulation - Statistical Kernels
+Per-wallet risk/return statistics compiled with Numba when it is available.
+
+``summary_statistics`` computes every risk/return statistic of a 1-D
+float64 ``np.ndarray`` of per-trade returns in a single call,
+``replay_positions`` is the trade-replay loop of the simulation over the
+same kind of flat arrays, and ``group_realized_pnl`` is the per-market
+realized PnL pass of the smart trader finder. Without Numba installed the
+same functions run as regular Python loops.
+"""
+
+import math
+
+import numpy as np
+from scipy import stats
+
+from numeric_utils import njit
+
+
+@njit(cache=True)
+def summary_statistics(pnl, rf):
+    """
+    All per-wallet statistics in one kernel call.
+
+    Returns:
+        (sharpe, sortino, max_drawdown, t_stat, kelly, spread):
+        - sharpe: normalized by sqrt(n) (population std)
+        - sortino: std of negative returns only, uncapped (inf if no downside)
+        - max_drawdown: largest peak-to-trough drop of the cumulative curve
+        - t_stat: one-sample t statistic against a zero mean (ddof=1)
+        - kelly: Kelly fraction clamped to [0, 1]
+        - spread: max - min of the returns (0 means a constant series)
+
+    Not compiled with fastmath because sortino can be infinite.
+    """
+    n = pnl.shape[0]
+    if n == 0:
+        return 0.0, 0.0, 0.0, 0.0, 0.0, 0.0
+
+    # Pass 1: sums, counts, extremes and the drawdown scan
+    total = 0.0
+    down_total = 0.0
+    down_count = 0
+    win_total = 0.0
+    win_count = 0
+    cum = 0.0
+    peak = pnl[0]
+    mdd = 0.0
+    lo = pnl[0]
+    hi = pnl[0]
+    for i in range(n):
+        x = pnl[i]
+        total += x
+        if x < 0:
+            down_total += x
+            down_count += 1
+        elif x > 0:
+            win_total += x
+            win_count += 1
+        lo = min(lo, x)
+        hi = max(hi, x)
+        # Running drawdown on scalars only (no cumsum/accumulate temporaries)
+        cum += x
+        peak = max(peak, cum)
+        mdd = max(mdd, peak - cum)
+    mean = total / n
+    down_mean = down_total / down_count if down_count > 0 else 0.0
+
+    # Pass 2: deviations around the means
+    var = 0.0
+    down_var = 0.0
+    for i in range(n):
+        d = pnl[i] - mean
+        var += d * d
+        if pnl[i] < 0:
+            dd = pnl[i] - down_mean
+            down_var += dd * dd
+
+    # Sharpe
+    std = math.sqrt(var / n)
+    sharpe = (mean - rf) / std * math.sqrt(n) if std > 0 else 0.0
+
+    # Sortino: no (or constant) downside is unbounded if profitable
+    sortino = math.inf if mean > 0 else 0.0
+    if down_count > 0:
+        down_std = math.sqrt(down_var / down_count)
+        if down_std > 0:
+            sortino = (mean - rf) / down_std * math.sqrt(n)
+
+    # t statistic (sample std)
+    t_stat = 0.0
+    if n >= 2:
+        sample_std = math.sqrt(var / (n - 1))
+        if sample_std > 0:
+            t_stat = mean / (sample_std / math.sqrt(n))
+
+    # Kelly from win rate and average win/loss
+    if win_count > 0 and down_count > 0:
+        win_rate = win_count / n
+        avg_win = win_total / win_count
+        avg_loss = abs(down_mean)
+        b = avg_win / avg_loss  # Win/loss ratio
+        k = (b * win_rate - (1 - win_rate)) / b
+    elif win_count > 0:
+        k = 1.0  # All wins
+    else:
+        k = 0.0  # No wins
+    kelly = max(0.0, min(k, 1.0))
+
+    return sharpe, sortino, mdd, t_stat, kelly, hi - lo
+
+
+@njit(cache=True)
+def replay_positions(codes, is_buy, is_sell, sim_price, size, n_assets):
+    """
+    Replay trades in order on per-asset positions (weighted average cost).
+
+    Args:
+        codes: Asset index of each trade in [0, n_assets).
+        is_buy, is_sell: Boolean side masks.
+        sim_price: Trade price with slippage applied (BUY pays more, SELL receives less).
+        size: Trade shares.
+
+    Returns:
+        (realized, pnl_abs, pnl_pct, sell_size, entry_price, pos_size,
+        cost_basis, avg_price): the first five are per trade and only
+        meaningful where ``realized`` is True; the last three are the final
+        per-asset position state.
+    """
+    n = codes.shape[0]
+    pos_size = np.zeros(n_assets)
+    cost_basis = np.zeros(n_assets)
+    avg_price = np.zeros(n_assets)
+
+    realized = np.zeros(n, dtype=np.bool_)
+    pnl_abs = np.zeros(n)
+    pnl_pct = np.zeros(n)
+    sell_size = np.zeros(n)
+    entry_price = np.zeros(n)
+
+    for i in range(n):
+        a = codes[i]
+        if is_buy[i]:
+            cost = sim_price[i] * size[i]
+            new_size = pos_size[a] + size[i]
+            new_cost = cost_basis[a] + cost
+            pos_size[a] = new_size
+            cost_basis[a] = new_cost
+            if new_size > 0:
+                avg_price[a] = new_cost / new_size
+        elif is_sell[i]:
+            # No inventory (e.g. bought before the lookback window): ignore
+            if pos_size[a] <= 0.0001:
+                continue
+            sold = min(size[i], pos_size[a])
+            sell_price = sim_price[i]
+            entry = avg_price[a]
+
+            realized[i] = True
+            pnl_abs[i] = (sell_price - entry) * sold
+            pnl_pct[i] = (sell_price - entry) / entry if entry > 0 else 0.0
+            sell_size[i] = sold
+            entry_price[i] = entry
+
+            # Reduce size and cost basis proportionally; avg_price is unchanged
+            pct_sold = sold / pos_size[a]
+            pos_size[a] -= sold
+            cost_basis[a] *= (1 - pct_sold)
+
+    return (realized, pnl_abs, pnl_pct, sell_size, entry_price,
+            pos_size, cost_basis, avg_price)
+
+
+@njit(cache=True)
+def group_realized_pnl(codes, is_buy, is_sell, size, amount, n_groups):
+    """
+    Per-group volumes and realized PnL of sells against the average buy price.
+
+    Args:
+        codes: Group index of each trade in [0, n_groups) (any order).
+        is_buy, is_sell: Boolean side masks.
+        size, amount: Trade shares and shares * price.
+
+    Returns:
+        (buy_vol, sell_vol, avg_buy_price, total_pnl, wins, losses,
+        total_profit, total_loss): the first three are per group; groups
+        without buys are skipped, and wins/losses count groups whose realized
+        PnL is above 0.01 / below -0.01.
+    """
+    buy_vol = np.zeros(n_groups)
+    sell_vol = np.zeros(n_groups)
+    buy_amt = np.zeros(n_groups)
+    sell_amt = np.zeros(n_groups)
+    for i in range(codes.shape[0]):
+        g = codes[i]
+        if is_buy[i]:
+            buy_vol[g] += size[i]
+            buy_amt[g] += amount[i]
+        elif is_sell[i]:
+            sell_vol[g] += size[i]
+            sell_amt[g] += amount[i]
+
+    avg_buy_price = np.zeros(n_groups)
+    total_pnl = 0.0
+    total_profit = 0.0
+    total_loss = 0.0
+    wins = 0
+    losses = 0
+    for g in range(n_groups):
+        if buy_vol[g] == 0:
+            continue
+        avg_buy_price[g] = buy_amt[g] / buy_vol[g]
+        if sell_vol[g] > 0:
+            pnl = sell_amt[g] - sell_vol[g] * avg_buy_price[g]
+            total_pnl += pnl
+            if pnl > 0.01:
+                wins += 1
+                total_profit += pnl
+            elif pnl < -0.01:
+                losses += 1
+                total_loss -= pnl
+
+    return (buy_vol, sell_vol, avg_buy_price, total_pnl, wins, losses,
+            total_profit, total_loss)
+
+
+def pvalue_from_t(t_stat: float, n: int, spread: float) -> float:
+    """
+    One-tailed p-value for H0: mean <= 0 from summary_statistics() output.
+
+    Equivalent to halving ``scipy.stats.ttest_1samp`` in the direction of the
+    alternative, without the per-call overhead of the full test.
+    """
+    if n < 2 or spread == 0:
+        return 1.0
+    return float(stats.t.sf(t_stat, n - 1))
+
+
+# Compile (or load from the on-disk cache) at import instead of on the first wallet
+summary_statistics(np.zeros(2), 0.0)
@@ -1,8 +1,13 @@
+import asyncio
+import numpy as np
 import pandas as pd
 import time
 import os
+from collections import OrderedDict
 from datetime import datetime
+from itertools import takewhile
 from polymarket_data_fetcher import PolymarketDataFetcher
+from numeric_utils import njit, to_float64
 
 try:
     from user_listener.trade_handlers import BaseTradeHandler, ConsoleLogHandler
@@ -10,6 +15,58 @@ except ImportError:
     from trade_handlers import BaseTradeHandler, ConsoleLogHandler
 
 import threading
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import aiohttp
+except ImportError:  # aiohttp 为可选依赖，未安装时退回每个地址一个线程
+    aiohttp = None
+
+# 每个地址最多记住的交易 Hash 数 (远大于单次拉取的 50 条)
+SEEN_HASHES_MAXLEN = 4096
+
+# 心跳文件 (项目根目录下)，空闲时每个地址最多每 HEARTBEAT_INTERVAL 秒写一次
+HEARTBEAT_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "monitored_trades", "heartbeat.log")
+HEARTBEAT_INTERVAL = 15
+
+def _side_masks(sides):
+    """BUY/SELL 掩码 (不区分大小写)：只对去重后的几个取值做大写转换，而不是逐行 .str.upper()"""
+    codes, uniques = pd.factorize(sides)
+    # 末尾的空串对应缺失值 (factorize 编码为 -1)
+    upper = np.array([str(u).upper() for u in uniques] + [''], dtype=object)
+    side = upper[codes]
+    return side == 'BUY', side == 'SELL'
+
+
+@njit(cache=True)
+def _net_settle(codes, is_buy, is_sell, size, ts, n_groups):
+    """
+    单次遍历完成各市场分组的净额结算
+    codes 为每行的分组编号 (-1 表示缺少 conditionId/outcome，忽略)
+    返回 (buy_vol, sell_vol, first_idx, last_buy_idx, last_sell_idx)：
+    last_*_idx 为该方向时间戳最大的行 (同时间戳取靠后的行)，没有该方向交易时为 -1
+    """
+    buy_vol = np.zeros(n_groups)
+    sell_vol = np.zeros(n_groups)
+    first_idx = np.full(n_groups, -1, dtype=np.int64)
+    last_buy_idx = np.full(n_groups, -1, dtype=np.int64)
+    last_sell_idx = np.full(n_groups, -1, dtype=np.int64)
+    for i in range(codes.shape[0]):
+        g = codes[i]
+        if g < 0:
+            continue
+        if first_idx[g] < 0:
+            first_idx[g] = i
+        if is_buy[i]:
+            buy_vol[g] += size[i]
+            if last_buy_idx[g] < 0 or ts[i] >= ts[last_buy_idx[g]]:
+                last_buy_idx[g] = i
+        elif is_sell[i]:
+            sell_vol[g] += size[i]
+            if last_sell_idx[g] < 0 or ts[i] >= ts[last_sell_idx[g]]:
+                last_sell_idx[g] = i
+    return buy_vol, sell_vol, first_idx, last_buy_idx, last_sell_idx
+
 
 class AccountListener:
     def __init__(self, wallet_addresses: list, poll_interval: int = 1):
@@ -23,8 +80,8 @@ class AccountListener:
         # 每个地址独立维护状态
         # {address: last_timestamp}
         self.state_timestamps = {addr: 0 for addr in self.wallet_addresses}
-        # {address: set(last_hashes)}
-        self.state_hashes = {addr: set() for addr in self.wallet_addresses}
+        # {address: OrderedDict(last_hashes -> None)}，按最近出现顺序排列的 LRU，超出上限时淘汰最久未出现的 Hash
+        self.state_hashes = {addr: OrderedDict() for addr in self.wallet_addresses}
         
         self.handlers = []
         self.running = False
@@ -33,6 +90,17 @@ class AccountListener:
         """注册一个新的交易处理器"""
         self.handlers.append(handler)
 
+    def _remember_hashes(self, address, hashes):
+        """记录 (或刷新) 出现过的 Hash，超过 SEEN_HASHES_MAXLEN 时淘汰最久未出现的那些"""
+        seen = self.state_hashes[address]
+        for h in hashes:
+            if h in seen:
+                seen.move_to_end(h)
+                continue
+            seen[h] = None
+            if len(seen) > SEEN_HASHES_MAXLEN:
+                seen.popitem(last=False)
+
     def _filter_and_net_trades(self, new_trades_df):
         """
         对一批新交易进行净额结算和过滤。
@@ -40,155 +108,201 @@ class AccountListener:
         if new_trades_df.empty:
             return []
         
-        # 转换数字列确保计算正确
-        df = new_trades_df.copy()
-        df['size'] = pd.to_numeric(df['size'], errors='coerce').fillna(0)
-        df['price'] = pd.to_numeric(df['price'], errors='coerce').fillna(0)
+        # 转换数字列确保计算正确 (只读取原表，不复制整批数据)
+        df = new_trades_df
+        size = to_float64(df['size'])
+        price = to_float64(df['price'])
+        ts = df['timestamp'].to_numpy(dtype=np.float64)
         
-        final_trades_to_process = []
-        
-        # 按市场 (conditionId + outcome) 分组
-        groups = df.groupby(['conditionId', 'outcome'])
+        is_buy, is_sell = _side_masks(df['side'])
+
+        # 按市场 (conditionId + outcome) 分组编号 (与 groupby 的排序一致)，一次遍历汇总总买入和总卖出数量
+        # 缺少 conditionId/outcome 的行 ngroup 为 NaN，显式记为 -1 (直接转 int64 的结果依赖平台)
+        codes = df.groupby(['conditionId', 'outcome']).ngroup().fillna(-1).to_numpy(dtype=np.int64)
+        n_groups = max(int(codes.max()) + 1, 0) if len(codes) else 0
+        buy_vol, sell_vol, first_idx, last_buy_idx, last_sell_idx = _net_settle(
+            codes, is_buy, is_sell, size, ts, n_groups)
+
+        # 净额 = 买入 - 卖出
+        net_size = buy_vol - sell_vol
+        offset = np.abs(net_size) < 1e-5
+
+        # 逻辑 A: 如果买卖完全抵消
+        for g in np.flatnonzero(offset & (buy_vol > 0) & (sell_vol > 0)).tolist():
+            market_title = df['title'].iat[first_idx[g]] if 'title' in df else 'Unknown Market'
+            print(f"\n⚡ [过滤] 市场: {market_title}")
+            print(f"   检测到短期套现/完全对冲: 买入({buy_vol[g]:.2f}) vs 卖出({sell_vol[g]:.2f})")
+
+        # 逻辑 B: 如果有净额剩余，以该方向最后一笔交易为模板
+        remaining = np.flatnonzero(~offset)
+        template_idx = np.where(net_size[remaining] > 0, last_buy_idx[remaining], last_sell_idx[remaining])
+        valid = template_idx >= 0
+        if not valid.any():
+            return []
+
+        rows = template_idx[valid]
+        net_abs = np.abs(net_size[remaining[valid]])
+
+        # 按原始时间线重排 (稳定排序，同时间戳保持分组顺序)，只复制选中的模板行
+        order = np.argsort(ts[rows], kind='stable')
+        rows = rows[order]
+        templates = df.iloc[rows].copy()
+        templates['size'] = net_abs[order]
+        templates['price'] = price[rows]
+        return templates.to_dict('records')
+
+    def _init_start(self, target_address, initial_trades):
+        """以最近一笔交易作为监听起点"""
+        if initial_trades:
+            self.state_timestamps[target_address] = initial_trades[0]['timestamp']
+            self._remember_hashes(target_address, [initial_trades[0]['transactionHash']])
+            print(f"📍 [{target_address[:8]}..] 初始化起点: {datetime.fromtimestamp(self.state_timestamps[target_address]).strftime('%H:%M:%S')}")
+        else:
+            print(f"⚠️ [{target_address[:8]}..] 无历史交易")
+
+    def _process_trades(self, target_address, trades):
+        """筛选一次轮询结果中的新交易并分发给处理器，返回新交易数"""
+        # 2. 筛选真正的新交易
+        current_last_ts = self.state_timestamps[target_address]
+        current_hashes = self.state_hashes[target_address]
         
-        for (cid, outcome), group in groups:
-            market_title = group.iloc[0].get('title', 'Unknown Market')
-            
-            # 计算总买入和总卖出数量
-            buys = group[group['side'].str.upper() == 'BUY']
-            sells = group[group['side'].str.upper() == 'SELL']
-            
-            total_buy_size = buys['size'].sum()
-            total_sell_size = sells['size'].sum()
-            
-            # 净额 = 买入 - 卖出
-            net_size = total_buy_size - total_sell_size
+        # API 按时间倒序返回：时间戳不早于上次记录的交易是列表前缀，遇到更早的即可停止
+        window = list(takewhile(lambda t: t['timestamp'] >= current_last_ts, trades))
+        new_trades_batch = [t for t in window if t['transactionHash'] not in current_hashes]
+
+        # 窗口内的 Hash (新交易 + 仍停在水位线上的旧交易) 都刷新为最近出现，避免被淘汰后重复处理
+        self._remember_hashes(target_address, [t['transactionHash'] for t in window])
+
+        if not new_trades_batch:
+            return 0
+
+        # 3. 更新状态
+        self.state_timestamps[target_address] = max(current_last_ts, max(t['timestamp'] for t in new_trades_batch))
             
-            # 逻辑 A: 如果买卖完全抵消
-            if abs(net_size) < 1e-5:
-                if total_buy_size > 0 and total_sell_size > 0:
-                    print(f"\n⚡ [过滤] 市场: {market_title}")
-                    print(f"   检测到短期套现/完全对冲: 买入({total_buy_size:.2f}) vs 卖出({total_sell_size:.2f})")
-                continue
+        now = datetime.now().strftime('%H:%M:%S')
+        
+        # --- A. 原始数据 (Display) ---
+        print(f"\n🔔 [{target_address[:6]}..] 捕获新交易 | {now}")
+        for raw_trade in sorted(new_trades_batch, key=lambda t: t['timestamp']):
+            trade_dict = dict(raw_trade)
+            context = {"wallet_address": target_address, "now": now}
             
-            # 逻辑 B: 如果有净额剩余
-            if net_size > 0:
-                # 净买入
-                template_trade = buys.sort_values('timestamp').iloc[-1].to_dict()
-                template_trade['size'] = net_size
-                final_trades_to_process.append(template_trade)
-            else:
-                # 净卖出
-                template_trade = sells.sort_values('timestamp').iloc[-1].to_dict()
-                template_trade['size'] = abs(net_size)
-                final_trades_to_process.append(template_trade)
-
-        # 按原始时间线重排
-        final_trades_to_process.sort(key=lambda x: x['timestamp'])
-        return final_trades_to_process
+            for handler in self.handlers:
+                if getattr(handler, 'is_display', False):
+                    handler.handle_trade(trade_dict, context)
+
+        # --- B. 净额执行 (Execution) ---
+        processed_trades = self._filter_and_net_trades(pd.DataFrame(new_trades_batch))
+        if processed_trades:
+            for trade_dict in processed_trades:
+                context = {"wallet_address": target_address, "now": now}
+                for handler in self.handlers:
+                    if not getattr(handler, 'is_display', False):
+                        handler.handle_trade(trade_dict, context)
+
+        return len(new_trades_batch)
+
+    def _write_heartbeat(self, target_address):
+        """写入心跳文件，方便用户查岗"""
+        try:
+            os.makedirs(os.path.dirname(HEARTBEAT_FILE), exist_ok=True)
+            with open(HEARTBEAT_FILE, "a") as f:
+                f.write(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Running...\n")
+        except Exception as file_e: 
+            print(f"⚠️ [{target_address[:8]}..] 写入心跳文件失败: {file_e}")
 
     def _listen_loop(self, target_address):
-        """单个地址的监听循环"""
+        """单个地址的监听循环 (线程版，未安装 aiohttp 时使用)"""
         print(f"🚀 [线程启动] 开始监听: {target_address}")
         
         # 初始化起点
         try:
-            initial_trades = self.fetcher.get_trades(wallet_address=target_address, limit=1, silent=True)
-            if not initial_trades.empty:
-                self.state_timestamps[target_address] = initial_trades.iloc[0]['timestamp']
-                self.state_hashes[target_address].add(initial_trades.iloc[0]['transactionHash'])
-                print(f"📍 [{target_address[:8]}..] 初始化起点: {datetime.fromtimestamp(self.state_timestamps[target_address]).strftime('%H:%M:%S')}")
-            else:
-                print(f"⚠️ [{target_address[:8]}..] 无历史交易")
+            initial_trades = self.fetcher.get_trades(wallet_address=target_address, limit=1, silent=True, raw=True)
+            self._init_start(target_address, initial_trades)
         except Exception as e:
             print(f"❌ [{target_address[:8]}..] 初始化失败: {e}")
 
+        next_heartbeat = 0
+
         while self.running:
             try:
                 # 1. 获取最近的交易 (增加 limit 以更好处理高频并发)
-                trades_df = self.fetcher.get_trades(wallet_address=target_address, limit=50, silent=True)
-                
-                num_fetched = len(trades_df)
-                new_count = 0
-                
-                if not trades_df.empty:
-                    # 2. 筛选真正的新交易
-                    current_last_ts = self.state_timestamps[target_address]
-                    current_hashes = self.state_hashes[target_address]
-                    
-                    new_trades_batch = trades_df[
-                        (trades_df['timestamp'] >= current_last_ts) & 
-                        (~trades_df['transactionHash'].isin(current_hashes))
-                    ]
-
-                    if not new_trades_batch.empty:
-                        new_count = len(new_trades_batch)
-                        # 3. 更新状态
-                        self.state_timestamps[target_address] = max(current_last_ts, new_trades_batch['timestamp'].max())
-                        for h in new_trades_batch['transactionHash'].tolist():
-                            self.state_hashes[target_address].add(h)
-                            
-                        now = datetime.now().strftime('%H:%M:%S')
-                        
-                        # --- A. 原始数据 (Display) ---
-                        print(f"\n🔔 [{target_address[:6]}..] 捕获新交易 | {now}")
-                        for _, raw_trade in new_trades_batch.sort_values('timestamp').iterrows():
-                            trade_dict = raw_trade.to_dict()
-                            context = {"wallet_address": target_address, "now": now}
-                            
-                            for handler in self.handlers:
-                                if getattr(handler, 'is_display', False):
-                                    handler.handle_trade(trade_dict, context)
-
-                        # --- B. 净额执行 (Execution) ---
-                        processed_trades = self._filter_and_net_trades(new_trades_batch)
-                        if processed_trades:
-                            for trade_dict in processed_trades:
-                                context = {"wallet_address": target_address, "now": now}
-                                for handler in self.handlers:
-                                    if not getattr(handler, 'is_display', False):
-                                        handler.handle_trade(trade_dict, context)
-                        
-                        # 清理过期的 Hash 缓存
-                        if len(self.state_hashes[target_address]) > 300:
-                             self.state_hashes[target_address] = set(new_trades_batch['transactionHash'].tolist())
+                # 轮询时直接处理 JSON 列表，只有出现新交易时才构造 DataFrame
+                trades = self.fetcher.get_trades(wallet_address=target_address, limit=50, silent=True, raw=True)
+                new_count = self._process_trades(target_address, trades) if trades else 0
 
                 time.sleep(self.poll_interval)
-                # 如果没有新交易，打印心跳
-                # 如果没有新交易，打印心跳 (降低频率，每60秒一次)
-                if new_count == 0:
-                    now = datetime.now().strftime('%H:%M:%S') 
-                    # 初始化计数器 (在循环外最好，但这里为了最小化改动，使用取模时间)
-                    # 更好的方式: 检查秒数是否为 '00'
-                    if now.endswith(':00') or now.endswith(':30'): # 每30秒打印一次
-                         # 避免同一秒重复打印 (虽然 sleep(1) 理论上不会)
-                         pass
-                         # print(f"🔍 [{now}] 正在监听... (系统正常运行中)") # 暂时完全静默，只记录重要事件
-                    
-                    # 仍然保留心跳文件更新
-
-                    
-                    # [新增] 写入心跳文件，方便用户查岗
-                    try:
-                        # 写入文件到项目根目录
-                        root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-                        monitor_dir = os.path.join(root_dir, "monitored_trades")
-                        os.makedirs(monitor_dir, exist_ok=True)
-                        
-                        with open(os.path.join(monitor_dir, "heartbeat.log"), "a") as f:
-                            f.write(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Running...\n")
-                    except Exception as file_e: 
-                        print(f"⚠️ [{target_address[:8]}..] 写入心跳文件失败: {file_e}")
+                # 没有新交易时写入心跳文件 (节流：每个地址每 HEARTBEAT_INTERVAL 秒一次)
+                if new_count == 0 and time.time() >= next_heartbeat:
+                    next_heartbeat = time.time() + HEARTBEAT_INTERVAL
+                    self._write_heartbeat(target_address)
 
             except Exception as e:
                 print(f"❌ [{target_address[:8]}..] 监听循环出错: {e}")
                 time.sleep(self.poll_interval)
 
+    async def _alisten_loop(self, session, executor, target_address, start_delay):
+        """
+        单个地址的监听协程 (所有地址共用一个事件循环和一个 aiohttp 会话)
+        轮询等待都在事件循环里完成；处理器会下单、发邮件等阻塞操作，放到线程池执行，
+        同一地址的批次仍按顺序逐个处理
+        """
+        loop = asyncio.get_running_loop()
+        await asyncio.sleep(start_delay) # 错峰启动
+        print(f"🚀 [协程启动] 开始监听: {target_address}")
+
+        # 初始化起点
+        try:
+            initial_trades = await self.fetcher.aget_trades(session, target_address, limit=1, silent=True, raw=True)
+            self._init_start(target_address, initial_trades)
+        except Exception as e:
+            print(f"❌ [{target_address[:8]}..] 初始化失败: {e}")
+
+        next_heartbeat = 0
+
+        while self.running:
+            try:
+                trades = await self.fetcher.aget_trades(session, target_address, limit=50, silent=True, raw=True)
+                new_count = 0
+                if trades:
+                    new_count = await loop.run_in_executor(executor, self._process_trades, target_address, trades)
+
+                await asyncio.sleep(self.poll_interval)
+                if new_count == 0 and time.time() >= next_heartbeat:
+                    next_heartbeat = time.time() + HEARTBEAT_INTERVAL
+                    self._write_heartbeat(target_address)
+
+            except Exception as e:
+                print(f"❌ [{target_address[:8]}..] 监听循环出错: {e}")
+                await asyncio.sleep(self.poll_interval)
+
+    async def _alisten_all(self):
+        """在一个事件循环里并发运行所有地址的监听协程"""
+        executor = ThreadPoolExecutor(max_workers=max(1, len(self.wallet_addresses)))
+        try:
+            async with self.fetcher.create_async_session() as session:
+                await asyncio.gather(*[
+                    self._alisten_loop(session, executor, addr, i * 0.5)
+                    for i, addr in enumerate(self.wallet_addresses)
+                ])
+        finally:
+            executor.shutdown(wait=False)
+
     def start_listening(self):
         print(f"🛡️  启动多路监听系统 (共 {len(self.wallet_addresses)} 个目标)")
         print(f"⏱️  轮询间隔: {self.poll_interval} 秒")
         print("-" * 80)
         
         self.running = True
+
+        if aiohttp is not None:
+            try:
+                asyncio.run(self._alisten_all())
+            except KeyboardInterrupt:
+                print("\n🛑 正在停止所有监听协程...")
+                self.running = False
+            return
+
         threads = []
         
         for addr in self.wallet_addresses:
@@ -205,6 +319,7 @@ class AccountListener:
             print("\n🛑 正在停止所有监听线程...")
             self.running = False
 
+
 if __name__ == "__main__":
     import config
     import sys
@@ -7,12 +7,61 @@ except ImportError:
     import config
 import time
 import datetime
+import atexit
+import queue
+import threading
 
 class EmailNotifier:
     _last_alert_date = None  # Tracks the date of the last alert
+    _server = None  # 复用的 SMTP 连接 (TLS 握手 + 登录只在首次或断线后进行)
+    _server_lock = threading.Lock()
+    _queue = None  # send_email_nowait 的后台发送队列
+    _queue_lock = threading.Lock()
 
     @staticmethod
-    def send_email(subject, body):
+    def _connect():
+        # 根据端口自动选择 SSL 或 TLS
+        if config.SMTP_PORT == 465:
+            server = smtplib.SMTP_SSL(config.SMTP_SERVER, config.SMTP_PORT)
+            # 465 已经是 SSL 连接，不需要 starttls()
+        else:
+            server = smtplib.SMTP(config.SMTP_SERVER, config.SMTP_PORT)
+            server.starttls()
+        
+        server.login(config.SMTP_USER, config.SMTP_PASSWORD)
+        return server
+
+    @classmethod
+    def _get_server(cls):
+        """返回可用的连接：已有连接先 NOOP 探活，服务器已断开 (空闲超时) 时重新连接"""
+        if cls._server is not None:
+            try:
+                if cls._server.noop()[0] == 250:
+                    return cls._server
+            except (smtplib.SMTPException, OSError):
+                pass
+            cls._close_server()
+        cls._server = cls._connect()
+        return cls._server
+
+    @classmethod
+    def _close_server(cls):
+        if cls._server is None:
+            return
+        try:
+            cls._server.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+        cls._server = None
+
+    @classmethod
+    def close(cls):
+        """关闭复用的 SMTP 连接 (进程退出时自动调用)"""
+        with cls._server_lock:
+            cls._close_server()
+
+    @classmethod
+    def send_email(cls, subject, body):
         """发送邮件通用方法"""
         if not config.SMTP_USER or not config.SMTP_PASSWORD or not config.EMAIL_RECEIVER:
             print("⚠️ 邮件发送失败: 未配置 SMTP 信息 (SMTP_USER, SMTP_PASSWORD, EMAIL_RECEIVER)")
@@ -25,25 +74,43 @@ class EmailNotifier:
             msg['Subject'] = subject
 
             msg.attach(MIMEText(body, 'plain'))
-
-            # 根据端口自动选择 SSL 或 TLS
-            if config.SMTP_PORT == 465:
-                server = smtplib.SMTP_SSL(config.SMTP_SERVER, config.SMTP_PORT)
-                # 465 已经是 SSL 连接，不需要 starttls()
-            else:
-                server = smtplib.SMTP(config.SMTP_SERVER, config.SMTP_PORT)
-                server.starttls()
-            
-            server.login(config.SMTP_USER, config.SMTP_PASSWORD)
             text = msg.as_string()
-            server.sendmail(config.SMTP_USER, config.EMAIL_RECEIVER, text)
-            server.quit()
+
+            with cls._server_lock:
+                try:
+                    cls._get_server().sendmail(config.SMTP_USER, config.EMAIL_RECEIVER, text)
+                except smtplib.SMTPServerDisconnected:
+                    # 探活后仍可能被断开，重连后重试一次
+                    cls._close_server()
+                    cls._get_server().sendmail(config.SMTP_USER, config.EMAIL_RECEIVER, text)
             print(f"📧 邮件已发送给 {config.EMAIL_RECEIVER}: {subject}")
             return True
         except Exception as e:
+            with cls._server_lock:
+                cls._close_server()
             print(f"❌ 邮件发送出错: {e}")
             return False
 
+    @classmethod
+    def send_email_nowait(cls, subject, body, on_done=None):
+        """
+        放入后台线程发送，不阻塞调用方 (如交易处理线程)
+        on_done(success) 在发送完成后于后台线程中调用
+        """
+        with cls._queue_lock:
+            if cls._queue is None:
+                cls._queue = queue.Queue()
+                threading.Thread(target=cls._send_worker, daemon=True).start()
+        cls._queue.put((subject, body, on_done))
+
+    @classmethod
+    def _send_worker(cls):
+        while True:
+            subject, body, on_done = cls._queue.get()
+            success = cls.send_email(subject, body)
+            if on_done is not None:
+                on_done(success)
+
     @classmethod
     def send_low_balance_alert(cls, current_balance, min_required):
         """发送余额不足警报 (每日仅一次)"""
@@ -51,9 +118,10 @@ class EmailNotifier:
         tz_offset = datetime.timezone(datetime.timedelta(hours=8))
         today = datetime.datetime.now(tz_offset).date()
 
-        # 如果今天已经发送过，直接返回
+        # 如果今天已经发送过 (或正在发送)，直接返回
         if cls._last_alert_date == today:
             return
+        cls._last_alert_date = today
 
         subject = f"🚨 [Polymarket] 余额不足警报 (${current_balance:.2f})"
         body = f"""
@@ -72,8 +140,13 @@ class EmailNotifier:
 Polymarket Trader Bot
         """
         
-        if cls.send_email(subject, body):
-            cls._last_alert_date = today
+        def on_done(success):
+            # 发送失败时允许下次检测到余额不足时重试
+            if not success and cls._last_alert_date == today:
+                cls._last_alert_date = None
+
+        # 报警在交易处理线程中触发，后台发送避免阻塞下单
+        cls.send_email_nowait(subject, body, on_done)
 
     @staticmethod
     def send_daily_report(report_date_str, pnl_data, trades_df):
@@ -114,3 +187,6 @@ Polymarket Trader Bot
 Polymarket Trader Bot
         """
         return EmailNotifier.send_email(subject, body)
+
+
+atexit.register(EmailNotifier.close)
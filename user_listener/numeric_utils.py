@@ -0,0 +1,24 @@
+"""
+数值工具
+可选的 Numba JIT 装饰器，以及 API 数值列的快速转换
+"""
+
+import numpy as np
+import pandas as pd
+
+try:
+    from numba import njit
+except ImportError:  # numba 为可选依赖，未安装时以普通 Python 循环运行
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+
+def to_float64(series):
+    """数值列快速转换：API 返回的干净数值/数字字符串直接 astype，含非法值时才退回 to_numeric 逐元素解析 (缺失/非法值记为 0)"""
+    try:
+        values = series.to_numpy(dtype=np.float64)
+    except (TypeError, ValueError):
+        return pd.to_numeric(series, errors='coerce').fillna(0).to_numpy(dtype=np.float64)
+    return np.nan_to_num(values, nan=0.0, posinf=np.inf, neginf=-np.inf)
@@ -3,14 +3,27 @@ Polymarket 数据获取工具
 支持 Gamma API 和 Data API
 """
 
+import os
+import sys
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 import pandas as pd
 import json
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, List, Any, Union
 from datetime import datetime
 
+# 重试策略和异步接口与 Find_user 共用一份实现 (Find_user/http_utils.py)
+_FIND_USER_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Find_user")
+if _FIND_USER_DIR not in sys.path:
+    sys.path.append(_FIND_USER_DIR)  # 追加在末尾，不会遮蔽本目录下的同名模块
+
+import http_utils
+from http_utils import RETRY_STATUSES, MAX_RETRIES, RETRY_BACKOFF_SECONDS
+
+# 连接池大小：并发线程多于默认的 10 个连接时，多出的连接用完即丢弃，需要重新握手
+HTTP_POOL_SIZE = 64
+
 
 class PolymarketDataFetcher:
     """Polymarket API 数据获取工具类（Gamma API + Data API）"""
@@ -22,12 +35,12 @@ class PolymarketDataFetcher:
         # 初始化带重试的 Session
         self.session = requests.Session()
         retries = Retry(
-            total=3,
-            backoff_factor=1,
-            status_forcelist=[429, 500, 502, 503, 504],
+            total=MAX_RETRIES,
+            backoff_factor=RETRY_BACKOFF_SECONDS,
+            status_forcelist=list(RETRY_STATUSES),
             allowed_methods=["GET"]
         )
-        adapter = HTTPAdapter(max_retries=retries)
+        adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE, max_retries=retries)
         self.session.mount("https://", adapter)
         self.session.mount("http://", adapter)
     
@@ -78,7 +91,8 @@ class PolymarketDataFetcher:
     
     def get_markets(self, active: Optional[bool] = None, closed: Optional[bool] = None,
                     event_id: Optional[str] = None, slug: Optional[str] = None,
-                    condition_id: Optional[str] = None, limit: int = 10, offset: int = 0) -> pd.DataFrame:
+                    condition_id: Optional[str] = None, condition_ids: Optional[List[str]] = None,
+                    limit: int = 10, offset: int = 0) -> pd.DataFrame:
         """
         获取市场列表
         
@@ -88,6 +102,7 @@ class PolymarketDataFetcher:
             event_id: 按事件ID筛选
             slug: 按slug筛选
             condition_id: 按条件ID筛选
+            condition_ids: 按多个条件ID批量筛选 (一次请求)
             limit: 返回结果数量限制
             offset: 分页偏移量
         
@@ -107,6 +122,8 @@ class PolymarketDataFetcher:
             params["slug"] = slug
         if condition_id:
             params["condition_id"] = condition_id
+        if condition_ids:
+            params["condition_ids"] = list(condition_ids)
         
         return self._make_request(url, params, "市场")
     
@@ -238,9 +255,13 @@ class PolymarketDataFetcher:
     # ==================== Data API - Market Activity ====================
     
     def get_trades(self, market_id: Optional[str] = None, wallet_address: Optional[str] = None,
-                   limit: int = 100, offset: int = 0, silent: bool = False) -> pd.DataFrame:
+                   limit: int = 100, offset: int = 0, silent: bool = False,
+                   raw: bool = False) -> Union[pd.DataFrame, List[Dict]]:
         """
         获取交易记录 (支持自动分页)
+
+        raw=True 时直接返回解析后的 JSON 列表，不构造 DataFrame
+        (供高频轮询使用，每次只有几十条数据)
         """
         url = f"{self.data_api_base}/trades"
         all_trades = []
@@ -263,14 +284,7 @@ class PolymarketDataFetcher:
                 # 不直接用 _make_request 里面的打印，为了静默分页
                 response = self.session.get(url, params=params)
                 response.raise_for_status()
-                data = response.json()
-                
-                # 处理不同格式
-                batch = []
-                if isinstance(data, list):
-                    batch = data
-                elif isinstance(data, dict):
-                    batch = data.get('data', [data] if data else [])
+                batch = self._trades_batch(response.json())
                 
                 if not batch:
                     break
@@ -287,10 +301,15 @@ class PolymarketDataFetcher:
                 print(f"❌ 分页抓取交易失败 at offset {current_offset}: {e}")
                 break
         
+        if raw:
+            return all_trades
+
         df = pd.DataFrame(all_trades)
         if not df.empty and not silent:
             print(f"✅ 成功获取 {len(df)} 条交易数据 (Limit: {limit})")
         return df
+
+    _trades_batch = staticmethod(http_utils.trades_batch)
     
     def get_market_holders(self, market_id: str, limit: int = 100) -> pd.DataFrame:
         """
@@ -340,6 +359,25 @@ class PolymarketDataFetcher:
     
 
     
+    # ==================== Async API (aiohttp) ====================
+    # 供监听器在单个事件循环里同时轮询多个钱包；会话创建、重试和分页见 http_utils
+
+    create_async_session = staticmethod(http_utils.create_async_session)
+
+    async def aget_trades(self, session: "aiohttp.ClientSession", wallet_address: str,
+                          limit: int = 100, offset: int = 0, silent: bool = False,
+                          raw: bool = False) -> Union[pd.DataFrame, List[Dict]]:
+        """get_trades (按钱包) 的异步版本，同样自动分页"""
+        all_trades = await http_utils.aget_wallet_trades(
+            session, f"{self.data_api_base}/trades", wallet_address, limit=limit, offset=offset)
+        if raw:
+            return all_trades
+
+        df = pd.DataFrame(all_trades)
+        if not df.empty and not silent:
+            print(f"✅ 成功获取 {len(df)} 条交易数据 (Limit: {limit})")
+        return df
+    
     # ==================== Helper Methods ====================
     
     def _make_request(self, url: str, params: Dict, data_type: str) -> pd.DataFrame:
@@ -15,6 +15,7 @@ Polymarket 下单模块
 
 import json
 import requests
+from typing import Optional
 from py_clob_client.client import ClobClient
 from py_clob_client.clob_types import OrderArgs, OrderType, BalanceAllowanceParams, CreateOrderOptions
 from py_clob_client.order_builder.constants import BUY, SELL
@@ -26,7 +27,8 @@ class PolymarketTrader:
     HOST = "https://clob.polymarket.com"
     CHAIN_ID = 137  # Polygon mainnet
     
-    def __init__(self, private_key: str, funder_address: str, signature_type: int = 1):
+    def __init__(self, private_key: str, funder_address: str, signature_type: int = 1,
+                 session: Optional[requests.Session] = None):
         """
         初始化交易客户端
         
@@ -37,11 +39,13 @@ class PolymarketTrader:
                 - 1: Magic/Email/Google 登录 (推荐)
                 - 2: 浏览器钱包 (MetaMask等)
                 - 0: EOA 直接交易
+            session: 查询订单簿用的 HTTP Session (复用连接，避免每次请求重新握手)
         """
         self.private_key = private_key
         self.funder_address = funder_address
         self.signature_type = signature_type
         self.client = None
+        self.session = session or requests.Session()
         self._init_client()
     
     def _init_client(self):
@@ -68,7 +72,7 @@ class PolymarketTrader:
     def get_orderbook(self, token_id: str) -> dict:
         """获取订单簿"""
         url = f"{self.HOST}/book"
-        resp = requests.get(url, params={"token_id": token_id})
+        resp = self.session.get(url, params={"token_id": token_id}, timeout=5)
         return resp.json()
     
     def get_best_prices(self, token_id: str) -> tuple:
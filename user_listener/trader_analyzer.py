@@ -1,13 +1,58 @@
 import pandas as pd
+import numpy as np
 import json
+import os
+import threading
+import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from polymarket_data_fetcher import PolymarketDataFetcher
 
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:  # orjson 为可选依赖
+    _json_loads = json.loads
+
+# 已结束市场的信息不会再变化，持久化到磁盘供下次运行复用
+MARKET_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'market_info.json')
+MARKET_CACHE_TTL = 86400  # 秒
+# 只持久化结算用到的字段
+MARKET_CACHE_FIELDS = ('conditionId', 'closed', 'outcomes', 'outcomePrices', 'closedTime')
+# 批量获取市场信息时每个请求包含的 condition_id 数量 (受 URL 长度限制)
+MARKET_BATCH_SIZE = 50
+
+
+def _json_default(obj):
+    # DataFrame 行里的 numpy 标量
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return str(obj)
+
+
+def _to_float(value):
+    # 无法解析的价格记为 -inf，不会被判为赢家
+    try:
+        price = float(value)
+    except (TypeError, ValueError):
+        return -np.inf
+    return -np.inf if np.isnan(price) else price
+
+
+def _to_numeric(series, fill=None):
+    # 已经是数值类型 (API 返回数字) 时跳过逐元素转换
+    if not pd.api.types.is_numeric_dtype(series):
+        series = pd.to_numeric(series, errors='coerce')
+    return series if fill is None else series.fillna(fill)
+
 
 class TraderAnalyzer:
-    def __init__(self):
+    def __init__(self, cache_file: str = MARKET_CACHE_FILE):
         self.fetcher = PolymarketDataFetcher()
         self.market_cache = {}
+        self.cache_file = cache_file
+        self._cache_expiry = {}  # condition_id -> 磁盘缓存过期时间
+        self._cache_lock = threading.Lock()  # 多线程分析时串行化缓存落盘
+        self._load_market_cache()
 
     def analyze_trader(self, address: str, limit: int = 500):
         print(f"📊 正在分析交易员: {address} ...")
@@ -24,6 +69,15 @@ class TraderAnalyzer:
         
         return analysis_df, trades, active_pos_df
 
+    def analyze_traders(self, addresses: list, limit: int = 500, max_workers: int = 16) -> dict:
+        """
+        并行分析多个交易员 (耗时主要在网络请求，使用线程池)
+        返回: {address: (analysis_df, trades, active_pos_df)}
+        """
+        with ThreadPoolExecutor(max_workers=min(max_workers, max(len(addresses), 1))) as executor:
+            results = executor.map(lambda addr: self.analyze_trader(addr, limit), addresses)
+            return dict(zip(addresses, results))
+
     def _process_trades(self, trades_df):
         """
         处理原始交易数据，计算每笔平仓盈亏和持有到期结算盈亏
@@ -31,10 +85,10 @@ class TraderAnalyzer:
         df = trades_df.copy()
         
         # 格式转换
-        df['size'] = pd.to_numeric(df['size'], errors='coerce').fillna(0)
-        df['price'] = pd.to_numeric(df['price'], errors='coerce').fillna(0)
+        df['size'] = _to_numeric(df['size'], fill=0)
+        df['price'] = _to_numeric(df['price'], fill=0)
         df['amount'] = df['size'] * df['price']
-        df['timestamp'] = pd.to_numeric(df['timestamp'], errors='coerce')
+        df['timestamp'] = _to_numeric(df['timestamp'])
         df['date'] = pd.to_datetime(df['timestamp'], unit='s')
         
         # 按时间正序排列
@@ -42,153 +96,159 @@ class TraderAnalyzer:
         
         # 盈亏计算逻辑 (改进版：支持持有到期)
         
-        # 维护持仓: key=(conditionId, outcome), value={'vol': 0, 'cost': 0}
-        positions = {} 
-        pnl_events = []
+        # 缺失的列使用与原逐行逻辑相同的默认值
+        if 'title' not in df.columns:
+            df['title'] = 'Unknown Market'
+        if 'outcome' not in df.columns:
+            df['outcome'] = '-'
+        if 'slug' not in df.columns:
+            df['slug'] = None
+        
+        # 向量化预处理: 方向、持仓分组编号 key=(conditionId, outcome)
+        # 这些列取值重复度很高，先编码为整数 (按首次出现顺序)，字符串处理只在去重后的取值上做
+        side_codes, side_values = pd.factorize(df['side'], use_na_sentinel=False)
+        sides = pd.Index(side_values).astype(str).str.strip().str.upper()
+        is_buy = np.asarray(sides == 'BUY')[side_codes]
+        is_sell = np.asarray(sides == 'SELL')[side_codes]
+        cid_codes, _ = pd.factorize(df['conditionId'], use_na_sentinel=False)
+        outcome_codes, outcome_values = pd.factorize(df['outcome'], use_na_sentinel=False)
+        codes, _ = pd.factorize(cid_codes * len(outcome_values) + outcome_codes)
+        n_groups = int(codes.max()) + 1 if len(codes) else 0
+        
+        # 每个持仓的首笔交易 (市场名/slug) 与最后一笔交易 (最后活动时间)
+        first_idx = np.unique(codes, return_index=True)[1]
+        last_idx = len(codes) - 1 - np.unique(codes[::-1], return_index=True)[1]
         
         # 1. 第一遍扫描：计算 Realized PnL (主动交易产生的盈亏)
-        for row in df.itertuples():
-            cid = row.conditionId
-            side = str(row.side).strip().upper()
-            size = row.size
-            amount = row.amount
-            market_name = getattr(row, 'title', 'Unknown Market')
-            outcome = getattr(row, 'outcome', '-')
-            date = row.date
-            slug = getattr(row, 'slug', None)
-            
-            key = (cid, outcome)
-            
-            if key not in positions:
-                positions[key] = {
-                    'vol': 0, 
-                    'cost': 0, 
-                    'market_name': market_name, 
-                    'slug': slug,
-                    'condition_id': cid,
-                    'last_date': date
-                }
+        # 只在纯数组上循环 (卖出时的 max(0, ...) 截断依赖先后顺序，无法用 cumsum 精确表达)
+        vol = [0] * n_groups
+        cost = [0] * n_groups
+        close_idx = []
+        close_pnl = []
+        traded = is_buy | is_sell
+        for i, g, buy, size, amount in zip(
+            np.flatnonzero(traded).tolist(),
+            codes[traded].tolist(),
+            is_buy[traded].tolist(),
+            df['size'].to_numpy()[traded].tolist(),
+            df['amount'].to_numpy()[traded].tolist(),
+        ):
+            if buy:
+                vol[g] += size
+                cost[g] += amount
+            elif vol[g] > 0:
+                # 计算该部分持仓的平均成本; 盈亏 = 卖出所得 - 成本
+                avg_cost = cost[g] / vol[g]
+                cost_basis = size * avg_cost
+                close_idx.append(i)
+                close_pnl.append(amount - cost_basis)
                 
-            pos = positions[key]
-            pos['last_date'] = date # 更新最后活动时间
-            
-            pnl = 0
-            is_close = False
-            
-            if side == 'BUY':
-                pos['vol'] += size
-                pos['cost'] += amount
-            elif side == 'SELL':
-                if pos['vol'] > 0:
-                    # 计算该部分持仓的平均成本
-                    avg_cost = pos['cost'] / pos['vol'] if pos['vol'] > 0 else 0
-                    cost_basis = size * avg_cost
-                    
-                    # 盈亏 = 卖出所得 - 成本
-                    pnl = amount - cost_basis
-                    is_close = True
-                    
-                    # 更新持仓
-                    pos['vol'] = max(0, pos['vol'] - size)
-                    pos['cost'] = max(0, pos['cost'] - cost_basis)
-            
-            if is_close:
-                pnl_events.append({
-                    'date': date,
-                    'pnl': pnl,
-                    'market': market_name,
-                    'outcome': outcome,
-                    'type': 'Trade'
-                })
+                # 更新持仓 (卖出数量可能超过已知持仓，截断为 0)
+                vol[g] = max(0, vol[g] - size)
+                cost[g] = max(0, cost[g] - cost_basis)
+        
+        trade_events = df.iloc[close_idx][['date', 'title', 'outcome']].rename(columns={'title': 'market'})
+        trade_events.insert(1, 'pnl', close_pnl)
+        trade_events['type'] = 'Trade'
+        
+        # 按分组编号一次性取出各列 (纯 Python 列表，避免逐个索引 numpy 数组)
+        first = df.iloc[first_idx]
+        positions = {}
+        for g, (cid, outcome, title, slug, last_date) in enumerate(zip(
+            first['conditionId'].tolist(),
+            first['outcome'].tolist(),
+            first['title'].tolist(),
+            first['slug'].tolist(),
+            df['date'].iloc[last_idx].tolist(),
+        )):
+            positions[(cid, outcome)] = {
+                'vol': vol[g],
+                'cost': cost[g],
+                'market_name': title,
+                'slug': slug,
+                'condition_id': cid,
+                'last_date': last_date,
+            }
+        pnl_events = []
 
         # --- 优化：并行预取所有需要的市场信息 ---
+        # 只有仍有持仓的市场才需要查询 (结算和当前持仓都会跳过极小残余)
         unique_markets = {}
         for (cid, outcome), pos in positions.items():
-            if cid not in unique_markets:
+            if pos['vol'] > 0.001 and cid not in unique_markets:
                 unique_markets[cid] = pos.get('slug')
         
         self._prefetch_markets(unique_markets)
         # ------------------------------------
 
-        # 2. 第二遍扫描：计算 Settlement PnL (持有到期)
-        # 检查所有剩余持仓，如果 Market 已关闭，则计算结算盈亏
-        for (cid, outcome), pos in positions.items():
-            if pos['vol'] > 0.001: # 忽略极小残余
-                market_info = self._get_market_info_cached(cid, slug=pos.get('slug'))
-                if not market_info or not market_info.get('closed', False):
-                    continue
-                
-                # 获取结算结果
-                try:
-                    outcomes_list = json.loads(market_info.get('outcomes', '[]'))
-                    prices_list = json.loads(market_info.get('outcomePrices', '[]'))
-                except:
-                    continue
-                    
-                if not outcomes_list or not prices_list:
-                    continue
-                    
-                # 判定赢家
-                winner_outcome = None
-                for idx, price_str in enumerate(prices_list):
-                    try:
-                        if float(price_str) > 0.95:
-                            winner_outcome = outcomes_list[idx]
-                            break
-                    except:
-                        pass
-                
-                # 计算结算价值
-                settlement_val = 0
-                if winner_outcome and outcome == winner_outcome:
-                    settlement_val = pos['vol'] * 1.0 # 赢了，$1/股
-                else:
-                    settlement_val = 0 # 输了，归零
-                    
-                settlement_pnl = settlement_val - pos['cost']
-                
-                # 结算时间逻辑优化：
-                # 1. 默认取最后交易时间
-                settle_date = pos['last_date'] 
-                
-                if market_info.get('closedTime'):
-                    try:
-                        dt = pd.to_datetime(market_info['closedTime'])
-                        # 统一为无时区时间
-                        if dt.tzinfo is not None:
-                            dt = dt.tz_localize(None)
-                            
-                        # 核心修复：如果 API 返回的关闭时间早于用户最后交易时间，或者年份异常(比如2020)，
-                        # 则强制使用用户的最后交易时间。因为用户不可能在市场关闭很久后还能交易，
-                        # 这种通常是 API 脏数据。
-                        if dt.year < 2021 or dt < pos['last_date']:
-                            settle_date = pos['last_date']
-                        else:
-                            settle_date = dt
-                    except:
-                        pass
-                
-                pnl_events.append({
-                    'date': settle_date,
-                    'pnl': settlement_pnl,
-                    'market': pos['market_name'],
-                    'outcome': outcome,
-                    'type': 'Settlement'
-                })
-
-        # 3. 收集当前活跃仓位 (未平仓且市场未结束)
+        # 2. 第二遍扫描：剩余持仓一次遍历
+        # 市场已关闭则计算结算盈亏 (持有到期)，否则收集为当前活跃仓位
         active_pos_list = []
         for (cid, outcome), pos in positions.items():
-            if pos['vol'] > 0.001 and pos['cost'] > 0.1: # 过滤：数量和金额都要有实际意义 (排除粉尘仓位)
-                market_info = self._get_market_info_cached(cid, slug=pos.get('slug'))
-                # 过滤：只有市场未结束的才算“活跃仓位”
-                if not market_info or not market_info.get('closed', False):
+            if pos['vol'] <= 0.001: # 忽略极小残余
+                continue
+            market_info = self._get_market_info_cached(cid, slug=pos.get('slug'))
+            if not market_info or not market_info.get('closed', False):
+                # 3. 市场未结束：当前活跃仓位 (金额也要有实际意义，排除粉尘仓位)
+                if pos['cost'] > 0.1:
                     active_pos_list.append({
                         'market': pos['market_name'],
                         'outcome': outcome,
                         'size': pos['vol'],
                         'cost': pos['cost']
                     })
+                continue
+            
+            # 获取结算结果 (同一市场的各个 outcome 共用一次解析)
+            outcomes_list, prices_list = self._parse_outcomes(market_info)
+            if not outcomes_list or prices_list is None or not prices_list.size:
+                continue
+                
+            # 判定赢家：价格最高且超过 0.95 的 outcome
+            winner_outcome = None
+            prices = prices_list[:len(outcomes_list)]
+            if prices.size:
+                idx = prices.argmax()
+                if prices[idx] > 0.95:
+                    winner_outcome = outcomes_list[idx]
+            
+            # 计算结算价值
+            settlement_val = 0
+            if winner_outcome and outcome == winner_outcome:
+                settlement_val = pos['vol'] * 1.0 # 赢了，$1/股
+            else:
+                settlement_val = 0 # 输了，归零
+                
+            settlement_pnl = settlement_val - pos['cost']
+            
+            # 结算时间逻辑优化：
+            # 1. 默认取最后交易时间
+            settle_date = pos['last_date'] 
+            
+            if market_info.get('closedTime'):
+                try:
+                    dt = pd.to_datetime(market_info['closedTime'])
+                    # 统一为无时区时间
+                    if dt.tzinfo is not None:
+                        dt = dt.tz_localize(None)
+                        
+                    # 核心修复：如果 API 返回的关闭时间早于用户最后交易时间，或者年份异常(比如2020)，
+                    # 则强制使用用户的最后交易时间。因为用户不可能在市场关闭很久后还能交易，
+                    # 这种通常是 API 脏数据。
+                    if dt.year < 2021 or dt < pos['last_date']:
+                        settle_date = pos['last_date']
+                    else:
+                        settle_date = dt
+                except:
+                    pass
+            
+            pnl_events.append({
+                'date': settle_date,
+                'pnl': settlement_pnl,
+                'market': pos['market_name'],
+                'outcome': outcome,
+                'type': 'Settlement'
+            })
         
         active_pos_df = pd.DataFrame(active_pos_list)
         if not active_pos_df.empty:
@@ -196,17 +256,42 @@ class TraderAnalyzer:
             active_pos_df['weight'] = (active_pos_df['cost'] / total_cost * 100) if total_cost > 0 else 0
             active_pos_df = active_pos_df.sort_values('cost', ascending=False)
 
-        # 转换为 DataFrame
-        result_df = pd.DataFrame(pnl_events)
+        # 转换为 DataFrame (平仓事件在前、结算事件在后，与逐行扫描时的顺序一致)
+        frames = [f for f in (trade_events.reset_index(drop=True), pd.DataFrame(pnl_events)) if not f.empty]
+        result_df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
         if not result_df.empty:
-            result_df = result_df.sort_values('date') # 重新按时间排序
-            result_df['cumulative_pnl'] = result_df['pnl'].cumsum()
+            # 重新按时间排序：在 int64 时间戳上做稳定排序 (无效时间排在最后)，累计盈亏直接在 ndarray 上 cumsum
+            dates = result_df['date'].to_numpy(dtype='datetime64[ns]')
+            sort_keys = np.where(np.isnat(dates), np.iinfo(np.int64).max, dates.view(np.int64))
+            # copy()：iloc 取出的派生表直接赋值列会触发 SettingWithCopyWarning (pandas 2.x)
+            result_df = result_df.iloc[np.argsort(sort_keys, kind='stable')].copy()
+            result_df['cumulative_pnl'] = np.cumsum(result_df['pnl'].to_numpy(dtype=np.float64))
             
         return result_df, active_pos_df
 
+    def _parse_outcomes(self, market_info: dict):
+        """
+        解析市场的 outcomes / outcomePrices，结果缓存在 market_info 上
+        返回: (outcomes 列表, 价格 float64 数组)，解析失败时为 (None, None)
+        """
+        if '_outcomes' not in market_info:
+            try:
+                outcomes_list = _json_loads(market_info.get('outcomes', '[]'))
+                prices_list = np.array(
+                    [_to_float(p) for p in _json_loads(market_info.get('outcomePrices', '[]'))],
+                    dtype=np.float64,
+                )
+                if not isinstance(outcomes_list, list):
+                    raise ValueError('outcomes 不是列表')
+            except Exception:
+                outcomes_list, prices_list = None, None
+            market_info['_outcomes'] = outcomes_list
+            market_info['_prices'] = prices_list
+        return market_info['_outcomes'], market_info['_prices']
+
     def _prefetch_markets(self, market_dict: dict):
         """
-        并行预取多个市场的信息
+        批量预取多个市场的信息
         market_dict: {condition_id: slug}
         """
         todo = []
@@ -217,8 +302,53 @@ class TraderAnalyzer:
         if not todo:
             return
 
-        print(f"🌐 正在并行获取 {len(todo)} 个市场的信息...")
-        
+        print(f"🌐 正在批量获取 {len(todo)} 个市场的信息...")
+
+        # 先按 condition_id 批量获取，每批只需一次请求
+        missing = []
+        for start in range(0, len(todo), MARKET_BATCH_SIZE):
+            batch = todo[start:start + MARKET_BATCH_SIZE]
+            found = self._get_markets_batch([cid for cid, _ in batch])
+            for cid, slug in batch:
+                info = found.get(str(cid).lower())
+                if info is not None:
+                    self.market_cache[cid] = info
+                else:
+                    missing.append((cid, slug))
+
+        # 批量接口没有返回的市场再逐个并行获取 (优先 slug)
+        if missing:
+            self._fetch_markets_individually(missing)
+
+        self._save_market_cache()
+
+    def _get_markets_batch(self, condition_ids: list) -> dict:
+        """
+        一次请求获取多个市场的信息
+        返回: {condition_id 小写: 市场信息 dict}
+        """
+        try:
+            df = self.fetcher.get_markets(condition_ids=condition_ids, limit=len(condition_ids))
+        except Exception as e:
+            print(f"⚠️ 批量获取市场信息失败: {e}")
+            return {}
+        if df.empty:
+            return {}
+
+        key_col = 'conditionId' if 'conditionId' in df.columns else 'condition_id'
+        if key_col not in df.columns:
+            return {}
+        return {
+            str(info[key_col]).lower(): info
+            for info in df.to_dict('records')
+            if info[key_col]
+        }
+
+    def _fetch_markets_individually(self, todo: list):
+        """
+        并行逐个获取市场信息
+        todo: [(condition_id, slug), ...]
+        """
         with ThreadPoolExecutor(max_workers=10) as executor:
             future_to_cid = {executor.submit(self._get_market_info_inner, cid, slug): cid for cid, slug in todo}
             for future in as_completed(future_to_cid):
@@ -230,6 +360,52 @@ class TraderAnalyzer:
                     print(f"⚠️ 预取 {cid} 失败: {e}")
                     self.market_cache[cid] = None
 
+    def _load_market_cache(self):
+        """
+        从磁盘加载未过期的已结束市场信息
+        """
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ 忽略无法读取的市场缓存 {self.cache_file}: {e}")
+            return
+
+        now = time.time()
+        for cid, (expires_at, info) in entries.items():
+            if expires_at > now:
+                self.market_cache[cid] = info
+                self._cache_expiry[cid] = expires_at
+
+    def _save_market_cache(self):
+        """
+        将已结束市场的信息写回磁盘 (未结束市场的价格还会变化，不持久化)
+        """
+        if not self.cache_file:
+            return
+        with self._cache_lock:
+            now = time.time()
+            entries = {}
+            # 其他线程可能同时写入 market_cache，先取快照
+            for cid, info in list(self.market_cache.items()):
+                if not info or not info.get('closed', False):
+                    continue
+                expires_at = self._cache_expiry.setdefault(cid, now + MARKET_CACHE_TTL)
+                if expires_at > now:
+                    entries[cid] = [expires_at, {k: info.get(k) for k in MARKET_CACHE_FIELDS}]
+
+            try:
+                os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+                # 先写临时文件再替换，避免多个进程同时写出半个文件
+                tmp_file = f"{self.cache_file}.{os.getpid()}.tmp"
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    json.dump(entries, f, ensure_ascii=False, default=_json_default)
+                os.replace(tmp_file, self.cache_file)
+            except OSError as e:
+                print(f"⚠️ 保存市场缓存失败: {e}")
+
     def _get_market_info_inner(self, condition_id, slug=None):
         """
         实际执行获取市场信息的内部方法 (无缓存检查)
@@ -244,15 +420,15 @@ class TraderAnalyzer:
                 df = self.fetcher.get_markets(condition_id=condition_id)
             
             if not df.empty:
-                match_row = None
-                for _, row in df.iterrows():
-                    fetched_cid = row.get('conditionId') or row.get('condition_id')
-                    if fetched_cid and str(fetched_cid).lower() == str(condition_id).lower():
-                        match_row = row
-                        break
+                # 接口可能返回默认列表，按 condition_id 整列比较找到目标市场
+                target = str(condition_id).lower()
+                mask = np.zeros(len(df), dtype=bool)
+                for col in ('conditionId', 'condition_id'):
+                    if col in df.columns:
+                        mask |= (df[col].astype(str).str.lower() == target).to_numpy()
                 
-                if match_row is not None:
-                    return match_row.to_dict()
+                if mask.any():
+                    return df.iloc[mask.argmax()].to_dict()
         except:
             pass
         return None
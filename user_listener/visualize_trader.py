@@ -5,16 +5,60 @@ Polymarket Trader Professional Dashboard Generator
 
 import sys
 import os
+import html
+import numpy as np
 import pandas as pd
 import json
-import plotly.graph_objects as go
+from jinja2 import Environment, FileSystemLoader, select_autoescape
 from trader_analyzer import TraderAnalyzer
 from strategy_analysis import FixedBetStrategyAnalyzer
 
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖
+    orjson = None
+
+
+def _json_serial(obj):
+    # 序列化辅助：时间统一格式化为字符串
+    if isinstance(obj, (pd.Timestamp, pd.DatetimeIndex)):
+        return obj.strftime('%Y-%m-%d %H:%M')
+    raise TypeError ("Type %s not serializable" % type(obj))
+
+
+def _nan_to_none(obj):
+    # NaN/inf 统一转为 None (与 orjson 一致输出 null)，避免 json 模块写出非法的 NaN
+    if isinstance(obj, (float, np.floating)):
+        return float(obj) if np.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {k: _nan_to_none(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_nan_to_none(v) for v in obj]
+    return obj
+
+
+def _to_json(obj) -> str:
+    """序列化为嵌入页面的 JSON 字符串 (优先使用 orjson)"""
+    if orjson is not None:
+        # PASSTHROUGH_DATETIME: 时间交给 _json_serial，保持与 json 模块相同的格式
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_DATETIME
+        return orjson.dumps(obj, option=option, default=_json_serial).decode('utf-8')
+    return json.dumps(_nan_to_none(obj), default=_json_serial, allow_nan=False)
+
+
+# 报告页面模板与 Flask 页面放在同一目录，编译一次后复用
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+_template_env = Environment(loader=FileSystemLoader(TEMPLATES_DIR), autoescape=select_autoescape(['html']))
+
+# Order History 中展示的最近交易条数
+TRADE_LOG_ROWS = 100
+
+
 class TraderVisualizer:
     def __init__(self):
         self.analyzer = TraderAnalyzer()
         self.strategy_analyzer = FixedBetStrategyAnalyzer()
+        self._report_template = _template_env.get_template('report.html')
 
     def analyze_and_get_html(self, address_input: str, limit: int = 50000):
         # 支持逗号分隔的多地址分析
@@ -29,16 +73,17 @@ class TraderVisualizer:
             return self.get_professional_report_html([addr], {addr: (analysis_df, trades_df, active_df)}, {addr: strategy_df})
         else:
             print(f"📊 正在并行分析 {len(addresses)} 个交易员 ...")
-            data_map = {}
+            data_map = self.analyzer.analyze_traders(addresses, limit)
             strategy_map = {}
             for addr in addresses:
-                data_map[addr] = self.analyzer.analyze_trader(addr, limit)
                 strategy_df, _, _, _ = self.strategy_analyzer.analyze_strategy(addr, limit=5000)
                 strategy_map[addr] = strategy_df
             return self.get_professional_report_html(addresses, data_map, strategy_map)
 
     def get_professional_report_html(self, addresses, data_map, strategy_map=None):
         """生成支持多交易员对比的 HTML 报告"""
+        # plotly 导入较慢，只在真正生成报告时加载
+        import plotly.graph_objects as go
         
         if strategy_map is None:
             strategy_map = {}
@@ -50,7 +95,7 @@ class TraderVisualizer:
         # 2. 准备策略收益图表
         fig_strategy = go.Figure()
         
-        all_traders_html = ""
+        trader_sections = []
         
         for i, addr in enumerate(addresses):
             analysis_df, trades_df, active_df = data_map[addr]
@@ -79,29 +124,25 @@ class TraderVisualizer:
             top_wins = []
             top_losses = []
             if not analysis_df.empty:
-                df_serialized = analysis_df.copy()
-                if 'date' in df_serialized.columns:
-                    df_serialized['date'] = df_serialized['date'].dt.strftime('%Y-%m-%d %H:%M')
-                df_wins = df_serialized[df_serialized['pnl'] > 0].sort_values('pnl', ascending=False)
-                df_losses = df_serialized[df_serialized['pnl'] < 0].sort_values('pnl', ascending=True)
-                top_wins = df_wins.head(10).to_dict('records')
-                top_losses = df_losses.head(10).to_dict('records')
+                # 只选出前 10 名 (堆选择，无需全量排序)，再只对这些行格式化日期
+                df_wins = analysis_df.nlargest(10, 'pnl')
+                df_losses = analysis_df.nsmallest(10, 'pnl')
+                df_wins = df_wins[df_wins['pnl'] > 0].copy()
+                df_losses = df_losses[df_losses['pnl'] < 0].copy()
+                if 'date' in analysis_df.columns:
+                    df_wins['date'] = df_wins['date'].dt.strftime('%Y-%m-%d %H:%M')
+                    df_losses['date'] = df_losses['date'].dt.strftime('%Y-%m-%d %H:%M')
+                top_wins = df_wins.to_dict('records')
+                top_losses = df_losses.to_dict('records')
 
             active_list = active_df.to_dict('records') if not active_df.empty else []
-            
-            # 序列化辅助
-            def json_serial(obj):
-                import pandas as pd
-                if isinstance(obj, (pd.Timestamp, pd.DatetimeIndex)):
-                    return obj.strftime('%Y-%m-%d %H:%M')
-                raise TypeError ("Type %s not serializable" % type(obj))
 
-            top_wins_json = json.dumps(top_wins, default=json_serial)
-            top_losses_json = json.dumps(top_losses, default=json_serial)
-            active_list_json = json.dumps(active_list, default=json_serial)
+            top_wins_json = _to_json(top_wins)
+            top_losses_json = _to_json(top_losses)
+            active_list_json = _to_json(active_list)
 
             # 为每个交易员构建独立的 UI 区块
-            all_traders_html += f"""
+            trader_sections.append(f"""
             <div class="trader-section" id="section-{addr}">
                 <div class="section-title">📊 Detail Analysis: {addr}</div>
                 
@@ -138,7 +179,7 @@ class TraderVisualizer:
                             <div class="card-subtitle">Execution log</div>
                         </div>
                         <div class="log-container">
-                            {self._render_trades_html(trades_df.to_dict('records') if not trades_df.empty else [])}
+                            {self._render_trades_html(trades_df.head(TRADE_LOG_ROWS).to_dict('records') if not trades_df.empty else [])}
                         </div>
                     </div>
                 </div>
@@ -151,7 +192,8 @@ class TraderVisualizer:
                     }};
                 </script>
             </div>
-            """
+            """)
+        all_traders_html = "".join(trader_sections)
 
         # 整理聚合图表布局(历史收益)
         fig_pnl.update_layout(
@@ -177,278 +219,85 @@ class TraderVisualizer:
         )
         strategy_chart_div = fig_strategy.to_html(full_html=False, include_plotlyjs=False)
 
-        # 最终 HTML 模板
-        html_template = f"""
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <title>Trader Analysis Comparison Report</title>
-    <link href="https://fonts.googleapis.com/css2?family=Inter:wght@400;600;700&display=swap" rel="stylesheet">
-    <style>
-        :root {{
-            --bg-color: #f1f5f9;
-            --card-bg: #ffffff;
-            --text-main: #0f172a;
-            --text-sub: #64748b;
-            --border-color: #e2e8f0;
-            --win-color: #10b981;
-            --loss-color: #ef4444;
-            --accent-blue: #3b82f6;
-        }}
-        body {{ font-family: 'Inter', sans-serif; background: var(--bg-color); color: var(--text-main); margin: 0; padding: 20px; }}
-        .container {{ max-width: 1400px; margin: 0 auto; }}
-        .header-bar {{ margin-bottom: 24px; }}
-        .main-chart-card {{ 
-            background: #fff; 
-            border-radius: 16px; 
-            border: 1px solid var(--border-color); 
-            padding: 20px; 
-            box-shadow: 0 4px 12px rgba(0,0,0,0.05); 
-            margin-bottom: 30px;
-            position: relative;
-        }}
-        
-        .chart-toggle-btns {{
-            position: absolute;
-            top: 20px;
-            right: 20px;
-            display: flex;
-            gap: 8px;
-            z-index: 100;
-        }}
-        .toggle-btn {{
-            background: #e2e8f0;
-            color: #64748b;
-            border: none;
-            padding: 8px 16px;
-            border-radius: 8px;
-            font-size: 12px;
-            font-weight: 600;
-            cursor: pointer;
-            transition: all 0.2s;
-        }}
-        .toggle-btn.active {{
-            background: var(--accent-blue);
-            color: white;
-            box-shadow: 0 4px 6px rgba(59, 130, 246, 0.2);
-        }}
-        .toggle-btn:hover:not(.active) {{
-            background: #cbd5e1;
-        }}
-
-        .trader-section {{ margin-top: 50px; border-top: 2px dashed #cbd5e1; padding-top: 30px; }}
-        .section-title {{ font-size: 20px; font-weight: 700; margin-bottom: 20px; color: var(--accent-blue); }}
-        
-        .top-row {{ display: none; }}
-        .chart-card {{ background: var(--card-bg); border-radius: 12px; border: 1px solid var(--border-color); height: 100%; }}
-        .trade-log-card {{ background: var(--card-bg); border-radius: 12px; border: 1px solid var(--border-color); display: flex; flex-direction: column; height: 100%; overflow: hidden; }}
-        .card-header-dark {{ background: #1e293b; color: white; padding: 12px 20px; font-weight: 600; }}
-        .card-subtitle {{ font-size: 11px; opacity: 0.7; font-weight: 400; }}
-        .log-container {{ flex: 1; overflow-y: auto; padding: 10px; }}
-        .log-row {{ display: flex; justify-content: space-between; padding: 6px 10px; border-bottom: 1px solid #f1f5f9; font-size: 11px; }}
-        .side-buy {{ color: var(--win-color); font-weight: 700; }}
-        .side-sell {{ color: var(--loss-color); font-weight: 700; }}
-        
-        .bottom-row {{ display: grid; grid-template-columns: 1fr 1fr 1fr; gap: 20px; }}
-        .pro-card {{ background: var(--card-bg); border-radius: 12px; border: 1px solid var(--border-color); height: 400px; display: flex; flex-direction: column; overflow: hidden; }}
-        .tab-bar {{ display: flex; border-bottom: 1px solid var(--border-color); }}
-        .tab {{ flex: 1; padding: 10px; text-align: center; font-size: 12px; cursor: pointer; color: var(--text-sub); border-bottom: 2px solid transparent; }}
-        .tab.active {{ color: var(--text-main); border-bottom: 2px solid var(--accent-blue); font-weight: 600; }}
-        .content-area {{ padding: 15px; flex: 1; overflow-y: auto; }}
-        
-        .data-row {{ display: flex; align-items: center; padding: 10px 0; border-bottom: 1px solid #f8fafc; }}
-        .rank-num {{ width: 25px; color: #94a3b8; font-size: 11px; }}
-        .market-icon {{ margin-right: 10px; }}
-        .market-info {{ flex: 1; }}
-        .market-title {{ font-size: 13px; font-weight: 500; color: var(--accent-blue); text-decoration: none; display: block; }}
-        .progress-container {{ height: 3px; background: #f1f5f9; border-radius: 2px; width: 100%; margin-top: 4px; }}
-        .progress-bar-win {{ height: 100%; background: var(--win-color); border-radius: 2px; }}
-        .progress-bar-loss {{ height: 100%; background: var(--loss-color); border-radius: 2px; }}
-        .pnl-val {{ width: 100px; text-align: right; font-weight: 600; font-size: 13px; }}
-        .empty-state {{ text-align: center; padding: 40px; color: #94a3b8; font-size: 13px; }}
-        
-        #chart-actual, #chart-strategy {{ width: 100%; min-height: 450px; }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header-bar">
-            <h1 style="margin: 0; font-size: 28px;">Multi-Trader Comparison Report</h1>
-            <p style="color: var(--text-sub); margin-top: 5px;">Analyzing {len(addresses)} traders performance side-by-side.</p>
-        </div>
-
-        <div class="main-chart-card">
-            <div class="chart-toggle-btns">
-                <button class="toggle-btn active" id="btn-actual" onclick="switchChart('actual')">📈 历史收益</button>
-                <button class="toggle-btn" id="btn-strategy" onclick="switchChart('strategy')">📊 策略收益</button>
-            </div>
-            <div id="chart-actual">{chart_div}</div>
-            <div id="chart-strategy" style="display: none;">{strategy_chart_div}</div>
-        </div>
-
-        {all_traders_html}
-    </div>
-
-    <script>
-        const traderAddresses = {json.dumps(addresses)};
-
-        function switchChart(type) {{
-            document.getElementById('btn-actual').classList.toggle('active', type === 'actual');
-            document.getElementById('btn-strategy').classList.toggle('active', type === 'strategy');
-            document.getElementById('chart-actual').style.display = type === 'actual' ? 'block' : 'none';
-            document.getElementById('chart-strategy').style.display = type === 'strategy' ? 'block' : 'none';
-            
-            // 关键修复：触发 resize 事件，强制 Plotly 重新计算宽度以占满容器
-            setTimeout(() => {{
-                window.dispatchEvent(new Event('resize'));
-            }}, 10);
-        }}
-
-        function formatCurrency(val) {{
-            return (val < 0 ? '-' : '+') + '$' + Math.abs(val).toLocaleString(undefined, {{minimumFractionDigits: 2}});
-        }}
-
-        function switchTab(addr, type, subtype, el) {{
-            const tabs = el.parentElement.querySelectorAll('.tab');
-            tabs.forEach(t => t.classList.remove('active'));
-            el.classList.add('active');
-
-            const content = document.getElementById(type + '-content-' + addr);
-            const dataObj = window['data_' + addr];
-            
-            if (type === 'perf') {{
-                const data = subtype === 'wins' ? dataObj.topWins : dataObj.topLosses;
-                renderPerf(content, data, subtype === 'wins' ? 'win' : 'loss');
-            }} else {{
-                renderPositions(content, dataObj.activePositions, subtype === 'value');
-            }}
-        }}
-
-        function renderPerf(container, data, mode) {{
-            if (!data || data.length === 0) {{
-                container.innerHTML = '<div class="empty-state">No performance data</div>';
-                return;
-            }}
-            const maxPnl = Math.max(...data.map(d => Math.abs(d.pnl)));
-            let html = '';
-            data.forEach((item, index) => {{
-                const pct = (Math.abs(item.pnl) / maxPnl) * 100;
-                const pnlColor = mode === 'win' ? 'var(--win-color)' : 'var(--loss-color)';
-                html += `
-                    <div class="data-row">
-                        <div class="rank-num">#${{index + 1}}</div>
-                        <div class="market-icon">${{mode === 'win' ? '🟢' : '🔴'}}</div>
-                        <div class="market-info">
-                            <span class="market-title">${{item.market}}</span>
-                            <div class="progress-container">
-                                <div class="${{mode === 'win' ? 'progress-bar-win' : 'progress-bar-loss'}}" style="width: ${{pct}}%"></div>
-                            </div>
-                        </div>
-                        <div class="pnl-val" style="color: ${{pnlColor}}">${{formatCurrency(item.pnl)}}</div>
-                    </div>
-                `;
-            }});
-            container.innerHTML = html;
-        }}
-
-        function renderPositions(container, data, isValue) {{
-            if (!data || data.length === 0) {{
-                container.innerHTML = '<div class="empty-state">No active positions</div>';
-                return;
-            }}
-            const maxVal = Math.max(...data.map(a => Math.abs(isValue ? a.cost : a.size)));
-            let html = '';
-            data.slice(0, 10).forEach((a, i) => {{
-                const val = isValue ? a.cost : a.size;
-                const pct = (Math.abs(val) / maxVal) * 100;
-                html += `
-                    <div class="data-row">
-                        <div class="rank-num">#${{i+1}}</div>
-                        <div class="market-icon">💼</div>
-                        <div class="market-info">
-                            <span class="market-title">${{a.market}}</span>
-                            <div class="progress-container"><div class="progress-bar-win" style="width: ${{pct}}%; background: var(--accent-blue);"></div></div>
-                        </div>
-                        <div class="pnl-val">${{isValue ? '$' : ''}}${{val.toLocaleString(undefined, {{minimumFractionDigits: isValue?2:0}})}}</div>
-                    </div>
-                `;
-            }});
-            container.innerHTML = html;
-        }}
-    </script>
-</body>
-</html>
-        """
-        return html_template
+        # 最终 HTML 页面：静态部分在模板文件中，这里只渲染动态片段
+        return self._report_template.render(
+            trader_count=len(addresses),
+            chart_div=chart_div,
+            strategy_chart_div=strategy_chart_div,
+            traders_html=all_traders_html,
+            addresses=addresses,
+        )
 
     def _render_trades_html(self, trades):
         if not trades:
             return '<div class="empty-state">No trade history</div>'
         
-        html = ""
-        for t in trades[:100]:
+        shown = trades[:TRADE_LOG_ROWS]
+        # 一次性转换并格式化全部时间戳，避免逐行调用 pd.to_datetime
+        timestamps = pd.to_numeric(pd.Series([t.get('timestamp') or None for t in shown], dtype=object), errors='coerce')
+        date_strs = pd.to_datetime(timestamps, unit='s').dt.strftime('%m-%d %H:%M').fillna('N/A').tolist()
+        
+        parts = []
+        for t, date_str in zip(shown, date_strs):
             side_cls = "side-buy" if str(t.get('side')).upper() == 'BUY' else "side-sell"
-            timestamp = t.get('timestamp')
-            date_str = pd.to_datetime(timestamp, unit='s').strftime('%m-%d %H:%M') if timestamp else 'N/A'
-            html += f"""
+            parts.append(f"""
                 <div class="log-row">
                     <span style="color:#64748b; width: 80px;">{date_str}</span>
                     <span class="{side_cls}" style="width: 40px;">{str(t.get('side')).upper()}</span>
-                    <span style="flex: 1; overflow: hidden; text-overflow: ellipsis; white-space: nowrap; margin-right: 10px;">{t.get('title', 'Market')}</span>
+                    <span style="flex: 1; overflow: hidden; text-overflow: ellipsis; white-space: nowrap; margin-right: 10px;">{html.escape(str(t.get('title', 'Market')))}</span>
                     <span style="font-weight: 500;">${float(t.get('size', 0)) * float(t.get('price', 0)):,.2f}</span>
                 </div>
-            """
-        return html
+            """)
+        return "".join(parts)
 
     def _render_positions_html(self, active_list):
         if not active_list:
             return '<div class="empty-state">No active positions</div>'
         
-        max_cost = max([abs(a.get('cost', 0)) for a in active_list]) if active_list else 1
-        html = ""
-        for i, a in enumerate(active_list[:8]):
-            pct = (abs(a.get('cost', 0)) / max_cost) * 100
-            html += f"""
+        costs = np.abs(np.fromiter((a.get('cost', 0) for a in active_list), dtype=np.float64, count=len(active_list)))
+        pcts = (costs[:8] / costs.max() * 100).tolist()
+        parts = []
+        for i, (a, pct) in enumerate(zip(active_list[:8], pcts)):
+            parts.append(f"""
                 <div class="data-row">
                     <div class="rank-num">#{i+1}</div>
                     <div class="market-icon">💼</div>
                     <div class="market-info">
-                        <span class="market-title">{a.get('market')}</span>
+                        <span class="market-title">{html.escape(str(a.get('market')))}</span>
                         <div class="progress-container">
                             <div class="progress-bar-win" style="width: {pct}%; background: var(--accent-blue);"></div>
                         </div>
                     </div>
                     <div class="pnl-val">${a.get('cost', 0):,.2f}</div>
                 </div>
-            """
-        return html
+            """)
+        return "".join(parts)
 
     def _render_performance_html(self, data, mode):
         if not data:
             return '<div class="empty-state">No performance data</div>'
         
-        max_pnl = max([abs(d.get('pnl', 0)) for d in data]) if data else 1
-        html = ""
-        for i, d in enumerate(data[:8]):
-            pct = (abs(d.get('pnl', 0)) / max_pnl) * 100
+        pnls = np.abs(np.fromiter((d.get('pnl', 0) for d in data), dtype=np.float64, count=len(data)))
+        pcts = (pnls[:8] / pnls.max() * 100).tolist()
+        parts = []
+        for i, (d, pct) in enumerate(zip(data[:8], pcts)):
             bar_cls = "progress-bar-win" if mode == 'win' else "progress-bar-loss"
             pnl_color = "var(--win-color)" if mode == 'win' else "var(--loss-color)"
             prefix = "+" if mode == 'win' else ""
-            html += f"""
+            parts.append(f"""
                 <div class="data-row">
                     <div class="rank-num">#{i+1}</div>
                     <div class="market-icon">{'🟢' if mode == 'win' else '🔴'}</div>
                     <div class="market-info">
-                        <span class="market-title">{d.get('market')}</span>
+                        <span class="market-title">{html.escape(str(d.get('market')))}</span>
                         <div class="progress-container">
                             <div class="{bar_cls}" style="width: {pct}%"></div>
                         </div>
                     </div>
                     <div class="pnl-val" style="color: {pnl_color}">{prefix}${abs(d.get('pnl', 0)):,.2f}</div>
                 </div>
-            """
-        return html
+            """)
+        return "".join(parts)
 
     def generate_professional_report(self, address, analysis_df, trades_df, active_df):
         html_content = self.get_professional_report_html([address], {address: (analysis_df, trades_df, active_df)})